@@ -0,0 +1,214 @@
+"""Background agent that keeps a warm Todoist client for the CLI.
+
+The agent listens on a local Unix socket and serves one JSON request
+per line. It holds a single ``TodoistAPI`` (and so one pooled HTTP
+session) plus a ``ReminderCache`` and the local ``TaskIndex``, both
+refreshed incrementally, so each reschedule skips interpreter start,
+TLS handshakes, the task lookup and the full reminder download.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import sys
+import threading
+from datetime import date
+from typing import Any
+
+from todoist_api_python.api import TodoistAPI
+from todoist_api_python.models import Task
+
+import todoistScheduler.config as config
+from todoistScheduler.reminders import ReminderCache
+from todoistScheduler.reschedule import reschedule_task
+from todoistScheduler.search import TaskIndex
+
+# Seconds the CLI waits for the agent before running in-process.
+CLIENT_TIMEOUT = 60.0
+
+
+class Agent:
+    """Executes requests against a warm API client.
+
+    With a task index, tasks are looked up in it, refreshed with an
+    incremental sync once older than index_ttl, instead of fetched
+    one by one.
+    """
+
+    def __init__(
+        self,
+        api: TodoistAPI,
+        index: TaskIndex | None = None,
+        index_ttl: float = 0.0,
+    ) -> None:
+        self.api = api
+        self.reminders = ReminderCache(api._token, api._session)
+        self.index = index
+        self.index_ttl = index_ttl
+        # requests.Session is not thread-safe; serialize API work
+        self._lock = threading.Lock()
+
+    def _task(self, task_id: str) -> Task:
+        """The task by id, from the index when it has it."""
+        if self.index is not None:
+            if self.index.is_stale(self.index_ttl):
+                self.index.refresh(self.api._token, self.api._session)
+            task = self.index.get(task_id)
+            if task is not None:
+                return task
+        return self.api.get_task(task_id=task_id)
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Run one request and return a JSON-serializable reply."""
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op != "reschedule":
+            return {"ok": False, "error": f"Unknown op: '{op}'"}
+        with self._lock:
+            try:
+                task = self._task(request["task_id"])
+            except Exception as exc:
+                return {
+                    "ok": False,
+                    "error": (
+                        f"Error fetching task"
+                        f" '{request['task_id']}': {exc}"
+                    ),
+                }
+            try:
+                reschedule_task(
+                    self.api,
+                    task,
+                    date.fromisoformat(request["date"]),
+                    reminder_cache=self.reminders,
+                )
+            except Exception as exc:
+                return {
+                    "ok": False,
+                    "error": f"Error rescheduling task: {exc}",
+                }
+            finally:
+                if self.index is not None:
+                    # The indexed copy no longer has the new due date
+                    self.index.expire()
+        return {"ok": True, "content": task.content}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            reply = {"ok": False, "error": "Malformed request"}
+        else:
+            reply = self.server.agent.handle(request)  # type: ignore[attr-defined]
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+
+class _Server(
+    socketserver.ThreadingMixIn,
+    socketserver.UnixStreamServer,
+):
+    daemon_threads = True
+
+
+def _listen(socket_path: str) -> _Server:
+    """Bind the agent's socket, private from the start.
+
+    The socket carries the agent's API token, so it is created with
+    no access for anyone but its owner rather than narrowed later.
+    """
+    umask = os.umask(0o177)
+    try:
+        return _Server(socket_path, _Handler)
+    finally:
+        os.umask(umask)
+
+
+def serve(socket_path: str, agent: Agent) -> None:
+    """Serve requests on socket_path until interrupted."""
+    if os.path.exists(socket_path):
+        if request(socket_path, {"op": "ping"}) is not None:
+            raise RuntimeError(
+                f"An agent is already listening on {socket_path}"
+            )
+        os.remove(socket_path)
+    server = _listen(socket_path)
+    server.agent = agent  # type: ignore[attr-defined]
+    logging.info("Agent listening on %s", socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+
+def request(
+    socket_path: str,
+    payload: dict[str, Any],
+    timeout: float = CLIENT_TIMEOUT,
+) -> dict[str, Any] | None:
+    """Send a request to the agent.
+
+    Returns None when no agent is listening, or the socket cannot be
+    used (stale, timed out or not ours), so callers can fall back to
+    doing the work in-process.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+        reply = sock.makefile("rb").readline()
+    except OSError as exc:
+        logging.debug("Agent at %s not usable: %s", socket_path, exc)
+        return None
+    finally:
+        sock.close()
+    if not reply:
+        return None
+    return json.loads(reply)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Entry point for the agent."""
+    parser = argparse.ArgumentParser(
+        prog="todoist-agent",
+        description=(
+            "Keep a warm Todoist client for"
+            " todoist-reschedule."
+        ),
+    )
+    parser.add_argument(
+        "--socket",
+        default=config.AGENT_SOCKET,
+        help="Unix socket to listen on.",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if not config.TODOIST_API_KEY:
+        print(
+            "Error: TODOIST_API_KEY environment"
+            " variable is not set.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    api = TodoistAPI(config.TODOIST_API_KEY)
+    with contextlib.suppress(KeyboardInterrupt):
+        serve(args.socket, Agent(
+            api,
+            TaskIndex(config.SEARCH_INDEX_PATH),
+            config.SEARCH_INDEX_TTL_SECONDS,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""API call and runtime budgets for a scheduling run."""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from todoistScheduler.plan import Move, move_value
+
+# Upper bound of requests made by reschedule_task for one move:
+# reminder fetch, task update, reminder delete and reminder restore.
+CALLS_PER_MOVE = 4
+
+# Assumed request latency until a real one has been observed.
+DEFAULT_SECONDS_PER_CALL = 0.5
+
+
+class BudgetExceeded(Exception):
+    """Raised when a run would exceed its configured budget."""
+
+
+@dataclass
+class Budget:
+    """Tracks API calls spent by a run against optional limits.
+
+    With ``truncate`` set, an oversized plan is cut down to the most
+    valuable moves instead of being refused.
+    """
+    max_calls: Optional[int] = None
+    max_seconds: Optional[float] = None
+    truncate: bool = False
+    calls: int = 0
+    call_seconds: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+
+    def charge(self, calls: int = 1, seconds: float = 0.0) -> None:
+        """Record requests that have been made."""
+        self.calls += calls
+        self.call_seconds += seconds
+
+    def seconds_per_call(self) -> float:
+        """Observed mean request latency."""
+        if self.calls and self.call_seconds:
+            return self.call_seconds / self.calls
+        return DEFAULT_SECONDS_PER_CALL
+
+    def exhausted(self) -> bool:
+        """True once the calls or time already spent reach a limit."""
+        if self.max_calls is not None and self.calls >= self.max_calls:
+            return True
+        elapsed = time.monotonic() - self.started
+        return (
+            self.max_seconds is not None
+            and elapsed >= self.max_seconds
+        )
+
+    def estimate(self, moves: List[Move]) -> Tuple[int, float]:
+        """Projected calls and seconds needed to apply moves."""
+        calls = len(moves) * CALLS_PER_MOVE
+        return calls, calls * self.seconds_per_call()
+
+    def calls_left(self) -> float:
+        """How many more calls fit within the remaining budget."""
+        fits = float("inf")
+        if self.max_calls is not None:
+            fits = self.max_calls - self.calls
+        if self.max_seconds is not None:
+            left = (
+                self.max_seconds
+                - (time.monotonic() - self.started)
+            )
+            fits = min(fits, left // self.seconds_per_call())
+        return max(fits, 0)
+
+    def _affordable_moves(self) -> float:
+        """How many more moves fit within the remaining budget."""
+        calls = self.calls_left()
+        if calls == float("inf"):
+            return calls
+        return calls // CALLS_PER_MOVE
+
+    def fit(self, moves: List[Move]) -> Tuple[List[Move], List[Move]]:
+        """Split moves into those to apply now and those dropped.
+
+        Raises BudgetExceeded if the plan does not fit and the budget
+        is not allowed to truncate.
+        """
+        affordable = self._affordable_moves()
+        calls, seconds = self.estimate(moves)
+        logging.info(
+            "Plan needs ~%d API call(s), ~%.0fs (%d already spent)",
+            calls,
+            seconds,
+            self.calls,
+        )
+        if len(moves) <= affordable:
+            return moves, []
+        if not self.truncate:
+            raise BudgetExceeded(
+                f"Plan of {len(moves)} move(s) needs ~{calls} API"
+                f" call(s) and ~{seconds:.0f}s, over budget"
+                f" (max_calls={self.max_calls},"
+                f" max_seconds={self.max_seconds},"
+                f" spent={self.calls})"
+            )
+        ordered = sorted(moves, key=move_value)
+        keep = int(affordable)
+        return ordered[:keep], ordered[keep:]
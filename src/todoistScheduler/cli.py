@@ -5,13 +5,15 @@ import sys
 from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from dotenv import load_dotenv
+import requests
 from todoist_api_python.api import TodoistAPI
-
-load_dotenv()
+from todoist_api_python.models import Task
 
 import todoistScheduler.config as config
+from todoistScheduler.agent import request as agent_request
+from todoistScheduler.http_cache import CachingSession
 from todoistScheduler.reschedule import reschedule_task
+from todoistScheduler.search import TaskIndex
 
 
 def _get_today() -> date:
@@ -49,7 +51,11 @@ def build_parser() -> argparse.ArgumentParser:
     )
     parser.add_argument(
         "task_id",
-        help="The Todoist task ID to reschedule.",
+        help=(
+            "The Todoist task ID to reschedule, or words from"
+            " its content (e.g. \"pay rent\") to look up in"
+            " the local task index."
+        ),
     )
     parser.add_argument(
         "date",
@@ -59,6 +65,22 @@ def build_parser() -> argparse.ArgumentParser:
             " or 'tomorrow'."
         ),
     )
+    parser.add_argument(
+        "-s", "--search",
+        action="store_true",
+        help=(
+            "Treat TASK_ID as a content query even without"
+            " spaces."
+        ),
+    )
+    parser.add_argument(
+        "--no-agent",
+        action="store_true",
+        help=(
+            "Do not hand the request to a running"
+            " todoist-agent."
+        ),
+    )
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -67,6 +89,50 @@ def build_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def _make_session() -> requests.Session | None:
+    if config.HTTP_CACHE_DIR:
+        return CachingSession(
+            config.HTTP_CACHE_DIR, config.HTTP_CACHE_TTL_SECONDS,
+        )
+    return None
+
+
+def resolve_query(
+    query: str,
+    session: requests.Session | None = None,
+) -> Task:
+    """Find the task query refers to in the local task index.
+
+    The index is brought up to date with an incremental sync first
+    when it is older than SEARCH_INDEX_TTL_SECONDS. Exits with the
+    candidates listed when the query is ambiguous or matches nothing.
+    """
+    index = TaskIndex(config.SEARCH_INDEX_PATH)
+    if not index or index.is_stale(config.SEARCH_INDEX_TTL_SECONDS):
+        if not config.TODOIST_API_KEY:
+            print(
+                "Error: TODOIST_API_KEY environment"
+                " variable is not set.",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+        try:
+            index.refresh(config.TODOIST_API_KEY, session)
+        except Exception as exc:
+            if not index:
+                print(
+                    f"Error building the task index: {exc}",
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+            logging.warning("Using the task index as is: %s", exc)
+    try:
+        return index.resolve(query)
+    except LookupError as exc:
+        print(exc, file=sys.stderr)
+        sys.exit(1)
+
+
 def main(argv: list[str] | None = None) -> None:
     """Entry point for the CLI."""
     parser = build_parser()
@@ -75,6 +141,37 @@ def main(argv: list[str] | None = None) -> None:
     level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(level=level)
 
+    session = None
+    indexed = None
+    if args.search or any(c.isspace() for c in args.task_id):
+        session = _make_session()
+        indexed = resolve_query(args.task_id, session)
+        logging.info("Resolved to '%s' (%s)", indexed.content, indexed.id)
+        args.task_id = indexed.id
+
+    if not args.no_agent:
+        reply = agent_request(
+            config.AGENT_SOCKET,
+            {
+                "op": "reschedule",
+                "task_id": args.task_id,
+                "date": args.date.isoformat(),
+            },
+        )
+        if reply is not None:
+            if not reply.get("ok"):
+                print(
+                    reply.get("error", "Agent request failed"),
+                    file=sys.stderr,
+                )
+                sys.exit(1)
+            print(
+                f"Task '{reply['content']}'"
+                f" rescheduled to {args.date}."
+            )
+            return
+        logging.debug("No agent running; working in-process")
+
     if not config.TODOIST_API_KEY:
         print(
             "Error: TODOIST_API_KEY environment"
@@ -83,10 +180,13 @@ def main(argv: list[str] | None = None) -> None:
         )
         sys.exit(1)
 
-    api = TodoistAPI(config.TODOIST_API_KEY)
+    if session is None:
+        session = _make_session()
+    api = TodoistAPI(config.TODOIST_API_KEY, session=session)
 
     try:
-        task = api.get_task(task_id=args.task_id)
+        # A task found in the index needs no remote lookup
+        task = indexed or api.get_task(task_id=args.task_id)
     except Exception as exc:
         print(
             f"Error fetching task '{args.task_id}'"
@@ -1,6 +1,102 @@
 import os
+import tempfile
+
+from dotenv import load_dotenv
+
+# Settings may come from a .env file as well as the environment
+load_dotenv()
 
 TASKS_PER_DAY: int = 5
+# Per-project or per-label daily capacities, e.g. 'label:home=2,project:123=3'.
+# Tasks outside every bucket share TASKS_PER_DAY.
+CAPACITY_BUCKETS: str = os.environ.get('CAPACITY_BUCKETS', '')
+# Working hours like '09:00-17:00' to pack moved timed tasks into free
+# slots (empty: off); tasks without a duration take DEFAULT_TASK_MINUTES.
+WORK_HOURS: str = os.environ.get('WORK_HOURS', '')
+DEFAULT_TASK_MINUTES: int = int(os.environ.get('DEFAULT_TASK_MINUTES', '30'))
 IGNORE_TASK_TAG: str = 'no_reschedule'
 USER_TZ: str = os.environ.get('USER_TZ', 'America/New_York')
 TODOIST_API_KEY: str = os.environ.get('TODOIST_API_KEY', '')
+
+# Per-run budget; 0 disables a limit. BUDGET_MODE is 'refuse' or 'truncate'.
+MAX_API_CALLS: int = int(os.environ.get('MAX_API_CALLS', '0'))
+MAX_RUNTIME_SECONDS: float = float(os.environ.get('MAX_RUNTIME_SECONDS', '0'))
+BUDGET_MODE: str = os.environ.get('BUDGET_MODE', 'refuse')
+# Wall-clock time (HH:MM or ISO datetime) each run must finish by (empty: none).
+RUN_DEADLINE: str = os.environ.get('RUN_DEADLINE', '')
+
+# Planning horizon; 0 disables a limit. Overdue tasks beyond it OVERFLOW:
+# 'leave' them, 'label' them OVERFLOW_LABEL, or move them SOMEDAY_DAYS out.
+PLAN_HORIZON_DAYS: int = int(os.environ.get('PLAN_HORIZON_DAYS', '0'))
+MAX_MOVES: int = int(os.environ.get('MAX_MOVES', '0'))
+OVERFLOW: str = os.environ.get('OVERFLOW', 'leave')
+OVERFLOW_LABEL: str = os.environ.get('OVERFLOW_LABEL', 'overflow')
+SOMEDAY_DAYS: int = int(os.environ.get('SOMEDAY_DAYS', '90'))
+
+# Upcoming days whose tasks are fetched in the background while planning.
+PREFETCH_DEPTH: int = int(os.environ.get('PREFETCH_DEPTH', '0'))
+
+# Lease that keeps overlapping runs apart.
+# OVERLAP_POLICY is 'exit', 'wait' or 'coalesce'.
+LEASE_PATH: str = os.environ.get(
+    'LEASE_PATH',
+    os.path.join(tempfile.gettempdir(), 'todoistScheduler.lease'),
+)
+LEASE_TTL_SECONDS: float = float(os.environ.get('LEASE_TTL_SECONDS', '60'))
+OVERLAP_POLICY: str = os.environ.get('OVERLAP_POLICY', 'exit')
+
+# Unix socket of the warm todoist-agent used by todoist-reschedule.
+AGENT_SOCKET: str = os.environ.get(
+    'AGENT_SOCKET',
+    os.path.join(tempfile.gettempdir(), 'todoistScheduler.sock'),
+)
+
+# Check the account against the plan after each sweep.
+VERIFY_AFTER_APPLY: bool = os.environ.get('VERIFY_AFTER_APPLY', '') == '1'
+
+# Fingerprint and plan of the last run, used to skip unchanged runs.
+STATE_PATH: str = os.environ.get(
+    'STATE_PATH',
+    os.path.join(tempfile.gettempdir(), 'todoistScheduler.state.json'),
+)
+
+# Write an OpenTelemetry JSON trace of each run here (empty: off).
+TRACE_PATH: str = os.environ.get('TRACE_PATH', '')
+
+# Each live run records how to undo its moves in a log in this directory.
+UNDO_DIR: str = os.environ.get(
+    'UNDO_DIR',
+    os.path.join(tempfile.gettempdir(), 'todoistScheduler-undo'),
+)
+
+# Keep the planning window in the state file and read only what changed
+# since the last run with an incremental sync ('0': full reads).
+INCREMENTAL_PLANNING: bool = os.environ.get('INCREMENTAL_PLANNING', '1') == '1'
+
+# Before applying, check with one incremental sync for tasks edited since
+# they were read; their moves are dropped and replanned ('0': off).
+CONFLICT_CHECK: bool = os.environ.get('CONFLICT_CHECK', '1') == '1'
+
+# todoist-reschedule looks up tasks by content in this local index, which
+# is refreshed with an incremental sync once older than the TTL.
+SEARCH_INDEX_PATH: str = os.environ.get(
+    'SEARCH_INDEX_PATH',
+    os.path.join(tempfile.gettempdir(), 'todoistScheduler.index.json'),
+)
+SEARCH_INDEX_TTL_SECONDS: float = float(
+    os.environ.get('SEARCH_INDEX_TTL_SECONDS', '60')
+)
+
+# Moves that could not reach the API wait here for the next run.
+OUTBOX_PATH: str = os.environ.get(
+    'OUTBOX_PATH',
+    os.path.join(tempfile.gettempdir(), 'todoistScheduler.outbox.json'),
+)
+
+# Cache task reads here between runs (empty: off); responses without
+# ETag/Last-Modified are reused for HTTP_CACHE_TTL_SECONDS.
+HTTP_CACHE_DIR: str = os.environ.get('HTTP_CACHE_DIR', '')
+HTTP_CACHE_TTL_SECONDS: float = float(os.environ.get('HTTP_CACHE_TTL_SECONDS', '30'))
+
+# Debug records kept in memory and printed only when a run fails.
+DEBUG_BUFFER_SIZE: int = int(os.environ.get('DEBUG_BUFFER_SIZE', '1000'))
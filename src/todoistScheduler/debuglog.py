@@ -0,0 +1,79 @@
+"""Debug logging that costs little unless a run fails.
+
+``RingBufferHandler`` keeps the last debug records in memory without
+formatting them, and ``install`` wires it up next to a console
+handler at a higher level. The buffer is written out only when a run
+fails. Arguments wrapped in ``lazy`` are built only when a record is
+formatted, so expensive payloads are never computed for records that
+are dropped from the buffer unseen.
+"""
+import logging
+import sys
+from collections import deque
+from typing import Any, Callable, Deque, List, TextIO
+
+DEFAULT_CAPACITY = 1000
+
+# Handlers added by install, replaced when it is called again
+_installed: List[logging.Handler] = []
+
+
+class lazy:
+    """Log argument computed only when the message is formatted."""
+
+    __slots__ = ("_fn", "_args", "_kwargs")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self._fn(*self._args, **self._kwargs))
+
+    __repr__ = __str__
+
+
+class RingBufferHandler(logging.Handler):
+    """Holds the most recent records, unformatted, in a bounded deque."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        super().__init__(logging.DEBUG)
+        self.records: Deque[logging.LogRecord] = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+    def dump(self, stream: TextIO = sys.stderr) -> None:
+        """Format and write every buffered record, oldest first."""
+        stream.write(
+            f"--- last {len(self.records)} debug record(s) ---\n",
+        )
+        for record in list(self.records):
+            try:
+                stream.write(self.format(record) + "\n")
+            except Exception:
+                stream.write(f"<unformattable record: {record.msg!r}>\n")
+        stream.write("--- end of debug records ---\n")
+
+
+def install(
+    capacity: int = DEFAULT_CAPACITY,
+    console_level: int = logging.INFO,
+) -> RingBufferHandler:
+    """Log to the console at console_level and buffer everything else."""
+    root = logging.getLogger()
+    for handler in _installed:
+        root.removeHandler(handler)
+    root.setLevel(logging.DEBUG)
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    ring = RingBufferHandler(capacity)
+    ring.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s: %(message)s",
+    ))
+    root.addHandler(console)
+    root.addHandler(ring)
+    _installed[:] = [console, ring]
+    return ring
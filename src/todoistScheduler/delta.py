@@ -0,0 +1,122 @@
+"""Keep the planning window up to date with incremental syncs.
+
+A run keeps every task in its window (overdue and due up to the
+window end) in the run state, with the Sync token it was read at. The
+next run asks the Sync API only for items changed since that token and
+patches them in: completed, deleted or no longer eligible tasks drop
+out, new and edited ones are added or reclassified. Reading the window
+then costs one request whose size follows what changed, not how large
+the account is. Our own moves come back in the next delta as well.
+"""
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from todoist_api_python.models import Task
+
+from todoistScheduler.reschedule import _parse_task_date
+from todoistScheduler.snapshot import _task_from_record
+from todoistScheduler.verify import _sync
+
+
+def sync_items(
+    token: str,
+    sync_token: str,
+    session: requests.Session | None = None,
+) -> Tuple[str, List[Dict[str, Any]], bool]:
+    """Items changed since sync_token.
+
+    Returns the new sync token, the changed items and whether the
+    server answered with a full sync instead (every active item).
+    """
+    data = _sync(token, sync_token, ["items"], session)
+    return (
+        data["sync_token"],
+        data.get("items", []),
+        bool(data.get("full_sync")),
+    )
+
+
+def eligible(task: Task, ignore_tag: str, window_end: date) -> bool:
+    """True for tasks the window query would return."""
+    day = _parse_task_date(task)
+    return (
+        day is not None
+        and day <= window_end
+        and task.priority != 4
+        and ignore_tag not in (task.labels or [])
+    )
+
+
+def apply_delta(
+    tasks: Dict[str, Task],
+    items: Iterable[Dict[str, Any]],
+    ignore_tag: str,
+    window_end: date,
+) -> int:
+    """Patch the window tasks in place with changed Sync items.
+
+    Returns how many items touched the window.
+    """
+    touched = 0
+    for item in items:
+        task_id = str(item["id"])
+        task = None
+        if not item.get("is_deleted") and not item.get("checked"):
+            task = _task_from_record(dict(item, id=task_id))
+            if not eligible(task, ignore_tag, window_end):
+                task = None
+        if task is not None:
+            tasks[task_id] = task
+            touched += 1
+        elif tasks.pop(task_id, None) is not None:
+            touched += 1
+    return touched
+
+
+def refresh_window(
+    token: str,
+    sync_token: str,
+    tasks: Dict[str, Task],
+    ignore_tag: str,
+    window_end: date,
+    session: requests.Session | None = None,
+) -> str:
+    """Bring tasks up to date since sync_token; return the new token."""
+    new_token, items, full = sync_items(token, sync_token, session)
+    if full:
+        # The old token was not accepted; rebuild from scratch
+        tasks.clear()
+    touched = apply_delta(tasks, items, ignore_tag, window_end)
+    logging.info(
+        "Incremental sync: %d changed item(s), %d in the window",
+        len(items),
+        touched,
+    )
+    return new_token
+
+
+def changed_tasks(
+    token: str,
+    sync_token: str,
+    ignore_tag: str,
+    session: requests.Session | None = None,
+) -> Dict[str, Optional[Task]]:
+    """Tasks changed since sync_token, by id.
+
+    A task no longer eligible for scheduling (completed, deleted,
+    undated or excluded) maps to None. If the server cannot answer
+    incrementally, nothing is reported.
+    """
+    _, items, full = sync_items(token, sync_token, session)
+    if full:
+        logging.warning("Sync token not accepted; skipping conflict check")
+        return {}
+    tasks: Dict[str, Task] = {}
+    apply_delta(tasks, items, ignore_tag, date.max)
+    changed: Dict[str, Optional[Task]] = {
+        str(item["id"]): None for item in items
+    }
+    changed.update(tasks)
+    return changed
@@ -0,0 +1,131 @@
+"""Local cache of Todoist read responses, shared between runs.
+
+``CachingSession`` is a ``requests.Session`` that keeps successful GET
+responses on disk, keyed by URL (query included) and credentials. A
+cached response with an ``ETag`` or ``Last-Modified`` is revalidated
+with a conditional request, so an unchanged read costs a 304. One
+without validators is served as is for ``ttl`` seconds. Any write we
+send drops the whole cache, so our own updates are never read stale.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from todoistScheduler.transport import build_response
+
+# Response headers kept with a cached body
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+def _is_write(request: requests.PreparedRequest) -> bool:
+    """True unless the request only reads.
+
+    Sync API posts without commands are reads, as are GETs.
+    """
+    if request.method in ("GET", "HEAD"):
+        return False
+    if urlsplit(request.url or "").path.endswith("/sync"):
+        body = request.body or ""
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        return "commands" in parse_qs(body)
+    return True
+
+
+class CachingSession(requests.Session):
+    """Session answering repeated reads from a local cache."""
+
+    def __init__(self, directory: str, ttl: float = 30.0) -> None:
+        super().__init__()
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    def _path(self, request: requests.PreparedRequest) -> str:
+        key = f"{request.headers.get('Authorization', '')} {request.url}"
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.directory, digest + ".json")
+
+    def _load(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, path: str, entry: Dict[str, Any]) -> None:
+        # The cache holds account data; keep it private
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def invalidate(self) -> None:
+        """Forget every cached response."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            # Only touch the entries this cache wrote
+            if len(name) == 69 and name.endswith(".json"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.directory, name))
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        **kwargs: Any,
+    ) -> requests.Response:
+        if request.method != "GET":
+            if _is_write(request):
+                self.invalidate()
+            return super().send(request, **kwargs)
+
+        path = self._path(request)
+        entry = self._load(path)
+        if entry is not None:
+            headers = entry["headers"]
+            validated = "ETag" in headers or "Last-Modified" in headers
+            if not validated and time.time() - entry["stored_at"] < self.ttl:
+                self.hits += 1
+                logging.debug("Cache hit: %s", request.url)
+                return build_response(
+                    request, 200, headers, entry["body"].encode("utf-8"),
+                )
+            if "ETag" in headers:
+                request.headers["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        resp = super().send(request, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            logging.debug("Cache revalidated: %s", request.url)
+            entry["stored_at"] = time.time()
+            self._store(path, entry)
+            return build_response(
+                request, 200, entry["headers"],
+                entry["body"].encode("utf-8"),
+            )
+        self.misses += 1
+        if resp.status_code == 200:
+            self._store(path, {
+                "stored_at": time.time(),
+                "headers": {
+                    k: resp.headers[k]
+                    for k in _KEPT_HEADERS if k in resp.headers
+                },
+                "body": resp.content.decode("utf-8", errors="replace"),
+            })
+        return resp
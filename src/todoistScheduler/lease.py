@@ -0,0 +1,261 @@
+"""Run leases that keep scheduler sweeps from overlapping.
+
+A lease is held for ``ttl`` seconds and renewed by a heartbeat thread
+while the run is alive. A lease whose holder stopped renewing (crash,
+kill -9) is taken over once it expires.
+"""
+import contextlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Optional, Protocol, Tuple
+
+OVERLAP_POLICIES = ("exit", "wait", "coalesce")
+
+
+class LeaseBackend(Protocol):
+    """Storage for a single named lease."""
+
+    def try_acquire(self, owner: str, ttl: float) -> bool:
+        """Take the lease if it is free or expired."""
+
+    def renew(self, owner: str, ttl: float) -> bool:
+        """Extend a lease held by owner; False if it was lost."""
+
+    def release(self, owner: str) -> None:
+        """Give up a lease held by owner."""
+
+    def request_rerun(self) -> None:
+        """Ask the current holder to sweep once more before exiting."""
+
+    def take_rerun_request(self) -> bool:
+        """Consume a pending rerun request, if any."""
+
+
+class FileLeaseBackend:
+    """Lease stored in a local lock file.
+
+    A lease expires ``ttl`` seconds after the file was last modified,
+    and a heartbeat renews it by touching the file. The record is
+    written to a private file first and hard-linked into place, which
+    fails if the lease exists, so only one process acquires a free
+    lease and nobody sees it half-written. A stale lease is renamed
+    away before takeover, and checked again once renamed, so only one
+    process claims it and a lease renewed meanwhile is put back.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.rerun_path = path + ".rerun"
+
+    def _read(
+        self,
+        path: Optional[str] = None,
+    ) -> Optional[Tuple[Optional[dict], float]]:
+        """The record at path and the file's mtime; None if missing.
+
+        An unreadable record comes back as None, with the mtime.
+        """
+        try:
+            with open(path or self.path, encoding="utf-8") as f:
+                mtime = os.fstat(f.fileno()).st_mtime
+                try:
+                    return json.load(f), mtime
+                except ValueError:
+                    return None, mtime
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _expired(lease: Tuple[Optional[dict], float], ttl: float) -> bool:
+        # Unreadable leases count as held for our own ttl
+        record, mtime = lease
+        if record is not None:
+            ttl = record.get("ttl", ttl)
+        return mtime + ttl <= time.time()
+
+    def _record(self, owner: str, ttl: float) -> bytes:
+        return json.dumps({
+            "owner": owner,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "ttl": ttl,
+        }).encode()
+
+    def _claim(
+        self,
+        claimed: str,
+        keep: Callable[[Tuple[Optional[dict], float]], bool],
+    ) -> Optional[Tuple[Optional[dict], float]]:
+        """Rename the lease to claimed and return what was there.
+
+        If keep rejects it, it is linked back into place instead,
+        unless a new lease took its place meanwhile. Returns None
+        when there was no lease or it was put back.
+        """
+        try:
+            os.rename(self.path, claimed)
+        except FileNotFoundError:
+            return None
+        lease = self._read(claimed)
+        if lease is not None and keep(lease):
+            os.remove(claimed)
+            return lease
+        with contextlib.suppress(FileExistsError):
+            os.link(claimed, self.path)
+        os.remove(claimed)
+        return None
+
+    def try_acquire(self, owner: str, ttl: float) -> bool:
+        tmp = f"{self.path}.{owner}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self._record(owner, ttl))
+        try:
+            for _ in range(2):
+                try:
+                    os.link(tmp, self.path)
+                    return True
+                except FileExistsError:
+                    pass
+                current = self._read()
+                if current is None:
+                    continue
+                if not self._expired(current, ttl):
+                    return False
+                # Only the lease judged stale may be taken over
+                stale = self._claim(
+                    f"{self.path}.stale-{owner}",
+                    lambda lease, judged=current: lease == judged,
+                )
+                if stale is not None:
+                    record = stale[0] or {}
+                    logging.warning(
+                        "Took over stale lease from %s (pid %s)",
+                        record.get("owner"),
+                        record.get("pid"),
+                    )
+            return False
+        finally:
+            os.remove(tmp)
+
+    def _owned_by(self, owner: str, ttl: Optional[float] = None) -> bool:
+        """True if owner holds the lease, unexpired when ttl is given."""
+        current = self._read()
+        return (
+            current is not None
+            and current[0] is not None
+            and current[0].get("owner") == owner
+            and (ttl is None or not self._expired(current, ttl))
+        )
+
+    def renew(self, owner: str, ttl: float) -> bool:
+        # An expired lease may be being taken over; it is lost
+        if not self._owned_by(owner, ttl):
+            return False
+        try:
+            # Touching cannot overwrite a lease taken over meanwhile
+            os.utime(self.path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def release(self, owner: str) -> None:
+        if self._owned_by(owner):
+            self._claim(
+                f"{self.path}.released-{owner}",
+                lambda lease: (lease[0] or {}).get("owner") == owner,
+            )
+
+    def request_rerun(self) -> None:
+        with open(self.rerun_path, "a", encoding="utf-8"):
+            pass
+
+    def take_rerun_request(self) -> bool:
+        try:
+            os.remove(self.rerun_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+
+class RunLease:
+    """Context manager holding a lease for the duration of a run.
+
+    When another run holds the lease, ``policy`` decides what happens:
+    ``exit`` gives up at once, ``wait`` polls until the lease frees up
+    (or ``wait_timeout`` passes), and ``coalesce`` asks the holder to
+    sweep again when it finishes, then gives up. Check ``acquired``
+    after entering.
+    """
+
+    def __init__(
+        self,
+        backend: LeaseBackend,
+        ttl: float = 60.0,
+        policy: str = "exit",
+        wait_timeout: Optional[float] = None,
+        poll_interval: float = 1.0,
+    ) -> None:
+        if policy not in OVERLAP_POLICIES:
+            raise ValueError(f"Unknown overlap policy: '{policy}'")
+        self.backend = backend
+        self.ttl = ttl
+        self.policy = policy
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.owner = uuid.uuid4().hex
+        self.acquired = False
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "RunLease":
+        deadline = (
+            time.monotonic() + self.wait_timeout
+            if self.wait_timeout is not None else None
+        )
+        while not self.backend.try_acquire(self.owner, self.ttl):
+            if self.policy == "coalesce":
+                self.backend.request_rerun()
+                logging.info(
+                    "Another run holds the lease; asked it to rerun"
+                )
+                return self
+            if self.policy == "exit" or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                logging.info("Another run holds the lease")
+                return self
+            time.sleep(self.poll_interval)
+        self.acquired = True
+        # This sweep covers anything requested before it started
+        self.backend.take_rerun_request()
+        self._heartbeat = threading.Thread(
+            target=self._renew_until_stopped,
+            name="lease-heartbeat",
+            daemon=True,
+        )
+        self._heartbeat.start()
+        return self
+
+    def _renew_until_stopped(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            if not self.backend.renew(self.owner, self.ttl):
+                logging.error("Lost the run lease to another process")
+                return
+
+    def rerun_requested(self) -> bool:
+        """True if an overlapping run coalesced into this one."""
+        return self.acquired and self.backend.take_rerun_request()
+
+    def __exit__(self, *exc_info: object) -> None:
+        if not self.acquired:
+            return
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        self.backend.release(self.owner)
+        self.acquired = False
@@ -1,55 +1,639 @@
+import argparse
+import functools
 import logging
-from datetime import datetime
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Tuple
 from zoneinfo import ZoneInfo
 
+import requests
 from todoist_api_python.api import TodoistAPI
+from todoist_api_python.models import Task
 
 import todoistScheduler.config as config
-from todoistScheduler.scheduler import Scheduler
+from todoistScheduler.budget import Budget
+from todoistScheduler.debuglog import install as install_logging
+from todoistScheduler.delta import changed_tasks, refresh_window
+from todoistScheduler.http_cache import CachingSession
+from todoistScheduler.lease import (
+    OVERLAP_POLICIES,
+    FileLeaseBackend,
+    RunLease,
+)
+from todoistScheduler.outbox import Outbox, is_transient
+from todoistScheduler.overflow import OVERFLOW_STRATEGIES, Horizon, move_tasks
+from todoistScheduler.reschedule import reschedule_task
+from todoistScheduler.scheduler import (
+    Rescheduler,
+    Scheduler,
+    parse_capacity_buckets,
+)
+from todoistScheduler.simulate import config_grid, format_results, simulate
+from todoistScheduler.slots import SlotPacker, parse_work_hours
+from todoistScheduler.snapshot import (
+    Snapshot,
+    SnapshotAPI,
+    export_snapshot,
+    label_in_snapshot,
+    move_in_snapshot,
+    reschedule_in_snapshot,
+)
+from todoistScheduler.state import RunState, fingerprint
+from todoistScheduler.tracing import span, start_tracing, stop_tracing
+from todoistScheduler.transport import (
+    SCRUBBED,
+    Cassette,
+    RecordingSession,
+    ReplaySession,
+)
+from todoistScheduler.undo import UndoLog, latest_undo_log, undo_run
+from todoistScheduler.verify import get_sync_token, verify_moves
+from todoistScheduler.window import fetch_window, split_window
 
-logging.basicConfig(level=logging.DEBUG)
 
+def read_window(
+    api: TodoistAPI,
+    today: date,
+    window_end: date,
+    ignore_tag: str,
+    state: RunState | None = None,
+) -> Tuple[List[Task], Dict[date, List[Task]], str | None]:
+    """Read the window, incrementally when state allows it.
+
+    With a state holding window tasks and a sync token for the same
+    tag and a window at least as long, only the changes since that
+    token are fetched. Otherwise the window is read in full, after
+    taking a fresh sync token. Without a state the window is read in
+    full and no token is returned.
+    """
+    if state is None:
+        return (*fetch_window(api, today, window_end, ignore_tag), None)
+    if (
+        state.sync_token
+        and state.ignore_tag == ignore_tag
+        and state.window_end
+        and date.fromisoformat(state.window_end) >= window_end
+    ):
+        tasks = state.window_tasks()
+        sync_token = refresh_window(
+            api._token, state.sync_token, tasks, ignore_tag, window_end,
+            api._session,
+        )
+        return (*split_window(tasks.values(), today, window_end), sync_token)
+    sync_token = get_sync_token(api._token, api._session)
+    return (*fetch_window(api, today, window_end, ignore_tag), sync_token)
+
+
+def deadline_from(value: str, now: datetime) -> float:
+    """Convert a wall-clock deadline to a time.monotonic() reading.
+
+    Accepts HH:MM (the next time that clock time comes round, so a
+    time already past today means tomorrow) or an ISO datetime, both
+    in now's timezone unless the datetime carries its own.
+    """
+    try:
+        at = datetime.combine(
+            now.date(),
+            datetime.strptime(value, "%H:%M").time(),
+            now.tzinfo,
+        )
+        if at <= now:
+            at += timedelta(days=1)
+    except ValueError:
+        at = datetime.fromisoformat(value)
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=now.tzinfo)
+    return time.monotonic() + (at - now).total_seconds()
+
+
+def _worker_api(api: TodoistAPI) -> Callable[[], TodoistAPI] | None:
+    """Client factory for day-load prefetch workers, if they may run.
+
+    Each worker gets its own session. Recording, replaying and caching
+    sessions carry state every request must share, so runs using one
+    get no factory and do not prefetch.
+    """
+    if type(api._session) is requests.Session:
+        return functools.partial(TodoistAPI, api._token)
+    return None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build and return the argument parser."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Reschedule overdue Todoist tasks"
+            " across the coming days."
+        ),
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="PATH",
+        help=(
+            "Plan against a snapshot file instead of"
+            " the live account. Nothing is written back."
+        ),
+    )
+    parser.add_argument(
+        "--max-api-calls",
+        type=int,
+        default=config.MAX_API_CALLS,
+        metavar="N",
+        help="Refuse runs needing more than N API calls (0: no limit).",
+    )
+    parser.add_argument(
+        "--max-runtime",
+        type=float,
+        default=config.MAX_RUNTIME_SECONDS,
+        metavar="SECONDS",
+        help="Refuse runs projected to take longer (0: no limit).",
+    )
+    parser.add_argument(
+        "--budget-mode",
+        choices=["refuse", "truncate"],
+        default=config.BUDGET_MODE,
+        help=(
+            "On an over-budget plan, refuse to run or apply"
+            " only the highest-priority moves that fit."
+        ),
+    )
+    parser.add_argument(
+        "--on-overlap",
+        choices=OVERLAP_POLICIES,
+        default=config.OVERLAP_POLICY,
+        help=(
+            "What to do when another run is in progress: exit,"
+            " wait for it, or coalesce into it."
+        ),
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        default=config.VERIFY_AFTER_APPLY,
+        help=(
+            "After applying, check the account against the"
+            " plan with one incremental sync."
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Plan even if the inputs match the last run's.",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        default=config.TRACE_PATH or None,
+        help="Write the run's timing spans to PATH as OTLP JSON.",
+    )
+    parser.add_argument(
+        "--deadline",
+        default=config.RUN_DEADLINE or None,
+        metavar="TIME",
+        help=(
+            "Finish by TIME (HH:MM or ISO datetime): apply the most"
+            " valuable moves first and defer what does not fit."
+        ),
+    )
+    parser.add_argument(
+        "--horizon-days",
+        type=int,
+        default=config.PLAN_HORIZON_DAYS,
+        metavar="N",
+        help="Plan at most N days ahead (0: no limit).",
+    )
+    parser.add_argument(
+        "--max-moves",
+        type=int,
+        default=config.MAX_MOVES,
+        metavar="N",
+        help="Plan at most N moves per run (0: no limit).",
+    )
+    parser.add_argument(
+        "--overflow",
+        choices=OVERFLOW_STRATEGIES,
+        default=config.OVERFLOW,
+        help=(
+            "What to do with overdue tasks beyond the horizon:"
+            " leave them, label them, or move them to a someday date."
+        ),
+    )
+    parser.add_argument(
+        "--prefetch-depth",
+        type=int,
+        default=config.PREFETCH_DEPTH,
+        metavar="N",
+        help=(
+            "Fetch up to N upcoming days' tasks in the background"
+            " while planning (0: one day at a time)."
+        ),
+    )
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help=(
+            "Print debug logging. Otherwise the last DEBUG_BUFFER_SIZE"
+            " debug records are printed only if the run fails."
+        ),
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="Record the run's HTTP traffic to a cassette file.",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help=(
+            "Run against the responses in a cassette file"
+            " instead of the network."
+        ),
+    )
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0.0,
+        metavar="SCALE",
+        help=(
+            "Multiply recorded response times when replaying"
+            " (0: no delay, 1: original pace)."
+        ),
+    )
+    commands = parser.add_subparsers(dest="command")
+    export = commands.add_parser(
+        "export",
+        help="Write a snapshot of the account to a file.",
+    )
+    export.add_argument("path", help="Snapshot file to write.")
+    simulate = commands.add_parser(
+        "simulate",
+        help="Compare scheduler settings against a snapshot.",
+    )
+    simulate.add_argument("path", help="Snapshot file to plan against.")
+    simulate.add_argument(
+        "--tasks-per-day",
+        type=lambda v: [int(n) for n in v.split(",")],
+        default=[config.TASKS_PER_DAY],
+        metavar="N[,N...]",
+        help="Daily limits to try.",
+    )
+    simulate.add_argument(
+        "--ignore-tag",
+        action="append",
+        metavar="TAG",
+        help="Ignore tag to try; repeat for several.",
+    )
+    simulate.add_argument(
+        "--buckets",
+        action="append",
+        metavar="SPEC",
+        help="CAPACITY_BUCKETS spec to try; repeat for several.",
+    )
+    simulate.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="Worker processes (default: one per CPU).",
+    )
+    undo = commands.add_parser(
+        "undo",
+        help="Move the tasks of a past run back where they were.",
+    )
+    undo.add_argument(
+        "path",
+        nargs="?",
+        help="Undo log to roll back (default: the latest run's).",
+    )
+    return parser
 
-def main() -> None:
-    """Main function to run the Todoist scheduler."""
-    api = TodoistAPI(config.TODOIST_API_KEY)
-    today = datetime.now(ZoneInfo(config.USER_TZ)).date()
 
+def run_sweep(
+    api: TodoistAPI,
+    today: date,
+    args: argparse.Namespace,
+    reschedule: Rescheduler | None,
+) -> None:
+    """Fetch overdue tasks, plan their moves and apply them."""
+    use_state = not (args.snapshot or args.replay)
+    state = RunState.load(config.STATE_PATH) if use_state else RunState()
+    window_end = today
+    if state.window_end:
+        window_end = max(today, date.fromisoformat(state.window_end))
+    settings = {
+        "tasks_per_day": config.TASKS_PER_DAY,
+        "ignore_tag": config.IGNORE_TASK_TAG,
+        "capacity_buckets": config.CAPACITY_BUCKETS,
+        "work_hours": config.WORK_HOURS,
+        "horizon_days": args.horizon_days,
+        "max_moves": args.max_moves,
+        "overflow": args.overflow,
+    }
+
+    # Writing to the account, not a snapshot, a replay or a test double
+    live = reschedule is None and not args.replay
+    outbox = None
+    undo_log = None
+    if live:
+        # Even a run that moves nothing becomes the one to undo
+        undo_log = UndoLog.create(config.UNDO_DIR)
+        outbox = Outbox(config.OUTBOX_PATH)
+        if outbox:
+            try:
+                outbox.flush(api._token, api._session)
+            except requests.RequestException as exc:
+                if not is_transient(exc):
+                    raise
+                logging.warning(
+                    "Todoist still unreachable; %d queued task(s) kept: %s",
+                    len(outbox), exc,
+                )
+
+    incremental = use_state and config.INCREMENTAL_PLANNING
+    check_conflicts = live and config.CONFLICT_CHECK
+    logging.info("Getting overdue tasks...")
+    started = time.monotonic()
+    with span("overdue.fetch", window_end=window_end.isoformat()) as trace:
+        read_token = None
+        if check_conflicts and not incremental:
+            # Marks the versions of everything read below
+            read_token = get_sync_token(api._token, api._session)
+        overdue_tasks, day_loads, sync_token = read_window(
+            api, today, window_end, config.IGNORE_TASK_TAG,
+            state if incremental else None,
+        )
+        read_token = read_token or sync_token
+        trace.set_attribute("overdue", len(overdue_tasks))
+    elapsed = time.monotonic() - started
+    inputs = overdue_tasks + [t for ts in day_loads.values() for t in ts]
+    current = fingerprint(today, settings, inputs)
+    if use_state and not args.force and current == state.fingerprint:
+        logging.info("Inputs unchanged since the last run; nothing to do.")
+        if sync_token is not None:
+            # Keep the next delta small
+            state.record_window(inputs, sync_token, config.IGNORE_TASK_TAG)
+            state.save(config.STATE_PATH)
+        return
+
+    budget = Budget(
+        max_calls=args.max_api_calls or None,
+        max_seconds=args.max_runtime or None,
+        truncate=args.budget_mode == "truncate",
+    )
+    budget.charge(1, elapsed)
+    deadline = None
+    if args.deadline:
+        deadline = deadline_from(
+            args.deadline, datetime.now(ZoneInfo(config.USER_TZ)),
+        )
+    horizon = None
+    if args.horizon_days or args.max_moves or args.overflow != "leave":
+        horizon = Horizon(
+            days=args.horizon_days or None,
+            max_moves=args.max_moves or None,
+            strategy=args.overflow,
+            label=config.OVERFLOW_LABEL,
+            someday=today + timedelta(days=config.SOMEDAY_DAYS),
+        )
+    slots = None
+    if config.WORK_HOURS:
+        slots = SlotPacker(
+            parse_work_hours(config.WORK_HOURS),
+            config.DEFAULT_TASK_MINUTES,
+        )
+    prefetch_depth = args.prefetch_depth
+    workers = None
+    if prefetch_depth and isinstance(api, TodoistAPI):
+        workers = _worker_api(api)
+        if workers is None:
+            logging.info("Prefetch is off for recorded, replayed and cached runs")
+            prefetch_depth = 0
+    conflicts = None
+    if check_conflicts and read_token:
+        conflicts = functools.partial(
+            changed_tasks, api._token, read_token, config.IGNORE_TASK_TAG,
+            api._session,
+        )
+    mover = move_in_snapshot if args.snapshot else None
+    if live:
+        reschedule = functools.partial(
+            reschedule_task, undo_log=undo_log, outbox=outbox,
+        )
+        mover = functools.partial(move_tasks, undo_log=undo_log)
     scheduler_instance = Scheduler(
         api=api,
         today=today,
         tasks_per_day=config.TASKS_PER_DAY,
         ignore_tag=config.IGNORE_TASK_TAG,
+        reschedule=reschedule,
+        budget=budget,
+        day_loads=day_loads,
+        buckets=parse_capacity_buckets(config.CAPACITY_BUCKETS),
+        prefetch_depth=prefetch_depth,
+        horizon=horizon,
+        labeler=label_in_snapshot if args.snapshot else None,
+        mover=mover,
+        deadline=deadline,
+        slots=slots,
+        conflicts=conflicts,
+        worker_api=workers,
     )
 
-    logging.info("Getting overdue tasks...")
-    overdue_tasks = [
-        task
-        for page in api.filter_tasks(
-            query=(
-                "overdue & ! p1"
-                f" & ! @{config.IGNORE_TASK_TAG}"
+    verify = args.verify and not args.snapshot
+    if verify:
+        verify_token = get_sync_token(api._token, api._session)
+
+    moves = scheduler_instance.schedule_and_push_down(overdue_tasks)
+    if undo_log is not None and moves:
+        logging.info("Undo log written to %s", undo_log.path)
+
+    if verify and moves:
+        verify_moves(api._token, verify_token, moves, api._session)
+
+    if scheduler_instance.deferred:
+        logging.warning(
+            "%d task(s) deferred to the next run",
+            len(scheduler_instance.deferred),
+        )
+    if use_state:
+        if scheduler_instance.deferred:
+            # Leave the next run free to pick up what was deferred
+            state = RunState()
+        else:
+            if moves:
+                # Fingerprint the state this run left behind
+                new_end = max(window_end, *(m.day for m in moves))
+                carried = RunState() if incremental else None
+                fetched = scheduler_instance.fetched
+                if sync_token is not None and all(
+                    window_end + timedelta(days=i) in fetched
+                    for i in range(1, (new_end - window_end).days + 1)
+                ):
+                    # Every day of the longer window has been read, so
+                    # the delta since sync_token (our moves included)
+                    # completes it
+                    carried = RunState(window_end=new_end.isoformat())
+                    carried.record_window(
+                        inputs + [t for ts in fetched.values() for t in ts],
+                        sync_token,
+                        config.IGNORE_TASK_TAG,
+                    )
+                window_end = new_end
+                overdue_tasks, day_loads, sync_token = read_window(
+                    api, today, window_end, config.IGNORE_TASK_TAG,
+                    carried,
+                )
+                inputs = overdue_tasks + [
+                    t for ts in day_loads.values() for t in ts
+                ]
+                current = fingerprint(today, settings, inputs)
+            state = RunState(
+                fingerprint=current,
+                window_end=window_end.isoformat(),
             )
+            state.record_plan(moves)
+            if sync_token is not None:
+                state.record_window(
+                    inputs, sync_token, config.IGNORE_TASK_TAG,
+                )
+        state.save(config.STATE_PATH)
+
+    logging.info("Scheduling complete.")
+
+
+def _run(
+    api: TodoistAPI | None,
+    today: date,
+    args: argparse.Namespace,
+    reschedule: Rescheduler | None,
+) -> None:
+    """Run the requested command.
+
+    Only simulate, which reads its own snapshots, runs without api.
+    """
+    if args.command == "export":
+        export_snapshot(api, today).write(args.path)
+        logging.info("Snapshot written to %s", args.path)
+        return
+
+    if args.command == "simulate":
+        configs = config_grid(
+            args.tasks_per_day,
+            args.ignore_tag or [config.IGNORE_TASK_TAG],
+            args.buckets or [config.CAPACITY_BUCKETS],
         )
-        for task in page
-    ]
+        results = simulate(args.path, configs, args.workers)
+        print(format_results(results))
+        return
 
-    today_str = today.strftime("%Y-%m-%d")
-    # filter out tasks that are due today because Todoist
-    # has a weird idea about what overdue means
-    overdue_tasks = [
-        t for t in overdue_tasks if
-          t.due is not None and
-          t.due.date != today_str
-    ]
+    if api is None:
+        raise ValueError(f"'{args.command or 'run'}' needs a Todoist client")
 
-    scheduler_instance.schedule_and_push_down(overdue_tasks)
+    if args.command == "undo":
+        path = args.path or latest_undo_log(config.UNDO_DIR)
+        if path is None:
+            logging.info("No run to undo.")
+            return
+        undo_run(api._token, path, api._session)
+        return
 
-    logging.info("Scheduling complete.")
+    if args.snapshot or args.replay:
+        run_sweep(api, today, args, reschedule)
+        return
+
+    lease = RunLease(
+        FileLeaseBackend(config.LEASE_PATH),
+        ttl=config.LEASE_TTL_SECONDS,
+        policy=args.on_overlap,
+    )
+    with lease:
+        if not lease.acquired:
+            logging.info("Skipping this run.")
+            return
+        run_sweep(api, today, args, reschedule)
+        while lease.rerun_requested():
+            logging.info("Running again for a coalesced request...")
+            run_sweep(api, today, args, reschedule)
+
+
+def main(argv: List[str] | None = None) -> None:
+    """Main function to run the Todoist scheduler."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    debug_buffer = install_logging(
+        config.DEBUG_BUFFER_SIZE,
+        logging.DEBUG if args.verbose else logging.INFO,
+    )
+    try:
+        _main(parser, args)
+    except Exception:
+        if not args.verbose:
+            debug_buffer.dump()
+        raise
+
+
+def _main(
+    parser: argparse.ArgumentParser,
+    args: argparse.Namespace,
+) -> None:
+    """Run the scheduler with parsed arguments."""
+    if args.command == "export" and args.snapshot:
+        parser.error("export reads the live account; drop --snapshot")
+    if args.command == "undo" and args.snapshot:
+        parser.error("undo changes the live account; drop --snapshot")
+    if sum(map(bool, (args.snapshot, args.record, args.replay))) > 1:
+        parser.error("use only one of --snapshot, --record and --replay")
+
+    if args.command == "simulate":
+        if args.snapshot or args.record or args.replay:
+            parser.error("simulate reads its own snapshot; drop the option")
+        today = datetime.now(ZoneInfo(config.USER_TZ)).date()
+        _run(None, today, args, None)
+        return
+
+    if args.snapshot:
+        snapshot = Snapshot.read(args.snapshot)
+        api = SnapshotAPI(snapshot)
+        today = snapshot.today
+        reschedule = reschedule_in_snapshot
+    elif args.replay:
+        cassette = Cassette.read(args.replay)
+        api = TodoistAPI(
+            SCRUBBED,
+            session=ReplaySession(cassette, args.replay_latency),
+        )
+        today = date.fromisoformat(cassette.meta["today"])
+        reschedule = None
+    else:
+        session = None
+        if args.record:
+            session = RecordingSession(config.TODOIST_API_KEY)
+        elif config.HTTP_CACHE_DIR:
+            session = CachingSession(
+                config.HTTP_CACHE_DIR, config.HTTP_CACHE_TTL_SECONDS,
+            )
+        api = TodoistAPI(config.TODOIST_API_KEY, session=session)
+        today = datetime.now(ZoneInfo(config.USER_TZ)).date()
+        reschedule = None
+
+    if args.trace:
+        start_tracing()
+    try:
+        with span("run", today=today.isoformat()):
+            _run(api, today, args, reschedule)
+    finally:
+        if args.record:
+            cassette = api._session.cassette
+            cassette.meta["today"] = today.isoformat()
+            cassette.write(args.record)
+            logging.info("Cassette written to %s", args.record)
+        tracer = stop_tracing()
+        if tracer is not None:
+            tracer.write(args.trace)
+            logging.info("Trace written to %s", args.trace)
 
 
 if __name__ == "__main__":
     try:
         main()
     except Exception as e:
-        print(e)
\ No newline at end of file
+        print(e)
@@ -0,0 +1,220 @@
+"""Persistent queue of writes that could not reach the API.
+
+When a move fails with a network error or a throttling/server
+response, its task update and reminder operations are kept here
+instead of being lost. Operations on the same task are merged into
+one final state: the last target day wins, every reminder to delete
+is kept, and reminders to recreate are shifted to the final day when
+the outbox is flushed. A flush sends everything as batched Sync
+commands, so a flaky period costs one bulk submission.
+"""
+import contextlib
+import json
+import logging
+import os
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import requests
+from todoist_api_python.models import Task
+
+from todoistScheduler.private import open_private
+from todoistScheduler.reminders import (
+    reminder_add_command,
+    reminder_delete_command,
+)
+from todoistScheduler.sync import CommandSubmitter, SyncResult
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True for errors worth queueing rather than reporting."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        code = exc.response.status_code
+        return code == 429 or code >= 500
+    return False
+
+
+class Outbox:
+    """Pending per-task operations, stored as one JSON file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            logging.warning(
+                "Ignoring unreadable outbox %s", path, exc_info=True,
+            )
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self) -> None:
+        """Write the outbox atomically, or remove it when empty."""
+        if not self.entries:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.path)
+            return
+        tmp = self.path + ".tmp"
+        with open_private(tmp) as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+    def add(
+        self,
+        task: Task,
+        day: date,
+        due_string: Optional[str] = None,
+        delete_ids: Optional[List[str]] = None,
+        reminders: Optional[List[Dict[str, Any]]] = None,
+        from_day: Optional[date] = None,
+    ) -> None:
+        """Queue operations for task, merged with any already queued.
+
+        reminders are recreated shifted by the days from from_day to
+        the task's final day.
+        """
+        entry = self.entries.setdefault(task.id, {
+            "content": task.content,
+            "due_string": None,
+            "day": None,
+            "delete_ids": [],
+            "reminders": [],
+        })
+        entry["day"] = day.isoformat()
+        if due_string is not None:
+            entry["due_string"] = due_string
+        for rid in delete_ids or []:
+            if rid not in entry["delete_ids"]:
+                entry["delete_ids"].append(rid)
+        base = (from_day or day).isoformat()
+        for r in reminders or []:
+            # A reminder queued again is replaced by its newer copy
+            entry["reminders"] = [
+                q for q in entry["reminders"]
+                if "id" not in r or q["reminder"].get("id") != r["id"]
+            ]
+            entry["reminders"].append({"reminder": r, "from_day": base})
+        self.save()
+        logging.info(
+            "Queued changes for '%s' in the outbox (%d task(s) pending)",
+            task.content,
+            len(self.entries),
+        )
+
+    def moved(self, task: Task, day: date) -> None:
+        """Note that task was just moved to day directly.
+
+        A queued update for it is stale and dropped; queued reminders
+        are recreated relative to the new day instead.
+        """
+        entry = self.entries.get(task.id)
+        if entry is None:
+            return
+        entry["due_string"] = None
+        entry["day"] = day.isoformat()
+        if not entry["delete_ids"] and not entry["reminders"]:
+            del self.entries[task.id]
+        self.save()
+
+    def _commands(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Sync commands per queued task, in apply order."""
+        commands = {}
+        for task_id, entry in self.entries.items():
+            day = date.fromisoformat(entry["day"])
+            task_commands = []
+            if entry["due_string"] is not None:
+                task_commands.append({
+                    "type": "item_update",
+                    "uuid": str(uuid.uuid4()),
+                    "args": {
+                        "id": task_id,
+                        "due": {"string": entry["due_string"]},
+                    },
+                })
+            task_commands.extend(
+                reminder_delete_command(rid) for rid in entry["delete_ids"]
+            )
+            for queued in entry["reminders"]:
+                delta = (day - date.fromisoformat(queued["from_day"])).days
+                task_commands.append(
+                    reminder_add_command(queued["reminder"], delta),
+                )
+            commands[task_id] = task_commands
+        return commands
+
+    def flush(
+        self,
+        token: str,
+        session: requests.Session | None = None,
+        submitter: CommandSubmitter | None = None,
+    ) -> SyncResult:
+        """Send every queued operation in bulk.
+
+        Updates go first and recreated reminders last. Tasks whose
+        commands all succeeded leave the outbox; for the rest only the
+        operations that failed or were not sent stay queued, also when
+        the submission raises.
+        """
+        if not self.entries:
+            return SyncResult()
+        per_task = self._commands()
+        updates, deletes, adds = [], [], []
+        for task_commands in per_task.values():
+            for command in task_commands:
+                {
+                    "item_update": updates,
+                    "reminder_delete": deletes,
+                    "reminder_add": adds,
+                }[command["type"]].append(command)
+        logging.info(
+            "Flushing %d queued task(s) as %d Sync command(s)",
+            len(per_task),
+            len(updates) + len(deletes) + len(adds),
+        )
+        submitter = submitter or CommandSubmitter(token, session)
+        result = SyncResult()
+        try:
+            submitter.submit(updates + deletes + adds, result)
+        finally:
+            # Batches applied before an error must not be sent again
+            for task_id, task_commands in per_task.items():
+                self._drop_sent(task_id, task_commands, result)
+            self.save()
+        return result
+
+    def _drop_sent(
+        self,
+        task_id: str,
+        task_commands: List[Dict[str, Any]],
+        result: SyncResult,
+    ) -> None:
+        """Remove the operations of task_id that the server applied."""
+        entry = self.entries[task_id]
+        done = []
+        for command in task_commands:
+            outcome = result.outcome(command["uuid"])
+            done.append(outcome is not None and outcome.ok)
+        if all(done):
+            del self.entries[task_id]
+            return
+        adds = []
+        for command, ok in zip(task_commands, done, strict=True):
+            if command["type"] == "item_update" and ok:
+                entry["due_string"] = None
+            elif command["type"] == "reminder_delete" and ok:
+                entry["delete_ids"].remove(command["args"]["id"])
+            elif command["type"] == "reminder_add":
+                adds.append(ok)
+        entry["reminders"] = [
+            queued
+            for queued, ok in zip(entry["reminders"], adds, strict=True)
+            if not ok
+        ]
@@ -0,0 +1,155 @@
+"""Planning horizon and what happens to tasks beyond it.
+
+A run plans at most ``days`` days ahead and at most ``max_moves``
+moves. Overdue tasks that do not fit are its overflow, handled by one
+of three strategies: ``leave`` them overdue, ``label`` them all in one
+batched Sync submission, or move them to a single ``someday`` date,
+batched the same way. Either way the number of day queries a run makes stays bounded
+however large the backlog is.
+"""
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from todoist_api_python.models import Task
+
+from todoistScheduler.plan import Move
+from todoistScheduler.reminders import (
+    iter_reminders,
+    reminder_add_command,
+    reminder_delete_command,
+)
+from todoistScheduler.reschedule import compute_due_strings, original_due_string
+from todoistScheduler.sync import CommandSubmitter, SyncResult
+from todoistScheduler.undo import UndoLog
+
+OVERFLOW_STRATEGIES = ("leave", "label", "someday")
+
+Labeler = Callable[[Any, List[Task], str], None]
+
+Mover = Callable[[Any, List[Task], date], None]
+
+
+@dataclass
+class Horizon:
+    """How far a run may plan, and what to do with the rest."""
+    days: Optional[int] = None
+    max_moves: Optional[int] = None
+    strategy: str = "leave"
+    label: str = "overflow"
+    someday: Optional[date] = None
+
+    def __post_init__(self) -> None:
+        if self.strategy not in OVERFLOW_STRATEGIES:
+            raise ValueError(
+                f"Unknown overflow strategy: '{self.strategy}'"
+            )
+        if self.strategy == "someday" and self.someday is None:
+            raise ValueError("The someday strategy needs a someday date")
+
+    def reached(self, days_planned: int, moves: int) -> bool:
+        """True once no further day may be planned."""
+        return (
+            (self.days is not None and days_planned >= self.days)
+            or (self.max_moves is not None and moves >= self.max_moves)
+        )
+
+
+def label_tasks(
+    api: Any,
+    tasks: List[Task],
+    label: str,
+    submitter: CommandSubmitter | None = None,
+) -> SyncResult:
+    """Add label to tasks with batched Sync commands.
+
+    Tasks that already carry the label are skipped, so overflow that
+    stays overdue costs nothing on later runs.
+    """
+    commands = [
+        {
+            "type": "item_update",
+            "uuid": str(uuid.uuid4()),
+            "args": {
+                "id": task.id,
+                "labels": list(task.labels or []) + [label],
+            },
+        }
+        for task in tasks
+        if label not in (task.labels or [])
+    ]
+    if not commands:
+        return SyncResult()
+    logging.info(
+        "Labelling %d overflow task(s) '%s'", len(commands), label,
+    )
+    submitter = submitter or CommandSubmitter(api._token, api._session)
+    return submitter.submit(commands)
+
+
+def move_tasks(
+    api: Any,
+    tasks: List[Task],
+    day: date,
+    undo_log: UndoLog | None = None,
+    submitter: CommandSubmitter | None = None,
+) -> SyncResult:
+    """Move tasks to day with batched Sync commands.
+
+    Their reminders are read in one download, then deleted and
+    recreated shifted to the new day in the same submission, as
+    reschedule_task does for a single move. With an undo_log, every
+    task that moved is recorded.
+    """
+    moves = [Move(task, day) for task in tasks]
+    planned = [
+        (move.task, due_string, delta or 0)
+        for move, (due_string, delta) in zip(
+            moves, compute_due_strings(moves), strict=True,
+        )
+        if due_string is not None
+    ]
+    if not planned:
+        return SyncResult()
+    ids = {task.id for task, _, _ in planned}
+    reminders: Dict[str, List[Dict[str, Any]]] = {}
+    for r in iter_reminders(api._token, api._session):
+        if str(r.get("item_id")) in ids:
+            reminders.setdefault(str(r["item_id"]), []).append(r)
+
+    updates, deletes, adds = [], [], []
+    added: Dict[str, List[str]] = {}
+    for task, due_string, delta in planned:
+        updates.append({
+            "type": "item_update",
+            "uuid": str(uuid.uuid4()),
+            "args": {"id": task.id, "due": {"string": due_string}},
+        })
+        for r in reminders.get(task.id, []):
+            deletes.append(reminder_delete_command(str(r["id"])))
+            command = reminder_add_command(r, delta)
+            adds.append(command)
+            added.setdefault(task.id, []).append(command["temp_id"])
+    logging.info(
+        "Moving %d overflow task(s) to %s", len(updates), day,
+    )
+    submitter = submitter or CommandSubmitter(api._token, api._session)
+    result = submitter.submit(updates + deletes + adds)
+    if undo_log is not None:
+        for (task, _, _), update in zip(planned, updates, strict=True):
+            outcome = result.outcome(update["uuid"])
+            if outcome is None or not outcome.ok:
+                continue
+            undo_log.record(
+                task,
+                original_due_string(task),
+                reminders.get(task.id, []),
+                [
+                    result.temp_id_mapping[temp_id]
+                    for temp_id in added.get(task.id, [])
+                    if temp_id in result.temp_id_mapping
+                ],
+            )
+    return result
@@ -0,0 +1,28 @@
+"""Planned task moves produced by the Scheduler."""
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, Tuple
+
+from todoist_api_python.models import Task
+
+
+@dataclass
+class Move:
+    """A task planned to move to a new day."""
+    task: Task
+    day: date
+    # HH:MM start picked by slot packing; None keeps the task's time
+    time: Optional[str] = None
+    # Filled in once planned: the due string that makes the move, and
+    # the days from the task's current date (None if it had none)
+    due_string: Optional[str] = None
+    delta: Optional[int] = None
+
+
+def move_value(move: Move) -> Tuple[int, str]:
+    """Sort key putting the most valuable moves first.
+
+    Higher priority first, then the longest overdue.
+    """
+    task = move.task
+    return (-task.priority, str(task.due.date) if task.due else '')
@@ -0,0 +1,24 @@
+"""Files holding account data, readable by their owner only.
+
+The run state, outbox, undo logs and task index keep task contents
+and default to the shared temp dir, so they are created with mode
+0o600 rather than the umask's usual world-readable default.
+"""
+import os
+from typing import IO
+
+
+def open_private(path: str, mode: str = "w") -> IO[str]:
+    """Open path for writing ("w") or appending ("a"), owner-only.
+
+    A file left by an older version is made private as well.
+    """
+    flags = os.O_WRONLY | os.O_CREAT
+    flags |= os.O_APPEND if mode == "a" else os.O_TRUNC
+    fd = os.open(path, flags, 0o600)
+    try:
+        os.chmod(path, 0o600)
+        return os.fdopen(fd, mode, encoding="utf-8")
+    except BaseException:
+        os.close(fd)
+        raise
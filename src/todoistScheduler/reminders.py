@@ -3,11 +3,19 @@ import json
 import logging
 import uuid
 from datetime import datetime, timedelta
-from typing import Any, TypedDict
+from typing import Any, Iterator, TypedDict
 
 import requests
 
-SYNC_API_URL = "https://api.todoist.com/api/v1/sync"
+from todoistScheduler.debuglog import lazy
+from todoistScheduler.sync import (
+    SYNC_API_URL,
+    SYNC_CHUNK_SIZE,
+    CommandSubmitter,
+    SyncResult,
+    iter_sync_resources,
+)
+from todoistScheduler.tracing import current_span
 
 
 class ReminderDue(TypedDict, total=False):
@@ -28,12 +36,16 @@ class Reminder(TypedDict, total=False):
     is_deleted: int
 
 
-def fetch_reminders(
+def iter_reminders(
     token: str,
-    task_id: str,
-) -> list[dict[str, Any]]:
-    """Fetch active reminders for a task via Sync API."""
-    resp = requests.post(
+    session: requests.Session | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield every active reminder on the account via Sync API.
+
+    The response is decoded as a stream, so only one reminder is
+    held in memory at a time however many the account has.
+    """
+    resp = (session or requests).post(
         SYNC_API_URL,
         headers={
             "Authorization": f"Bearer {token}",
@@ -42,17 +54,43 @@ def fetch_reminders(
             "sync_token": "*",
             "resource_types": json.dumps(["reminders"]),
         },
+        stream=True,
     )
-    resp.raise_for_status()
-    all_reminders = resp.json().get("reminders", [])
+    received = 0
+
+    def chunks() -> Iterator[bytes]:
+        nonlocal received
+        for chunk in resp.iter_content(chunk_size=SYNC_CHUNK_SIZE):
+            received += len(chunk)
+            yield chunk
+
+    try:
+        resp.raise_for_status()
+        total = 0
+        for r in iter_sync_resources(chunks(), "reminders"):
+            total += 1
+            if not r.get("is_deleted", 0):
+                yield r
+    finally:
+        resp.close()
+        trace = current_span()
+        trace.set_attribute("http.status_code", resp.status_code)
+        trace.set_attribute("http.response_bytes", received)
     logging.debug(
         "Sync API returned %d total reminder(s)",
-        len(all_reminders),
+        total,
     )
+
+
+def fetch_reminders(
+    token: str,
+    task_id: str,
+    session: requests.Session | None = None,
+) -> list[dict[str, Any]]:
+    """Fetch active reminders for a task via Sync API."""
     matched = [
-        r for r in all_reminders
+        r for r in iter_reminders(token, session)
         if str(r.get("item_id")) == str(task_id)
-        and not r.get("is_deleted", 0)
     ]
     logging.debug(
         "Found %d reminder(s) for task %s",
@@ -62,6 +100,68 @@ def fetch_reminders(
     return matched
 
 
+class ReminderCache:
+    """Active reminders kept current through incremental syncs.
+
+    The first refresh downloads every reminder; later ones only
+    transfer what changed since the previous sync token.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        session: requests.Session | None = None,
+    ) -> None:
+        self.token = token
+        self.session = session
+        self.sync_token = "*"
+        self._by_id: dict[str, dict[str, Any]] = {}
+
+    def refresh(self) -> None:
+        """Apply the reminder changes since the last refresh."""
+        meta: dict[str, Any] = {}
+        resp = (self.session or requests).post(
+            SYNC_API_URL,
+            headers={
+                "Authorization": f"Bearer {self.token}",
+            },
+            data={
+                "sync_token": self.sync_token,
+                "resource_types": json.dumps(["reminders"]),
+            },
+            stream=True,
+        )
+        try:
+            resp.raise_for_status()
+            changes = list(iter_sync_resources(
+                resp.iter_content(chunk_size=SYNC_CHUNK_SIZE),
+                "reminders",
+                meta,
+            ))
+        finally:
+            resp.close()
+        if meta.get("full_sync", self.sync_token == "*"):
+            self._by_id.clear()
+        for r in changes:
+            if r.get("is_deleted", 0):
+                self._by_id.pop(str(r.get("id")), None)
+            else:
+                self._by_id[str(r.get("id"))] = r
+        self.sync_token = meta.get("sync_token", "*")
+        logging.debug(
+            "Reminder cache applied %d change(s), holds %d",
+            len(changes),
+            len(self._by_id),
+        )
+
+    def for_task(self, task_id: str) -> list[dict[str, Any]]:
+        """Return cached active reminders for a task."""
+        return [
+            r for r in self._by_id.values()
+            if str(r.get("item_id")) == str(task_id)
+        ]
+
+
 def _shift_absolute_due(
     due: dict[str, Any],
     day_delta: int,
@@ -75,92 +175,97 @@ def _shift_absolute_due(
     return new_due
 
 
+def reminder_delete_command(reminder_id: str) -> dict[str, Any]:
+    """Sync command deleting one reminder."""
+    return {
+        "type": "reminder_delete",
+        "uuid": str(uuid.uuid4()),
+        "args": {"id": reminder_id},
+    }
+
+
+def reminder_add_command(
+    reminder: dict[str, Any],
+    day_delta: int = 0,
+) -> dict[str, Any]:
+    """Sync command recreating a reminder, shifted by day_delta days."""
+    args: dict[str, Any] = {
+        "item_id": reminder["item_id"],
+        "type": reminder["type"],
+    }
+    if reminder["type"] == "relative":
+        args["minute_offset"] = reminder["minute_offset"]
+    elif reminder["type"] == "absolute":
+        args["due"] = _shift_absolute_due(
+            reminder["due"],
+            day_delta,
+        )
+    if "notify_uid" in reminder:
+        args["notify_uid"] = reminder["notify_uid"]
+
+    return {
+        "type": "reminder_add",
+        "uuid": str(uuid.uuid4()),
+        "temp_id": str(uuid.uuid4()),
+        "args": args,
+    }
+
+
 def delete_reminders(
     token: str,
     reminder_ids: list[str],
-) -> None:
-    """Delete reminders via Sync API commands."""
+    session: requests.Session | None = None,
+    submitter: CommandSubmitter | None = None,
+) -> SyncResult:
+    """Delete reminders via batched Sync API commands."""
     if not reminder_ids:
-        return
+        return SyncResult()
 
-    commands = [
-        {
-            "type": "reminder_delete",
-            "uuid": str(uuid.uuid4()),
-            "args": {"id": rid},
-        }
-        for rid in reminder_ids
-    ]
+    commands = [reminder_delete_command(rid) for rid in reminder_ids]
 
     logging.debug(
         "Deleting %d reminder(s): %s",
         len(commands),
-        [c["args"]["id"] for c in commands],
-    )
-    resp = requests.post(
-        SYNC_API_URL,
-        headers={
-            "Authorization": f"Bearer {token}",
-        },
-        data={
-            "commands": json.dumps(commands),
-        },
+        reminder_ids,
     )
-    resp.raise_for_status()
+    submitter = submitter or CommandSubmitter(token, session)
+    result = submitter.submit(commands)
     logging.debug(
-        "Sync API delete response: %s",
-        resp.json(),
+        "Deleted %d of %d reminder(s)",
+        len(commands) - len(result.failed),
+        len(commands),
     )
+    return result
 
 
 def restore_reminders(
     token: str,
     reminders: list[dict[str, Any]],
     day_delta: int,
-) -> None:
-    """Recreate reminders via Sync API commands."""
+    session: requests.Session | None = None,
+    submitter: CommandSubmitter | None = None,
+) -> SyncResult:
+    """Recreate reminders via batched Sync API commands.
+
+    The result's temp_id_mapping gives the ids of the new reminders.
+    """
     if not reminders:
-        return
-
-    commands = []
-    for r in reminders:
-        args: dict[str, Any] = {
-            "item_id": r["item_id"],
-            "type": r["type"],
-        }
-        if r["type"] == "relative":
-            args["minute_offset"] = r["minute_offset"]
-        elif r["type"] == "absolute":
-            args["due"] = _shift_absolute_due(
-                r["due"],
-                day_delta,
-            )
-        if "notify_uid" in r:
-            args["notify_uid"] = r["notify_uid"]
-
-        commands.append({
-            "type": "reminder_add",
-            "uuid": str(uuid.uuid4()),
-            "temp_id": str(uuid.uuid4()),
-            "args": args,
-        })
+        return SyncResult()
+
+    commands = [
+        reminder_add_command(r, day_delta) for r in reminders
+    ]
 
     logging.debug(
         "Restoring %d reminder(s): %s",
         len(commands),
-        json.dumps(commands, indent=2),
-    )
-    resp = requests.post(
-        SYNC_API_URL,
-        headers={
-            "Authorization": f"Bearer {token}",
-        },
-        data={
-            "commands": json.dumps(commands),
-        },
+        lazy(json.dumps, commands, indent=2),
     )
-    resp.raise_for_status()
+    submitter = submitter or CommandSubmitter(token, session)
+    result = submitter.submit(commands)
     logging.debug(
-        "Sync API restore response: %s",
-        resp.json(),
+        "Restored %d of %d reminder(s)",
+        len(commands) - len(result.failed),
+        len(commands),
     )
+    return result
@@ -1,15 +1,24 @@
 import re
 import logging
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import requests
 from todoist_api_python.api import TodoistAPI
 from todoist_api_python.models import Task
 
+from todoistScheduler.outbox import Outbox, is_transient
+from todoistScheduler.plan import Move
 from todoistScheduler.reminders import (
+    ReminderCache,
     delete_reminders,
     fetch_reminders,
     restore_reminders,
 )
+from todoistScheduler.tracing import span
+from todoistScheduler.undo import UndoLog
+
+_STARTING_ON = re.compile(r'\s*starting on.*')
 
 
 def _parse_task_date(task: Task) -> date | None:
@@ -22,50 +31,156 @@ def _parse_task_date(task: Task) -> date | None:
     return date.fromisoformat(date_str)
 
 
-def compute_due_string(task: Task, day: date) -> str | None:
+def _recurrence(task: Task) -> str | None:
+    """The recurrence pattern of a recurring task, without its start."""
+    if task.due and task.due.is_recurring:
+        return _STARTING_ON.sub('', task.due.string)
+    return None
+
+
+def _format_due_string(
+    day_str: str,
+    time_str: str | None,
+    pattern: str | None,
+) -> str:
+    """Format a due string for day_str (YYYY-MM-DD).
+
+    Adds time_str (HH:MM) when given, and keeps a recurrence pattern
+    by starting it on that day.
+    """
+    due_string = f"{day_str} {time_str}" if time_str else day_str
+    if pattern is not None:
+        due_string = f"{pattern} starting on {due_string}"
+    return due_string
+
+
+def compute_due_string(
+    task: Task,
+    day: date,
+    at: str | None = None,
+) -> str | None:
     """Compute the due string needed to reschedule a task to a new day.
 
-    Returns None if the task is already scheduled for that day.
-    Preserves time for datetime tasks and recurrence patterns for recurring tasks.
+    Returns None if the task is already scheduled for that day (and
+    time, with at). Preserves time for datetime tasks unless at gives
+    a new one, and recurrence patterns for recurring tasks.
     """
-    due_date = str(task.due.date) if task.due else None
-    if due_date and due_date[:10] == day.strftime('%Y-%m-%d'):
+    [(due_string, _)] = compute_due_strings([Move(task, day, at)])
+    return due_string
+
+
+def original_due_string(task: Task) -> str | None:
+    """Due string that puts a task back where it is now."""
+    if not task.due:
         return None
+    due_date = str(task.due.date)
+    time_str = None
+    if len(due_date) > 10:
+        time_str = datetime.fromisoformat(due_date).strftime('%H:%M')
+    return _format_due_string(due_date[:10], time_str, _recurrence(task))
 
-    if due_date and len(due_date) > 10:
-        time_str = datetime.fromisoformat(
-            due_date
-        ).strftime('%H:%M')
-        due_date_string = (
-            f"{day.strftime('%Y-%m-%d')} {time_str}"
-        )
-    else:
-        due_date_string = day.strftime('%Y-%m-%d')
 
-    if task.due and task.due.is_recurring:
-        # Preserve original due date string for recurring tasks
-        original_due = re.sub(r'\s*starting on.*', '', task.due.string)
-        due_date_string = f"{original_due} starting on {due_date_string}"
+def compute_due_strings(
+    moves: Iterable[Move],
+) -> List[Tuple[Optional[str], Optional[int]]]:
+    """Due strings and day deltas for a whole plan in one pass.
+
+    Each result pairs the due string that moves the task (None if it
+    is already there) with the days between the task's current date
+    and the target day (None for a task without a due date). Parsed
+    dates, formatted days and recurrence patterns are computed once
+    per distinct value, since plans are dominated by a few days and
+    patterns like "every day".
+    """
+    days: Dict[date, str] = {}
+    times: Dict[str, Tuple[date, Optional[str]]] = {}
+    # Keyed on recurrence too: a one-off task can share a recurring
+    # task's due string
+    patterns: Dict[Tuple[str, bool], Optional[str]] = {}
+    results: List[Tuple[Optional[str], Optional[int]]] = []
+    for move in moves:
+        task, day = move.task, move.day
+        day_str = days.get(day)
+        if day_str is None:
+            day_str = days[day] = day.strftime('%Y-%m-%d')
+        if not task.due:
+            results.append(
+                (_format_due_string(day_str, move.time, None), None),
+            )
+            continue
+
+        due_date = str(task.due.date)
+        parsed = times.get(due_date)
+        if parsed is None:
+            if len(due_date) > 10:
+                dt = datetime.fromisoformat(due_date)
+                parsed = (dt.date(), dt.strftime('%H:%M'))
+            else:
+                parsed = (date.fromisoformat(due_date), None)
+            times[due_date] = parsed
+        old_day, time_str = parsed
+        delta = (day - old_day).days
+        if due_date[:10] == day_str and move.time in (None, time_str):
+            results.append((None, delta))
+            continue
 
-    return due_date_string
+        key = (task.due.string, bool(task.due.is_recurring))
+        if key not in patterns:
+            patterns[key] = _recurrence(task)
+        results.append((
+            _format_due_string(day_str, move.time or time_str, patterns[key]),
+            delta,
+        ))
+    return results
 
 
 def reschedule_task(
     api: TodoistAPI,
     task: Task,
     day: date,
+    reminder_cache: ReminderCache | None = None,
+    undo_log: UndoLog | None = None,
+    outbox: Outbox | None = None,
+    at: str | None = None,
+    due_string: str | None = None,
+    day_delta: int | None = None,
 ) -> None:
-    """Reschedule a task to a new date via the Todoist API."""
-    due_string = compute_due_string(task, day)
+    """Reschedule a task to a new date via the Todoist API.
+
+    Reminder requests reuse the API client's HTTP session. With a
+    reminder_cache, reminders are read from it after an incremental
+    refresh instead of a full reminder download. With an undo_log,
+    the task's original due string and reminders are recorded once
+    it has moved. With an outbox, writes that fail on a network error
+    or a throttling/server response are queued there instead of lost.
+    at (HH:MM) sets the task's new time of day. A due_string and
+    day_delta already planned by compute_due_strings are used as they
+    are; a day_delta of None then means the task had no due date.
+    """
     if due_string is None:
-        return
+        due_string = compute_due_string(task, day, at)
+        if due_string is None:
+            return
+        old_date = _parse_task_date(task)
+    elif day_delta is not None:
+        old_date = day - timedelta(days=day_delta)
+    else:
+        old_date = None
 
     # Save reminders before the update drops them
     token = api._token
+    session = api._session
     reminders = []
-    old_date = _parse_task_date(task)
     try:
-        reminders = fetch_reminders(token, task.id)
+        with span("reminders.fetch", task_id=task.id) as s:
+            if reminder_cache is not None:
+                reminder_cache.refresh()
+                reminders = reminder_cache.for_task(task.id)
+            else:
+                reminders = fetch_reminders(
+                    token, task.id, session=session,
+                )
+            s.set_attribute("reminders", len(reminders))
     except Exception:
         logging.warning(
             "Failed to fetch reminders for '%s'",
@@ -73,35 +188,57 @@ def reschedule_task(
             exc_info=True,
         )
 
-    logging.info(
-        f"Sending the task '{task.content}' to {day}"
-    )
+    logging.info("Sending the task '%s' to %s", task.content, day)
     logging.debug(
         "updating task_id %s with: %s",
         task.id,
         due_string,
     )
 
-    is_success = api.update_task(
-        task_id=task.id,
-        due_string=due_string,
-    )
+    if old_date is None:
+        # Task had no due date; infer from the
+        # first absolute reminder's date instead.
+        for r in reminders:
+            if r.get("type") == "absolute" and r.get("due"):
+                old_date = datetime.fromisoformat(
+                    r["due"]["date"]
+                ).date()
+                break
+    reminder_ids = [
+        str(r["id"]) for r in reminders
+        if "id" in r
+    ]
+
+    try:
+        with span("task.update", task_id=task.id, day=day.isoformat()):
+            is_success = api.update_task(
+                task_id=task.id,
+                due_string=due_string,
+            )
+    except requests.RequestException as exc:
+        if outbox is None or not is_transient(exc):
+            raise
+        logging.warning(
+            "Could not move '%s' now: %s", task.content, exc,
+        )
+        outbox.add(
+            task, day,
+            due_string=due_string,
+            delete_ids=reminder_ids,
+            reminders=reminders,
+            from_day=old_date,
+        )
+        return
     if not is_success:
         raise Exception(
             f"Failed to reschedule task: {task.content}"
         )
+    if outbox is not None:
+        outbox.moved(task, day)
 
     # Restore reminders after the update
+    new_reminder_ids: list[str] = []
     if reminders:
-        if old_date is None:
-            # Task had no due date; infer from the
-            # first absolute reminder's date instead.
-            for r in reminders:
-                if r.get("type") == "absolute" and r.get("due"):
-                    old_date = datetime.fromisoformat(
-                        r["due"]["date"]
-                    ).date()
-                    break
         day_delta = (
             (day - old_date).days if old_date else 0
         )
@@ -111,25 +248,41 @@ def reschedule_task(
             day,
             day_delta,
         )
-        reminder_ids = [
-            str(r["id"]) for r in reminders
-            if "id" in r
-        ]
         try:
-            delete_reminders(token, reminder_ids)
-        except Exception:
+            with span("reminders.delete", task_id=task.id):
+                delete_reminders(
+                    token, reminder_ids, session=session,
+                )
+        except Exception as exc:
             logging.warning(
                 "Failed to delete reminders for '%s'",
                 task.content,
                 exc_info=True,
             )
+            if outbox is not None and is_transient(exc):
+                outbox.add(task, day, delete_ids=reminder_ids)
         try:
-            restore_reminders(
-                token, reminders, day_delta
-            )
-        except Exception:
+            with span("reminders.restore", task_id=task.id):
+                restored = restore_reminders(
+                    token, reminders, day_delta,
+                    session=session,
+                )
+            new_reminder_ids = list(restored.temp_id_mapping.values())
+        except Exception as exc:
             logging.warning(
                 "Failed to restore reminders for '%s'",
                 task.content,
                 exc_info=True,
             )
+            if outbox is not None and is_transient(exc):
+                outbox.add(
+                    task, day, reminders=reminders, from_day=old_date,
+                )
+
+    if undo_log is not None:
+        undo_log.record(
+            task,
+            original_due_string(task),
+            reminders,
+            new_reminder_ids,
+        )
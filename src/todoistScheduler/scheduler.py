@@ -1,14 +1,84 @@
-from datetime import date, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import date, datetime, timedelta
 import logging
-from typing import List, Optional, Tuple, TypeVar
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 
 from todoist_api_python.api import TodoistAPI
 from todoist_api_python.models import Task
 
-from todoistScheduler.reschedule import reschedule_task
+from todoistScheduler.budget import (
+    CALLS_PER_MOVE,
+    DEFAULT_SECONDS_PER_CALL,
+    Budget,
+    BudgetExceeded,
+)
+from todoistScheduler.debuglog import lazy
+from todoistScheduler.overflow import (
+    Horizon,
+    Labeler,
+    Mover,
+    label_tasks,
+    move_tasks,
+)
+from todoistScheduler.plan import Move, move_value
+from todoistScheduler.reschedule import (
+    _parse_task_date,
+    compute_due_strings,
+    reschedule_task,
+)
+from todoistScheduler.slots import SlotPacker
+from todoistScheduler.tracing import span
 
 T = TypeVar('T')
 
+Rescheduler = Callable[[TodoistAPI, Task, date], None]
+
+# Bucket of tasks not matched by any configured capacity bucket
+DEFAULT_BUCKET = ''
+
+_BUCKET_KINDS = ('project', 'label')
+
+
+def _contents(tasks: List[Task]) -> List[str]:
+    return [t.content for t in tasks]
+
+
+def parse_capacity_buckets(spec: str) -> Dict[str, int]:
+    """Parse 'label:home=2,project:123=3' into bucket capacities.
+
+    Keys keep their 'kind:name' form and their order, which decides
+    the bucket of a task matching several.
+    """
+    buckets: Dict[str, int] = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        key, sep, capacity = item.rpartition('=')
+        kind, _, name = key.partition(':')
+        if not sep or kind not in _BUCKET_KINDS or not name:
+            raise ValueError(
+                f"Bad capacity bucket '{item}';"
+                " expected project:<id>=N or label:<name>=N"
+            )
+        if int(capacity) < 1:
+            raise ValueError(f"Capacity of '{key}' must be at least 1")
+        buckets[f"{kind}:{name}"] = int(capacity)
+    return buckets
+
+
+def _updated_at(task: Task) -> Optional[datetime]:
+    """When a task was last changed, whether parsed or raw ISO text."""
+    value = task.updated_at
+    if not isinstance(value, str):
+        return value
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
 
 class Scheduler:
     def __init__(
@@ -17,33 +87,351 @@ class Scheduler:
         today: date,
         tasks_per_day: int,
         ignore_tag: str,
+        reschedule: Optional[Rescheduler] = None,
+        budget: Optional[Budget] = None,
+        day_loads: Optional[Dict[date, List[Task]]] = None,
+        buckets: Optional[Dict[str, int]] = None,
+        prefetch_depth: int = 0,
+        horizon: Optional[Horizon] = None,
+        labeler: Optional[Labeler] = None,
+        mover: Optional[Mover] = None,
+        deadline: Optional[float] = None,
+        slots: Optional[SlotPacker] = None,
+        conflicts: Optional[Callable[[], Dict[str, Optional[Task]]]] = None,
+        worker_api: Optional[Callable[[], TodoistAPI]] = None,
     ) -> None:
         self.api: TodoistAPI = api
         self.today: date = today
         self.tasks_per_day: int = tasks_per_day
         self.ignore_tag: str = ignore_tag
+        self.reschedule: Optional[Rescheduler] = reschedule
+        self.budget: Optional[Budget] = budget
+        # Existing tasks per day already fetched by the caller
+        self.day_loads: Dict[date, List[Task]] = dict(day_loads or {})
+        # Days read from the API during planning, as they were read
+        self.fetched: Dict[date, List[Task]] = {}
+        # Tasks left where they are because the budget ran out
+        self.deferred: List[Task] = []
+        # Per-day capacity of tasks in a project or with a label; all
+        # other tasks share tasks_per_day
+        self.buckets: Dict[str, int] = dict(buckets or {})
+        self._bucket_cache: Dict[Tuple[str, Tuple[str, ...]], str] = {}
+        # Days whose loads are fetched ahead in the background while
+        # the current day is planned; 0 fetches each day when reached
+        self.prefetch_depth: int = prefetch_depth
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._prefetched: Dict[
+            date, Future[Tuple[List[Task], List[float]]]
+        ] = {}
+        # Builds each prefetch worker its own client, since
+        # requests.Session is not thread-safe; without it workers use
+        # api, which must then hold no session (snapshots, test doubles)
+        self.worker_api: Optional[Callable[[], TodoistAPI]] = worker_api
+        self._worker = threading.local()
+        # Planning limits, and the overdue tasks beyond them
+        self.horizon: Optional[Horizon] = horizon
+        self.labeler: Optional[Labeler] = labeler
+        self.mover: Optional[Mover] = mover
+        self.overflow: List[Task] = []
+        # time.monotonic() by which the run must be done; once it is
+        # near, no new move is started
+        self.deadline: Optional[float] = deadline
+        self._move_seconds: List[float] = []
+        # Packs timed tasks into free slots of each day's working
+        # hours; a timed task fits a day only if a slot is free
+        self.slots: Optional[SlotPacker] = slots
+        self._excluded: Dict[date, List[Task]] = {}
+        # Returns the tasks changed since planning read them (None for
+        # tasks no longer eligible); checked once before applying
+        self.conflicts: Optional[
+            Callable[[], Dict[str, Optional[Task]]]
+        ] = conflicts
+
+    def _bucket_of(self, task: Task) -> str:
+        """The capacity bucket a task counts against."""
+        labels = tuple(task.labels or ())
+        cache_key = (task.project_id, labels)
+        bucket = self._bucket_cache.get(cache_key)
+        if bucket is None:
+            bucket = DEFAULT_BUCKET
+            for key in self.buckets:
+                kind, _, name = key.partition(':')
+                if (
+                    (kind == 'label' and name in labels)
+                    or (kind == 'project' and name == task.project_id)
+                ):
+                    bucket = key
+                    break
+            self._bucket_cache[cache_key] = bucket
+        return bucket
+
+    def _capacity(self, bucket: str) -> int:
+        return self.buckets.get(bucket, self.tasks_per_day)
+
+    def _split_day(self, tasks: List[Task]) -> Tuple[List[Task], List[Task]]:
+        """Split sorted tasks into those that fit a day and the rest.
+
+        Each bucket keeps its highest-ranked tasks up to its capacity.
+        """
+        if not self.buckets:
+            return self._slice_list(tasks, self.tasks_per_day)
+        by_bucket: Dict[str, List[Task]] = {}
+        for task in tasks:
+            by_bucket.setdefault(self._bucket_of(task), []).append(task)
+        kept_ids = set()
+        for bucket, bucket_tasks in by_bucket.items():
+            kept, _ = self._slice_list(bucket_tasks, self._capacity(bucket))
+            kept_ids.update(t.id for t in kept)
+        return (
+            [t for t in tasks if t.id in kept_ids],
+            [t for t in tasks if t.id not in kept_ids],
+        )
 
     def _sort_tasks(self, tasks: List[Task]) -> None:
-        """Sorts tasks by priority (desc) and then due date (asc)."""
+        """Sorts tasks by priority (desc) and then due date (asc).
+
+        Due dates compare as ISO text: dates, datetimes and strings
+        do not order against each other.
+        """
         tasks.sort(key=lambda t: (
             -t.priority,
-            t.due.date if t.due else None
+            str(t.due.date).replace(" ", "T") if t.due else ''
         ))
 
+    def _fetch_day(
+        self,
+        day: date,
+        api: Optional[TodoistAPI] = None,
+        every_task: bool = False,
+    ) -> Tuple[List[Task], List[float]]:
+        """Fetch a day's tasks and the latency of each page request.
+
+        Only tasks that may be moved are fetched, unless every_task.
+        """
+        query = 'due on ' + day.strftime('%Y-%m-%d')
+        if not every_task:
+            query = '! p1 & ! @' + self.ignore_tag + ' & ' + query
+        with span("day_load.fetch", day=day.isoformat()) as trace:
+            tasks: List[Task] = []
+            latencies: List[float] = []
+            pages = iter((api or self.api).filter_tasks(query=query))
+            while True:
+                started = time.monotonic()
+                page = next(pages, None)
+                if page is None:
+                    # The paginator stops without a request after the
+                    # last page, so there is nothing to charge
+                    trace.set_attribute("tasks", len(tasks))
+                    return tasks, latencies
+                latencies.append(time.monotonic() - started)
+                tasks.extend(page)
+
     def _get_tasks_for(self, day: date) -> List[Task]:
         """Gets all tasks for a given day, ignoring tasks with a specific tag."""
-        return [
-            task
-            for page in self.api.filter_tasks(
-                query='! p1 & ! @' + self.ignore_tag
-                + ' & due on ' + day.strftime('%Y-%m-%d')
+        if day in self.day_loads:
+            return list(self.day_loads[day])
+        future = self._prefetched.pop(day, None)
+        if future is not None:
+            tasks, latencies = future.result()
+        else:
+            tasks, latencies = self._fetch_day(day)
+        self.fetched[day] = list(tasks)
+        self._charge(latencies)
+        return tasks
+
+    def _excluded_on(self, day: date) -> List[Task]:
+        """Tasks due on day that the day-load query leaves out.
+
+        p1 and ignored tasks are never moved, but their times are
+        still taken. Read once per day, and only when packing it.
+        """
+        excluded = self._excluded.get(day)
+        if excluded is None:
+            tasks, latencies = self._fetch_day(day, every_task=True)
+            self._charge(latencies)
+            excluded = self._excluded[day] = [
+                t for t in tasks
+                if t.priority == 4 or self.ignore_tag in (t.labels or [])
+            ]
+        return excluded
+
+    def _charge(self, latencies: List[float]) -> None:
+        """Charge page requests, on the planning thread for prefetches too."""
+        if self.budget is not None:
+            for seconds in latencies:
+                self.budget.charge(1, seconds)
+
+    def _prefetch_day(self, day: date) -> Tuple[List[Task], List[float]]:
+        """Fetch a day on a prefetch worker, with the worker's client."""
+        api = getattr(self._worker, "api", None)
+        if api is None:
+            api = self.worker_api() if self.worker_api else self.api
+            self._worker.api = api
+        return self._fetch_day(day, api)
+
+    def _queries_left(self) -> float:
+        """How many more day queries the budget and deadline allow.
+
+        Prefetches in flight count as spent.
+        """
+        fits = float("inf")
+        if self.budget is not None:
+            fits = self.budget.calls_left()
+        if self.deadline is not None:
+            per_call = (
+                self.budget.seconds_per_call() if self.budget is not None
+                else DEFAULT_SECONDS_PER_CALL
             )
-            for task in page
+            left = self.deadline - time.monotonic()
+            fits = min(fits, left // per_call)
+        return fits - len(self._prefetched)
+
+    def _prefetch_after(
+        self,
+        day: date,
+        pending: int,
+        depth: int,
+        moved: int,
+    ) -> None:
+        """Start fetching the days after day that are sure to be needed.
+
+        With pending tasks still to place, at least that many divided
+        by the most tasks a day can take more days will be visited,
+        unless the horizon ends first. Up to prefetch_depth of them
+        are fetched in the background, as far as the budget and
+        deadline leave room for queries beyond day's own.
+        """
+        if self.prefetch_depth <= 0:
+            return
+        if self.horizon is not None and self.horizon.max_moves is not None:
+            pending = min(pending, self.horizon.max_moves - moved)
+        per_day = self.tasks_per_day + sum(self.buckets.values())
+        needed = -(-pending // per_day) - 1
+        if self.horizon is not None and self.horizon.days is not None:
+            needed = min(needed, self.horizon.days - depth - 1)
+        needed = min(needed, self.prefetch_depth, self._queries_left() - 1)
+        if needed <= 0:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.prefetch_depth,
+                thread_name_prefix="day-load",
+            )
+        for i in range(1, int(needed) + 1):
+            ahead = day + timedelta(days=i)
+            if ahead in self.day_loads or ahead in self._prefetched:
+                continue
+            self._prefetched[ahead] = self._executor.submit(
+                copy_context().run, self._prefetch_day, ahead,
+            )
+
+    def _overflow(self, tasks: List[Task]) -> None:
+        """Set aside overdue tasks the horizon has no room for.
+
+        Tasks already scheduled from today on stay where they are.
+        """
+        today = self.today.isoformat()
+        overdue = [
+            t for t in tasks
+            if t.due and str(t.due.date)[:10] < today
         ]
+        if overdue:
+            logging.info(
+                "Horizon reached; %d overdue task(s) overflow (%s)",
+                len(overdue),
+                self.horizon.strategy,
+            )
+        self.overflow.extend(overdue)
 
-    def _reschedule_to(self, task: Task, day: date) -> None:
-        """Reschedules a task to a new date."""
-        reschedule_task(self.api, task, day)
+    def _expected_move_seconds(self) -> float:
+        """How long the next move is likely to take."""
+        if self._move_seconds:
+            return max(self._move_seconds[-5:])
+        if self.budget is not None:
+            return CALLS_PER_MOVE * self.budget.seconds_per_call()
+        return CALLS_PER_MOVE * DEFAULT_SECONDS_PER_CALL
+
+    def _deadline_near(self) -> bool:
+        """True when the next move may not finish before the deadline."""
+        if self.deadline is None:
+            return False
+        left = self.deadline - time.monotonic()
+        return left < self._expected_move_seconds()
+
+    def _stop_prefetch(self) -> None:
+        """Drop prefetches that planning did not need.
+
+        Those already started still finish and are charged.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        for future in self._prefetched.values():
+            if future.cancelled():
+                continue
+            if future.exception() is not None:
+                # The request was made even though it failed
+                self._charge([0.0])
+            else:
+                self._charge(future.result()[1])
+        self._prefetched.clear()
+
+    def _reschedule_to(self, move: Move) -> None:
+        """Reschedules a task to its planned date, and time if any."""
+        # Reschedulers only get a time when slot packing picked one,
+        # and the due string when planning computed it
+        extra: Dict[str, object] = {}
+        if move.time is not None:
+            extra["at"] = move.time
+        if move.due_string is not None:
+            extra["due_string"] = move.due_string
+            extra["day_delta"] = move.delta
+        task, day = move.task, move.day
+        with span("reschedule", task_id=task.id, day=day.isoformat()):
+            if self.reschedule is not None:
+                self.reschedule(self.api, task, day, **extra)
+            else:
+                reschedule_task(self.api, task, day, **extra)
+
+    def _pack_day(
+        self,
+        day: date,
+        tasks_for_this_day: List[Task],
+        tasks_for_later: List[Task],
+    ) -> Tuple[List[Move], List[Task]]:
+        """Give the timed tasks moving onto day free slots.
+
+        Returns the day's moves and the tasks for later, which gain
+        the movers no slot was left for.
+        """
+        day_str = day.isoformat()
+        staying = [
+            t for t in tasks_for_this_day
+            if t.due and str(t.due.date)[:10] == day_str
+        ]
+        staying_ids = {t.id for t in staying}
+        if not any(
+            t.id not in staying_ids and self.slots.packs(t)
+            for t in tasks_for_this_day
+        ):
+            return [Move(t, day) for t in tasks_for_this_day], tasks_for_later
+        day_slots = self.slots.day(staying + self._excluded_on(day))
+        moves: List[Move] = []
+        bumped: List[Task] = []
+        for task in tasks_for_this_day:
+            if task.id in staying_ids or not self.slots.packs(task):
+                moves.append(Move(task, day))
+                continue
+            at = self.slots.place(day_slots, task)
+            if at is None:
+                bumped.append(task)
+            else:
+                moves.append(Move(task, day, at))
+        if bumped:
+            logging.debug(
+                "No free slot on %s for: %s", day, lazy(_contents, bumped),
+            )
+        return moves, bumped + tasks_for_later
 
     def _slice_list(self, lst: List[T], num_items: int) -> Tuple[List[T], List[T]]:
         """Slices a list into two parts at a given index."""
@@ -52,39 +440,262 @@ class Scheduler:
         else:
             return [], lst
 
-    def schedule_and_push_down(
+    def plan(
         self,
         tasks_to_add: List[Task],
         day: Optional[date] = None,
-        depth: int = 0
-    ) -> None:
-        """Schedules tasks, pushing them to later days if the current day is full."""
-        if not tasks_to_add:
-            return
+    ) -> List[Move]:
+        """Plans moves, pushing tasks to later days if a day is full.
 
+        Reads each day's existing tasks but writes nothing.
+        """
+        try:
+            return self._plan(tasks_to_add, day)
+        finally:
+            self._stop_prefetch()
+
+    def _plan(
+        self,
+        tasks_to_add: List[Task],
+        day: Optional[date],
+    ) -> List[Move]:
+        moves: List[Move] = []
         current_day = day if day else self.today
-        logging.debug(f"Scheduling for day: {current_day} (Depth: {depth})")
-        logging.debug(f"Tasks to schedule ({len(tasks_to_add)}): {[t.content for t in tasks_to_add]}")
+        depth = 0
+        moved = 0
+        while tasks_to_add:
+            if self.horizon is not None and self.horizon.reached(depth, moved):
+                self._overflow(tasks_to_add)
+                break
+            if self._deadline_near():
+                logging.warning(
+                    "Deadline near; leaving %d task(s) from %s on unplanned",
+                    len(tasks_to_add),
+                    current_day,
+                )
+                self.deferred.extend(tasks_to_add)
+                break
+            if self.budget is not None and self.budget.exhausted():
+                if not self.budget.truncate:
+                    raise BudgetExceeded(
+                        f"Budget exhausted while planning {current_day}"
+                        f" with {len(tasks_to_add)} task(s) left"
+                    )
+                logging.warning(
+                    "Budget exhausted; leaving %d task(s) from %s on unplanned",
+                    len(tasks_to_add),
+                    current_day,
+                )
+                self.deferred.extend(tasks_to_add)
+                break
 
-        # Get existing tasks for the current day
-        existing_tasks = self._get_tasks_for(current_day)
-        num_existing_tasks = len(existing_tasks)
-        logging.debug(f"Found {num_existing_tasks} existing tasks for {current_day}")
+            logging.debug("Scheduling for day: %s (Depth: %d)", current_day, depth)
+            logging.debug(
+                "Tasks to schedule (%d): %s",
+                len(tasks_to_add),
+                lazy(_contents, tasks_to_add),
+            )
 
-        # Combine and sort all tasks
-        all_tasks = existing_tasks + [t for t in tasks_to_add if t.id not in {et.id for et in existing_tasks}]
-        self._sort_tasks(all_tasks)
+            self._prefetch_after(
+                current_day, len(tasks_to_add), depth, moved,
+            )
+            # Get existing tasks for the current day
+            existing_tasks = self._get_tasks_for(current_day)
+            num_existing_tasks = len(existing_tasks)
+            logging.debug(
+                "Found %d existing tasks for %s",
+                num_existing_tasks,
+                current_day,
+            )
 
-        # Slice tasks for the current day and for later
-        tasks_for_this_day, tasks_for_later = self._slice_list(
-            all_tasks, self.tasks_per_day
+            # Combine and sort all tasks
+            existing_ids = {et.id for et in existing_tasks}
+            all_tasks = existing_tasks + [
+                t for t in tasks_to_add if t.id not in existing_ids
+            ]
+            self._sort_tasks(all_tasks)
+
+            # Slice tasks for the current day and for later
+            tasks_for_this_day, tasks_for_later = self._split_day(all_tasks)
+
+            day_str = current_day.isoformat()
+            movers = [
+                t for t in tasks_for_this_day
+                if not (t.due and str(t.due.date)[:10] == day_str)
+            ]
+            max_moves = self.horizon.max_moves if self.horizon else None
+            if max_moves is not None and moved + len(movers) > max_moves:
+                excess = {t.id for t in movers[max_moves - moved:]}
+                self._overflow([t for t in movers if t.id in excess])
+                tasks_for_this_day = [
+                    t for t in tasks_for_this_day if t.id not in excess
+                ]
+                movers = movers[:max_moves - moved]
+            moved += len(movers)
+
+            if self.slots is not None:
+                later = len(tasks_for_later)
+                day_moves, tasks_for_later = self._pack_day(
+                    current_day, tasks_for_this_day, tasks_for_later,
+                )
+                # Movers left without a slot have not moved yet
+                moved -= len(tasks_for_later) - later
+            else:
+                day_moves = [Move(t, current_day) for t in tasks_for_this_day]
+            logging.debug("Assigning %d tasks to %s", len(day_moves), current_day)
+            moves.extend(day_moves)
+
+            # If there are tasks left over, push them to the next day
+            tasks_to_add = tasks_for_later
+            current_day = current_day + timedelta(days=1)
+            depth += 1
+
+        # Drop tasks that stay on their day, in one pass over the plan
+        planned = []
+        for move, (due_string, delta) in zip(
+            moves, compute_due_strings(moves), strict=True,
+        ):
+            if due_string is not None:
+                move.due_string, move.delta = due_string, delta
+                planned.append(move)
+        return planned
+
+    def resolve_conflicts(self, moves: List[Move]) -> List[Move]:
+        """Replan around tasks edited since they were read.
+
+        Moves of tasks whose version (updated_at) changed are dropped
+        instead of overwriting the edit. Edited tasks that are still
+        overdue are planned again, against day loads patched with the
+        edits; only the days they land on change. Other planned moves
+        stand unless a replanned task displaces them.
+        """
+        if self.conflicts is None or not moves:
+            return moves
+        changed = self.conflicts()
+        if self.budget is not None:
+            self.budget.charge(1)
+        read = {
+            t.id: t
+            for tasks in (*self.day_loads.values(), *self.fetched.values())
+            for t in tasks
+        }
+        read.update((m.task.id, m.task) for m in moves)
+        changed = {
+            task_id: fresh for task_id, fresh in changed.items()
+            if task_id not in read
+            or fresh is None
+            or _updated_at(fresh) != _updated_at(read[task_id])
+        }
+        # Changes to tasks we never read matter only if they now sit
+        # on a planned day
+        days = set(self.day_loads) | set(self.fetched)
+        changed = {
+            task_id: fresh for task_id, fresh in changed.items()
+            if task_id in read
+            or (fresh is not None and _parse_task_date(fresh) in days)
+        }
+        if not changed:
+            return moves
+
+        stale = {m.task.id for m in moves if m.task.id in changed}
+        logging.warning(
+            "%d task(s) changed since they were read; dropping %d stale"
+            " move(s) and replanning the days affected",
+            len(changed),
+            len(stale),
         )
+        kept = [m for m in moves if m.task.id not in stale]
+        moved_ids = {m.task.id for m in kept}
+        loads: Dict[date, List[Task]] = {}
+        for day in days:
+            base = self.day_loads.get(day, self.fetched.get(day, []))
+            loads[day] = [
+                t for t in base
+                if t.id not in changed and t.id not in moved_ids
+            ]
+        for fresh in changed.values():
+            if fresh is not None and _parse_task_date(fresh) in loads:
+                loads[_parse_task_date(fresh)].append(fresh)
+        for m in kept:
+            if m.day in loads:
+                loads[m.day].append(m.task)
 
-        logging.debug(f"Assigning {len(tasks_for_this_day)} tasks to {current_day}")
-        for task in tasks_for_this_day:
-            self._reschedule_to(task, current_day)
+        pool = [
+            fresh for fresh in changed.values()
+            if fresh is not None and _parse_task_date(fresh) < self.today
+        ]
+        self.day_loads = loads
+        replanned = {m.task.id: m for m in kept}
+        if pool:
+            replanned.update(
+                (m.task.id, m) for m in self.plan(pool)
+            )
+        return list(replanned.values())
+
+    def apply(self, moves: List[Move]) -> List[Move]:
+        """Applies planned moves and returns those applied.
+
+        With a deadline, the most valuable moves go first and no move
+        is started that may not finish in time; a started move always
+        completes, reminders included. The rest are deferred.
+        """
+        if self.deadline is not None:
+            moves = sorted(moves, key=move_value)
+        for i, move in enumerate(moves):
+            if self._deadline_near():
+                skipped = moves[i:]
+                self.deferred.extend(m.task for m in skipped)
+                logging.warning(
+                    "Deadline near; deferring %d move(s) to the next run",
+                    len(skipped),
+                )
+                for m in skipped:
+                    logging.info(
+                        "Deferred '%s' (planned for %s)",
+                        m.task.content,
+                        m.day,
+                    )
+                return moves[:i]
+            started = time.monotonic()
+            self._reschedule_to(move)
+            self._move_seconds.append(time.monotonic() - started)
+        return moves
+
+    def schedule_and_push_down(
+        self,
+        tasks_to_add: List[Task],
+        day: Optional[date] = None,
+    ) -> List[Move]:
+        """Schedules tasks, pushing them to later days if the current day is full.
 
-        # If there are tasks left over, push them to the next day
-        if tasks_for_later:
-            next_day = current_day + timedelta(days=1)
-            self.schedule_and_push_down(tasks_for_later, next_day, depth + 1)
\ No newline at end of file
+        Returns the moves that were applied.
+        """
+        with span("plan", tasks=len(tasks_to_add)) as trace:
+            moves = self.plan(tasks_to_add, day)
+            trace.set_attribute("moves", len(moves))
+        if self.conflicts is not None:
+            with span("conflicts.check", moves=len(moves)) as trace:
+                moves = self.resolve_conflicts(moves)
+                trace.set_attribute("moves", len(moves))
+        if self.budget is not None:
+            moves, dropped = self.budget.fit(moves)
+            self.deferred.extend(m.task for m in dropped)
+            if dropped:
+                logging.warning(
+                    "Over budget: applying %d move(s), skipping %d"
+                    " lower-priority move(s) until the next run",
+                    len(moves),
+                    len(dropped),
+                )
+        with span("apply", moves=len(moves)) as trace:
+            moves = self.apply(moves)
+            trace.set_attribute("applied", len(moves))
+        if self.overflow and self.horizon.strategy == "label":
+            with span("overflow.label", tasks=len(self.overflow)):
+                labeler = self.labeler or label_tasks
+                labeler(self.api, self.overflow, self.horizon.label)
+        if self.overflow and self.horizon.strategy == "someday":
+            with span("overflow.someday", tasks=len(self.overflow)):
+                mover = self.mover or move_tasks
+                mover(self.api, self.overflow, self.horizon.someday)
+        return moves
@@ -0,0 +1,201 @@
+"""Local index for finding tasks by their content.
+
+``TaskIndex`` keeps the active tasks in a JSON file, refreshed with
+incremental syncs, and indexes their words by trigram in memory. A
+query like "pay rent" resolves to a task in milliseconds without a
+remote search, and the indexed task can be rescheduled as is.
+"""
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import requests
+from todoist_api_python.models import Task
+
+from todoistScheduler.delta import sync_items
+from todoistScheduler.private import open_private
+from todoistScheduler.snapshot import _task_from_record, _task_to_record
+
+_WORD = re.compile(r'\w+')
+
+# A fuzzy match must share this much of the query's trigrams, and
+# beat the runner-up by the margin, to be picked on its own
+MIN_SCORE = 0.6
+MIN_MARGIN = 0.15
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+
+def _trigrams(text: str) -> Set[str]:
+    """Trigrams of each word, padded so short words still have some."""
+    grams = set()
+    for word in _words(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TaskIndex:
+    """Active tasks searchable by content."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.sync_token: Optional[str] = None
+        self.refreshed_at = 0.0
+        self.records: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.sync_token = data["sync_token"]
+            self.refreshed_at = data["refreshed_at"]
+            self.records = data["records"]
+        except FileNotFoundError:
+            pass
+        except (OSError, KeyError, TypeError, ValueError):
+            logging.warning(
+                "Ignoring unreadable task index %s", path, exc_info=True,
+            )
+        self._postings: Optional[Dict[str, Set[str]]] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def save(self) -> None:
+        """Write the index file atomically."""
+        tmp = self.path + ".tmp"
+        with open_private(tmp) as f:
+            json.dump({
+                "sync_token": self.sync_token,
+                "refreshed_at": self.refreshed_at,
+                "records": self.records,
+            }, f)
+        os.replace(tmp, self.path)
+
+    def is_stale(self, ttl: float) -> bool:
+        return time.time() - self.refreshed_at >= ttl
+
+    def expire(self) -> None:
+        """Have the next staleness check ask for a refresh."""
+        self.refreshed_at = 0.0
+
+    def refresh(
+        self,
+        token: str,
+        session: requests.Session | None = None,
+    ) -> None:
+        """Apply the changes since the last refresh, then save.
+
+        The first refresh, or one whose token is no longer accepted,
+        reads every active task.
+        """
+        new_token, items, full = sync_items(
+            token, self.sync_token or "*", session,
+        )
+        if full:
+            self.records.clear()
+        for item in items:
+            task_id = str(item["id"])
+            if item.get("is_deleted") or item.get("checked"):
+                self.records.pop(task_id, None)
+            else:
+                self.records[task_id] = _task_to_record(
+                    _task_from_record(dict(item, id=task_id)),
+                )
+        self.sync_token = new_token
+        self.refreshed_at = time.time()
+        self._postings = None
+        self.save()
+        logging.debug(
+            "Task index refreshed: %d change(s), %d task(s)",
+            len(items),
+            len(self.records),
+        )
+
+    def get(self, task_id: str) -> Optional[Task]:
+        record = self.records.get(task_id)
+        return _task_from_record(record) if record else None
+
+    def _index(self) -> Dict[str, Set[str]]:
+        if self._postings is None:
+            self._postings = {}
+            for task_id, record in self.records.items():
+                for gram in _trigrams(record["content"]):
+                    self._postings.setdefault(gram, set()).add(task_id)
+        return self._postings
+
+    def _scored(self, query: str) -> List[Tuple[float, str]]:
+        """(score, task id) of every task sharing a trigram, best first."""
+        grams = _trigrams(query)
+        if not grams:
+            return []
+        postings = self._index()
+        shared: Counter = Counter()
+        for gram in grams:
+            shared.update(postings.get(gram, ()))
+        return [
+            (count / len(grams), task_id)
+            for task_id, count in shared.most_common()
+        ]
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[float, Task]]:
+        """Best matches for query, as (score, task), best first.
+
+        The score is the share of the query's trigrams found in the
+        task's content.
+        """
+        return [
+            (score, _task_from_record(self.records[task_id]))
+            for score, task_id in self._scored(query)[:limit]
+        ]
+
+    def _listing(self, task_ids: List[str]) -> str:
+        return "\n".join(
+            f"  {task_id}  {self.records[task_id]['content']}"
+            for task_id in task_ids
+        )
+
+    def resolve(self, query: str) -> Task:
+        """The one task query refers to.
+
+        Tasks containing every word of the query win; among several,
+        an exact content match decides. Otherwise a clearly best
+        fuzzy match is taken. Raises LookupError, listing candidates,
+        when nothing or more than one task fits.
+        """
+        words = _words(query)
+        scored = self._scored(query)
+        full = [
+            task_id for _, task_id in scored
+            if all(
+                w in self.records[task_id]["content"].lower() for w in words
+            )
+        ]
+        if len(full) > 1:
+            exact = [
+                task_id for task_id in full
+                if _words(self.records[task_id]["content"]) == words
+            ]
+            if len(exact) != 1:
+                raise LookupError(
+                    f"'{query}' matches {len(full)} tasks:\n"
+                    + self._listing(full[:10])
+                )
+            full = exact
+        if full:
+            return _task_from_record(self.records[full[0]])
+        if scored and scored[0][0] >= MIN_SCORE and (
+            len(scored) == 1 or scored[0][0] - scored[1][0] >= MIN_MARGIN
+        ):
+            return _task_from_record(self.records[scored[0][1]])
+        if scored:
+            raise LookupError(
+                f"No task clearly matches '{query}'; closest:\n"
+                + self._listing([task_id for _, task_id in scored[:5]])
+            )
+        raise LookupError(f"No task matches '{query}'")
@@ -0,0 +1,151 @@
+"""What-if runs of the scheduler over a grid of configurations.
+
+Every configuration is planned against the same snapshot on a process
+pool. Nothing is applied; each run reports how many tasks it would
+move, how far out it pushes them, the resulting load per day and the
+API calls a live run would make.
+"""
+import itertools
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+from todoistScheduler.budget import Budget
+from todoistScheduler.reschedule import _parse_task_date
+from todoistScheduler.scheduler import Scheduler, parse_capacity_buckets
+from todoistScheduler.snapshot import Snapshot, SnapshotAPI
+from todoistScheduler.window import fetch_window
+
+
+@dataclass(frozen=True)
+class SimConfig:
+    """One point of the configuration grid."""
+    tasks_per_day: int
+    ignore_tag: str
+    buckets: str = ''
+
+
+@dataclass
+class SimResult:
+    """Projected outcome of planning with one configuration."""
+    config: SimConfig
+    moves: int = 0
+    max_push_days: int = 0
+    # Tasks due per day after the plan, from today on
+    day_loads: List[int] = field(default_factory=list)
+    api_calls: int = 0
+    error: Optional[str] = None
+
+
+def config_grid(
+    tasks_per_day: Sequence[int],
+    ignore_tags: Sequence[str],
+    buckets: Sequence[str] = ('',),
+) -> List[SimConfig]:
+    """Every combination of the given settings."""
+    return [
+        SimConfig(n, tag, spec)
+        for n, tag, spec in itertools.product(
+            tasks_per_day, ignore_tags, buckets,
+        )
+    ]
+
+
+@lru_cache(maxsize=1)
+def _load(path: str) -> Snapshot:
+    # Read once per worker process; planning never mutates it
+    return Snapshot.read(path)
+
+
+def simulate_one(path: str, config: SimConfig) -> SimResult:
+    """Plan against the snapshot at path without applying anything."""
+    result = SimResult(config)
+    snapshot = _load(path)
+    api = SnapshotAPI(snapshot)
+    today = snapshot.today
+    try:
+        budget = Budget()
+        overdue, day_loads = fetch_window(
+            api, today, today, config.ignore_tag,
+        )
+        budget.charge(1)
+        scheduler = Scheduler(
+            api=api,
+            today=today,
+            tasks_per_day=config.tasks_per_day,
+            ignore_tag=config.ignore_tag,
+            budget=budget,
+            day_loads=day_loads,
+            buckets=parse_capacity_buckets(config.buckets),
+        )
+        moves = scheduler.plan(overdue)
+    except ValueError as exc:
+        result.error = str(exc)
+        return result
+
+    result.moves = len(moves)
+    result.api_calls = budget.calls + budget.estimate(moves)[0]
+    if not moves:
+        return result
+    last_day = max(m.day for m in moves)
+    result.max_push_days = (last_day - today).days
+
+    loads: Counter = Counter()
+    for page in api.filter_tasks(
+        query=(
+            f"! p1 & ! @{config.ignore_tag}"
+            f" & due before: {(last_day + timedelta(days=1)).isoformat()}"
+        )
+    ):
+        for task in page:
+            loads[_parse_task_date(task)] += 1
+    for move in moves:
+        loads[_parse_task_date(move.task)] -= 1
+        loads[move.day] += 1
+    result.day_loads = [
+        loads[today + timedelta(days=i)]
+        for i in range(result.max_push_days + 1)
+    ]
+    return result
+
+
+def simulate(
+    path: str,
+    configs: List[SimConfig],
+    workers: Optional[int] = None,
+) -> List[SimResult]:
+    """Evaluate every configuration in parallel, in input order."""
+    logging.info(
+        "Simulating %d configuration(s) against %s", len(configs), path,
+    )
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(simulate_one, [path] * len(configs), configs))
+
+
+def format_results(results: List[SimResult]) -> str:
+    """Render results as a plain-text table."""
+    lines = [
+        f"{'per day':>7}  {'ignore tag':<16} {'buckets':<24}"
+        f" {'moves':>6} {'push':>5} {'calls':>6}  day loads",
+    ]
+    for r in results:
+        c = r.config
+        row = (
+            f"{c.tasks_per_day:>7}  {c.ignore_tag:<16}"
+            f" {c.buckets or '-':<24}"
+        )
+        if r.error:
+            lines.append(f"{row} error: {r.error}")
+            continue
+        loads = " ".join(str(n) for n in r.day_loads[:14])
+        if len(r.day_loads) > 14:
+            loads += " ..."
+        lines.append(
+            f"{row} {r.moves:>6} {r.max_push_days:>5}"
+            f" {r.api_calls:>6}  {loads}"
+        )
+    return "\n".join(lines)
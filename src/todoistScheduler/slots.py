@@ -0,0 +1,196 @@
+"""Packing timed tasks into free slots within working hours.
+
+Each day's working hours are indexed minute by minute in a segment
+tree that keeps, per node, the free minutes at its start and end and
+its longest free run. Reserving a range and finding the earliest gap
+of a given length are both O(log n), so planning weeks of dense days
+stays cheap. Only timed tasks are packed; all-day tasks keep counting
+against the daily capacity alone.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from todoist_api_python.models import Task
+
+
+def parse_work_hours(spec: str) -> Tuple[int, int]:
+    """Parse 'HH:MM-HH:MM' into start and end minutes of the day."""
+    try:
+        start_str, end_str = spec.split('-')
+        start, end = (
+            datetime.strptime(s.strip(), '%H:%M')
+            for s in (start_str, end_str)
+        )
+    except ValueError:
+        raise ValueError(
+            f"Bad working hours '{spec}'; expected HH:MM-HH:MM"
+        ) from None
+    start_min = start.hour * 60 + start.minute
+    end_min = end.hour * 60 + end.minute
+    if end_min <= start_min:
+        raise ValueError(f"Working hours '{spec}' end before they start")
+    return start_min, end_min
+
+
+def task_start(task: Task) -> Optional[int]:
+    """Minute of the day a timed task starts at; None if untimed."""
+    if not task.due:
+        return None
+    due_date = str(task.due.date)
+    if len(due_date) <= 10:
+        return None
+    dt = datetime.fromisoformat(due_date)
+    return dt.hour * 60 + dt.minute
+
+
+def task_minutes(task: Task, default: int) -> int:
+    """How long a task takes, in minutes."""
+    if task.duration is None:
+        return default
+    if task.duration.unit == 'day':
+        return task.duration.amount * 24 * 60
+    return task.duration.amount
+
+
+class DaySlots:
+    """Free and taken minutes of one day's working hours."""
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.size = end - start
+        n = 4 * self.size
+        # Free minutes at the start and end of each node's range, and
+        # its longest free run
+        self._prefix: List[int] = [0] * n
+        self._suffix: List[int] = [0] * n
+        self._best: List[int] = [0] * n
+        self._full: List[bool] = [False] * n
+        self._build(1, 0, self.size)
+
+    def _build(self, node: int, lo: int, hi: int) -> None:
+        length = hi - lo
+        self._prefix[node] = self._suffix[node] = self._best[node] = length
+        if length > 1:
+            mid = (lo + hi) // 2
+            self._build(2 * node, lo, mid)
+            self._build(2 * node + 1, mid, hi)
+
+    def _fill(self, node: int) -> None:
+        self._prefix[node] = self._suffix[node] = self._best[node] = 0
+        self._full[node] = True
+
+    def _pull(self, node: int, lo: int, mid: int, hi: int) -> None:
+        left, right = 2 * node, 2 * node + 1
+        prefix = self._prefix[left]
+        if prefix == mid - lo:
+            prefix += self._prefix[right]
+        suffix = self._suffix[right]
+        if suffix == hi - mid:
+            suffix += self._suffix[left]
+        self._prefix[node] = prefix
+        self._suffix[node] = suffix
+        self._best[node] = max(
+            self._best[left],
+            self._best[right],
+            self._suffix[left] + self._prefix[right],
+        )
+
+    def _reserve(self, node: int, lo: int, hi: int, a: int, b: int) -> None:
+        if b <= lo or hi <= a or self._full[node]:
+            return
+        if a <= lo and hi <= b:
+            self._fill(node)
+            return
+        mid = (lo + hi) // 2
+        self._reserve(2 * node, lo, mid, a, b)
+        self._reserve(2 * node + 1, mid, hi, a, b)
+        self._pull(node, lo, mid, hi)
+
+    def reserve(self, start: int, minutes: int) -> None:
+        """Mark minutes from start (minute of the day) as taken.
+
+        The part outside working hours is ignored.
+        """
+        a = max(start - self.start, 0)
+        b = min(start - self.start + minutes, self.size)
+        if a < b:
+            self._reserve(1, 0, self.size, a, b)
+
+    def _free_in(self, node: int, lo: int, hi: int, a: int, b: int) -> bool:
+        if b <= lo or hi <= a:
+            return True
+        if self._full[node]:
+            return False
+        if a <= lo and hi <= b:
+            return self._best[node] == hi - lo
+        mid = (lo + hi) // 2
+        return (
+            self._free_in(2 * node, lo, mid, a, b)
+            and self._free_in(2 * node + 1, mid, hi, a, b)
+        )
+
+    def is_free(self, start: int, minutes: int) -> bool:
+        """True if the range lies within working hours and is free."""
+        a = start - self.start
+        if a < 0 or a + minutes > self.size:
+            return False
+        return self._free_in(1, 0, self.size, a, a + minutes)
+
+    def find(self, minutes: int) -> Optional[int]:
+        """Start minute of the earliest free run of minutes, if any."""
+        if minutes <= 0 or self._best[1] < minutes:
+            return None
+        node, lo, hi = 1, 0, self.size
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            left, right = 2 * node, 2 * node + 1
+            if self._best[left] >= minutes:
+                node, hi = left, mid
+            elif self._suffix[left] + self._prefix[right] >= minutes:
+                return self.start + mid - self._suffix[left]
+            else:
+                node, lo = right, mid
+        return self.start + lo
+
+
+class SlotPacker:
+    """Finds start times for timed tasks moved onto a day."""
+
+    def __init__(
+        self,
+        work_hours: Tuple[int, int],
+        default_minutes: int,
+    ) -> None:
+        self.start, self.end = work_hours
+        self.default_minutes = default_minutes
+
+    def packs(self, task: Task) -> bool:
+        """True for timed tasks short enough to fit working hours."""
+        return (
+            task_start(task) is not None
+            and task_minutes(task, self.default_minutes)
+            <= self.end - self.start
+        )
+
+    def day(self, staying: List[Task]) -> DaySlots:
+        """Slots of a day, with the timed tasks staying on it reserved."""
+        slots = DaySlots(self.start, self.end)
+        for task in staying:
+            start = task_start(task)
+            if start is not None:
+                slots.reserve(start, task_minutes(task, self.default_minutes))
+        return slots
+
+    def place(self, slots: DaySlots, task: Task) -> Optional[str]:
+        """Reserve a slot for task and return its HH:MM, if one is free.
+
+        The task keeps its own time when that slot is free.
+        """
+        minutes = max(task_minutes(task, self.default_minutes), 1)
+        start = task_start(task)
+        if start is None or not slots.is_free(start, minutes):
+            start = slots.find(minutes)
+            if start is None:
+                return None
+        slots.reserve(start, minutes)
+        return f"{start // 60:02d}:{start % 60:02d}"
@@ -0,0 +1,312 @@
+"""Offline account snapshots for replaying scheduler runs.
+
+A snapshot is a JSON Lines file: one ``meta`` record followed by one
+record per active task and per active reminder. ``SnapshotAPI`` serves
+the subset of ``TodoistAPI`` the scheduler uses from that data, so a
+run can be reproduced or benchmarked without network access.
+"""
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Iterator
+
+from todoist_api_python.api import TodoistAPI
+from todoist_api_python.models import Due, Duration, Task
+
+from todoistScheduler.reminders import _shift_absolute_due, iter_reminders
+from todoistScheduler.reschedule import _parse_task_date, compute_due_string
+
+SNAPSHOT_VERSION = 1
+
+_DUE_ON = re.compile(r'^due on (\d{4}-\d{2}-\d{2})$')
+_DUE_BEFORE = re.compile(r'^due before: (\d{4}-\d{2}-\d{2})$')
+_PRIORITY = re.compile(r'^p([1-4])$')
+_TARGET = re.compile(r'(\d{4}-\d{2}-\d{2})(?: (\d{2}:\d{2}))?$')
+
+
+def _task_to_record(task: Task) -> dict[str, Any]:
+    """Serialize the scheduling-relevant fields of a task."""
+    due = None
+    if task.due:
+        due = {
+            "date": str(task.due.date).replace(" ", "T"),
+            "string": task.due.string,
+            "is_recurring": task.due.is_recurring,
+            "timezone": task.due.timezone,
+        }
+    duration = None
+    if task.duration:
+        duration = {
+            "amount": task.duration.amount,
+            "unit": task.duration.unit,
+        }
+    return {
+        "kind": "task",
+        "id": task.id,
+        "content": task.content,
+        "project_id": task.project_id,
+        "section_id": task.section_id,
+        "parent_id": task.parent_id,
+        "labels": list(task.labels or []),
+        "priority": task.priority,
+        "due": due,
+        "duration": duration,
+        "updated_at": str(task.updated_at),
+    }
+
+
+def _parse_due(value: Any) -> date:
+    """A due date as the REST client returns it: a date or a datetime."""
+    value = str(value)
+    if len(value) > 10:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return date.fromisoformat(value)
+
+
+def _task_from_record(record: dict[str, Any]) -> Task:
+    """Rebuild a Task from a snapshot record.
+
+    Due dates are parsed, so rebuilt tasks sort and compare like the
+    ones read through the REST API.
+    """
+    due = None
+    if record.get("due"):
+        due = Due(
+            date=_parse_due(record["due"]["date"]),
+            string=record["due"]["string"],
+            is_recurring=record["due"].get("is_recurring", False),
+            timezone=record["due"].get("timezone"),
+        )
+    duration = None
+    if record.get("duration"):
+        duration = Duration(
+            amount=record["duration"]["amount"],
+            unit=record["duration"]["unit"],
+        )
+    return Task(
+        id=record["id"],
+        content=record["content"],
+        description='',
+        project_id=record["project_id"],
+        section_id=record.get("section_id"),
+        parent_id=record.get("parent_id"),
+        labels=record.get("labels") or [],
+        priority=record["priority"],
+        due=due,
+        deadline=None,
+        duration=duration,
+        is_collapsed=False,
+        order=0,
+        assignee_id=None,
+        assigner_id=None,
+        completed_at=None,
+        creator_id='',
+        created_at=record.get("updated_at", ''),
+        updated_at=record.get("updated_at", ''),
+    )
+
+
+@dataclass
+class Snapshot:
+    """Account state captured at a point in time."""
+    today: date
+    tasks: dict[str, Task] = field(default_factory=dict)
+    reminders: list[dict[str, Any]] = field(default_factory=list)
+
+    def write(self, path: str) -> None:
+        """Write the snapshot as JSON Lines."""
+        with open(path, "w", encoding="utf-8") as f:
+            meta = {
+                "kind": "meta",
+                "version": SNAPSHOT_VERSION,
+                "today": self.today.isoformat(),
+            }
+            f.write(json.dumps(meta) + "\n")
+            for task in self.tasks.values():
+                f.write(json.dumps(_task_to_record(task)) + "\n")
+            for r in self.reminders:
+                record = {"kind": "reminder", **r}
+                f.write(json.dumps(record) + "\n")
+
+    @classmethod
+    def read(cls, path: str) -> "Snapshot":
+        """Load a snapshot written by ``write``."""
+        snapshot = None
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind = record.pop("kind")
+                if kind == "meta":
+                    if record.get("version") != SNAPSHOT_VERSION:
+                        raise ValueError(
+                            f"Unsupported snapshot version: "
+                            f"{record.get('version')}"
+                        )
+                    snapshot = cls(
+                        today=date.fromisoformat(record["today"]),
+                    )
+                elif snapshot is None:
+                    raise ValueError(
+                        f"Snapshot '{path}' has no meta record"
+                    )
+                elif kind == "task":
+                    task = _task_from_record(record)
+                    snapshot.tasks[task.id] = task
+                elif kind == "reminder":
+                    snapshot.reminders.append(record)
+        if snapshot is None:
+            raise ValueError(f"Snapshot '{path}' is empty")
+        return snapshot
+
+
+def export_snapshot(api: TodoistAPI, today: date) -> Snapshot:
+    """Capture active tasks and reminders from the live account."""
+    snapshot = Snapshot(today=today)
+    for page in api.get_tasks():
+        for task in page:
+            snapshot.tasks[task.id] = task
+    snapshot.reminders.extend(iter_reminders(api._token))
+    logging.info(
+        "Captured %d task(s) and %d reminder(s)",
+        len(snapshot.tasks),
+        len(snapshot.reminders),
+    )
+    return snapshot
+
+
+def _matches(task: Task, clause: str, today: date) -> bool:
+    """Evaluate one clause of a Todoist filter query."""
+    negate = clause.startswith("!")
+    if negate:
+        clause = clause[1:].strip()
+    task_day = _parse_task_date(task)
+    if clause == "overdue":
+        result = task_day is not None and task_day < today
+    elif clause.startswith("@"):
+        result = clause[1:] in (task.labels or [])
+    elif match := _PRIORITY.match(clause):
+        # Filter p1 is the API's priority 4
+        result = task.priority == 5 - int(match.group(1))
+    elif match := _DUE_ON.match(clause):
+        result = (
+            task_day is not None
+            and task_day.isoformat() == match.group(1)
+        )
+    elif match := _DUE_BEFORE.match(clause):
+        result = (
+            task_day is not None
+            and task_day.isoformat() < match.group(1)
+        )
+    else:
+        raise ValueError(
+            f"Unsupported filter clause in snapshot: '{clause}'"
+        )
+    return result != negate
+
+
+class SnapshotAPI:
+    """Serves TodoistAPI task calls from a Snapshot."""
+
+    def __init__(self, snapshot: Snapshot) -> None:
+        self.snapshot = snapshot
+        self._token = ''
+
+    def filter_tasks(self, *, query: str) -> Iterator[list[Task]]:
+        """Return tasks matching an '&'-joined filter query."""
+        clauses = [c.strip() for c in query.split("&")]
+        today = self.snapshot.today
+        yield [
+            task for task in self.snapshot.tasks.values()
+            if all(_matches(task, c, today) for c in clauses)
+        ]
+
+    def get_task(self, task_id: str) -> Task:
+        """Return a task by id."""
+        return self.snapshot.tasks[task_id]
+
+    def update_task(self, task_id: str, *, due_string: str) -> Task:
+        """Apply a due string produced by compute_due_string."""
+        task = self.snapshot.tasks[task_id]
+        match = _TARGET.search(due_string)
+        if task.due is None or match is None:
+            raise ValueError(
+                f"Cannot apply due string offline: '{due_string}'"
+            )
+        new_date = match.group(1)
+        if match.group(2):
+            old = task.due.date
+            utc = str(old).endswith("Z") or (
+                isinstance(old, datetime) and old.tzinfo is not None
+            )
+            new_date = f"{new_date}T{match.group(2)}:00{'Z' if utc else ''}"
+        task.due = Due(
+            date=_parse_due(new_date),
+            string=due_string,
+            is_recurring=task.due.is_recurring,
+            timezone=task.due.timezone,
+        )
+        return task
+
+
+def reschedule_in_snapshot(
+    api: SnapshotAPI,
+    task: Task,
+    day: date,
+    at: str | None = None,
+    due_string: str | None = None,
+    day_delta: int | None = None,
+) -> None:
+    """Offline counterpart of reschedule_task.
+
+    Each move is logged with the day it leaves, as the snapshot file
+    itself is left untouched.
+    """
+    if task.due is None:
+        return
+    old_day = _parse_task_date(task)
+    if due_string is None:
+        due_string = compute_due_string(task, day, at)
+        if due_string is None:
+            return
+        day_delta = (day - old_day).days
+    logging.info(
+        "Planned: '%s' from %s to %s (%s)",
+        task.content,
+        old_day,
+        day,
+        due_string,
+    )
+    api.update_task(task.id, due_string=due_string)
+    for r in api.snapshot.reminders:
+        if (
+            str(r.get("item_id")) == str(task.id)
+            and r.get("type") == "absolute"
+            and r.get("due")
+        ):
+            r["due"] = _shift_absolute_due(r["due"], day_delta)
+
+
+def label_in_snapshot(
+    api: SnapshotAPI,
+    tasks: list[Task],
+    label: str,
+) -> None:
+    """Offline counterpart of label_tasks."""
+    for task in tasks:
+        stored = api.snapshot.tasks[task.id]
+        if label not in (stored.labels or []):
+            stored.labels = list(stored.labels or []) + [label]
+
+
+def move_in_snapshot(
+    api: SnapshotAPI,
+    tasks: list[Task],
+    day: date,
+) -> None:
+    """Offline counterpart of move_tasks."""
+    for task in tasks:
+        reschedule_in_snapshot(api, task, day)
@@ -0,0 +1,107 @@
+"""State persisted between scheduler runs."""
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from todoist_api_python.models import Task
+
+from todoistScheduler.plan import Move
+from todoistScheduler.private import open_private
+from todoistScheduler.snapshot import _task_from_record, _task_to_record
+
+
+def fingerprint(
+    today: date,
+    settings: Dict[str, Any],
+    tasks: List[Task],
+) -> str:
+    """Content hash of everything a plan depends on.
+
+    Covers the date, the scheduler settings and the id, due date and
+    priority of every overdue or already-scheduled task in the window.
+    """
+    entries = sorted(
+        (
+            task.id,
+            str(task.due.date) if task.due else '',
+            task.priority,
+            sorted(task.labels or []),
+            task.project_id,
+        )
+        for task in tasks
+    )
+    payload = json.dumps(
+        {
+            "today": today.isoformat(),
+            "settings": settings,
+            "tasks": entries,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class RunState:
+    """What the last completed run saw and did."""
+    fingerprint: Optional[str] = None
+    # Last day the previous plan reached; the next run fetches up to it
+    window_end: Optional[str] = None
+    plan: List[Dict[str, str]] = field(default_factory=list)
+    # Sync token the window tasks below were read at, for delta runs
+    sync_token: Optional[str] = None
+    ignore_tag: Optional[str] = None
+    tasks: List[Dict[str, Any]] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str) -> "RunState":
+        """Read the state file, or start fresh if it is missing or bad."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(**data)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, TypeError, ValueError):
+            logging.warning(
+                "Ignoring unreadable state file %s",
+                path,
+                exc_info=True,
+            )
+            return cls()
+
+    def save(self, path: str) -> None:
+        """Write the state file atomically."""
+        tmp = path + ".tmp"
+        with open_private(tmp) as f:
+            json.dump(asdict(self), f)
+        os.replace(tmp, path)
+
+    def record_plan(self, moves: List[Move]) -> None:
+        self.plan = [
+            {"task_id": m.task.id, "day": m.day.isoformat()}
+            for m in moves
+        ]
+
+    def record_window(
+        self,
+        tasks: Iterable[Task],
+        sync_token: str,
+        ignore_tag: str,
+    ) -> None:
+        """Keep the window tasks as read at sync_token."""
+        self.tasks = [_task_to_record(task) for task in tasks]
+        self.sync_token = sync_token
+        self.ignore_tag = ignore_tag
+
+    def window_tasks(self) -> Dict[str, Task]:
+        """The recorded window tasks by id."""
+        return {
+            record["id"]: _task_from_record(record)
+            for record in self.tasks
+        }
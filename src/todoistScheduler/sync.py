@@ -0,0 +1,372 @@
+"""Helpers shared by the Todoist Sync API clients."""
+import codecs
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator
+
+import requests
+
+from todoistScheduler.tracing import span
+
+SYNC_API_URL = "https://api.todoist.com/api/v1/sync"
+
+# Size of the byte chunks read from a streamed Sync response.
+SYNC_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class _StreamBuffer:
+    """Incrementally decoded text window over a byte stream."""
+
+    def __init__(self, chunks: Iterable[bytes | str]) -> None:
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Append the next chunk, dropping consumed text.
+
+        Returns False once the stream is exhausted.
+        """
+        for chunk in self._chunks:
+            text = (
+                self._utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            )
+            if text:
+                self.text = self.text[self.pos:] + text
+                self.pos = 0
+                return True
+        tail = self._utf8.decode(b"", final=True)
+        self.text = self.text[self.pos:] + tail
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character, or '' at EOF."""
+        while True:
+            while (
+                self.pos < len(self.text)
+                and self.text[self.pos] in _WHITESPACE
+            ):
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if self.eof or not self.fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        """Consume the next character, which must be one of chars."""
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(
+                f"Malformed Sync response: expected one of "
+                f"{chars!r} at offset {self.pos}, got {ch!r}"
+            )
+        self.pos += 1
+        return ch
+
+    def decode_value(self) -> Any:
+        """Decode one complete JSON value at the current position."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(
+                    self.text, self.pos,
+                )
+            except json.JSONDecodeError:
+                if self.eof or not self.fill():
+                    raise
+                continue
+            # A value ending exactly at the buffer edge may be a
+            # truncated number or literal; read ahead to be sure.
+            if end == len(self.text) and not self.eof:
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_sync_resources(
+    chunks: Iterable[bytes | str],
+    resource_type: str,
+    meta: dict[str, Any] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield objects of one resource type from a streamed Sync response.
+
+    Only one resource object is held in memory at a time. Other
+    top-level values (``sync_token``, ``full_sync``, ...) are decoded
+    whole and stored in ``meta`` when it is given.
+    """
+    buf = _StreamBuffer(chunks)
+    buf.expect("{")
+    if buf.peek() == "}":
+        return
+    while True:
+        key = buf.decode_value()
+        buf.expect(":")
+        if key == resource_type and buf.peek() == "[":
+            buf.expect("[")
+            if buf.peek() == "]":
+                buf.expect("]")
+            else:
+                while True:
+                    yield buf.decode_value()
+                    if buf.expect(",]") == "]":
+                        break
+        else:
+            value = buf.decode_value()
+            if meta is not None:
+                meta[key] = value
+        if buf.expect(",}") == "}":
+            return
+
+
+# The Sync API rejects requests carrying more commands than this.
+MAX_COMMANDS_PER_REQUEST = 100
+
+# Form-encoded payloads above this size are split further.
+MAX_PAYLOAD_BYTES = 512 * 1024
+
+# Status codes worth retrying with a smaller batch.
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+# Longest wait between retries, whatever the server asks for.
+MAX_RETRY_DELAY = 60.0
+
+
+def _retry_after(resp: requests.Response, attempt: int) -> float:
+    """Seconds to wait before retry number attempt (from 1).
+
+    The server's Retry-After wins; without a usable one the wait
+    doubles with each attempt, from one second.
+    """
+    try:
+        seconds = float(resp.headers["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        seconds = 2.0 ** (attempt - 1)
+    return min(max(seconds, 0.0), MAX_RETRY_DELAY)
+
+
+@dataclass
+class BatchTiming:
+    """Outcome of one Sync command POST."""
+    size: int
+    payload_bytes: int
+    seconds: float
+    ok: bool
+
+
+@dataclass
+class CommandResult:
+    """Server outcome of a single Sync command."""
+    command: dict[str, Any]
+    ok: bool
+    error: dict[str, Any] | None = None
+
+    @property
+    def retryable(self) -> bool:
+        """True for failures that may succeed when sent again."""
+        if self.ok or self.error is None:
+            return False
+        code = self.error.get("http_code") or 0
+        return code == 429 or code >= 500
+
+
+@dataclass
+class SyncResult:
+    """Per-command outcomes of one or more Sync submissions."""
+    results: dict[str, CommandResult] = field(default_factory=dict)
+    temp_id_mapping: dict[str, str] = field(default_factory=dict)
+    # uuid a retried command was resent under, by its previous uuid
+    resent: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return all(r.ok for r in self.results.values())
+
+    @property
+    def failed(self) -> list[CommandResult]:
+        return [r for r in self.results.values() if not r.ok]
+
+    def outcome(self, command_uuid: str) -> CommandResult | None:
+        """Final result of the command first sent as command_uuid."""
+        while command_uuid in self.resent:
+            command_uuid = self.resent[command_uuid]
+        return self.results.get(command_uuid)
+
+    def add_response(
+        self,
+        commands: list[dict[str, Any]],
+        body: dict[str, Any],
+    ) -> None:
+        """Record the sync_status of a batch's commands."""
+        statuses = body.get("sync_status") or {}
+        for command in commands:
+            status = statuses.get(command["uuid"])
+            if status == "ok":
+                result = CommandResult(command, True)
+            else:
+                error = status if isinstance(status, dict) else {
+                    "error": "No sync_status for command",
+                }
+                result = CommandResult(command, False, error)
+            self.results[command["uuid"]] = result
+        self.temp_id_mapping.update(body.get("temp_id_mapping") or {})
+
+
+class CommandSubmitter:
+    """Posts Sync commands in adaptively sized batches.
+
+    The batch size grows additively while requests finish under
+    ``target_seconds``, shrinks in proportion when they run slower, and
+    halves on throttling or server errors. It never exceeds the
+    server's per-request command limit. Keep one submitter per run so
+    what it learns carries over between submissions.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        session: requests.Session | None = None,
+        initial_batch: int = 20,
+        max_batch: int = MAX_COMMANDS_PER_REQUEST,
+        target_seconds: float = 2.0,
+        max_retries: int = 3,
+    ) -> None:
+        self.token = token
+        self.session = session
+        self.max_batch = min(max_batch, MAX_COMMANDS_PER_REQUEST)
+        self.batch_size = max(1, min(initial_batch, self.max_batch))
+        self.target_seconds = target_seconds
+        self.max_retries = max_retries
+        self.timings: list[BatchTiming] = []
+
+    def _post(self, body: str) -> requests.Response:
+        return (self.session or requests).post(
+            SYNC_API_URL,
+            headers={
+                "Authorization": f"Bearer {self.token}",
+            },
+            data={
+                "commands": body,
+            },
+        )
+
+    def _adjust(self, size: int, seconds: float, ok: bool) -> None:
+        """Update the batch size from a batch outcome."""
+        if not ok:
+            new_size = max(1, size // 2)
+        elif seconds > self.target_seconds:
+            new_size = max(1, int(size * self.target_seconds / seconds))
+        elif size >= self.batch_size and self.error_rate() < 0.1:
+            new_size = size + max(1, size // 4)
+        else:
+            new_size = self.batch_size
+        self.batch_size = min(new_size, self.max_batch)
+
+    def _submit_batches(
+        self,
+        commands: list[dict[str, Any]],
+        result: SyncResult,
+    ) -> None:
+        """Post commands in batches, recording their statuses."""
+        start = 0
+        failures = 0
+        while start < len(commands):
+            size = self.batch_size
+            body = json.dumps(commands[start:start + size])
+            while len(body) > MAX_PAYLOAD_BYTES and size > 1:
+                size //= 2
+                body = json.dumps(commands[start:start + size])
+
+            started = time.monotonic()
+            with span(
+                "sync.batch",
+                commands=size,
+                **{"http.request_bytes": len(body)},
+            ) as trace:
+                resp = self._post(body)
+                trace.set_attribute(
+                    "http.status_code", resp.status_code,
+                )
+            seconds = time.monotonic() - started
+            ok = resp.status_code not in _RETRYABLE_STATUS
+            self.timings.append(
+                BatchTiming(size, len(body), seconds, ok),
+            )
+            self._adjust(size, seconds, ok)
+            logging.debug(
+                "Sync batch of %d command(s), %d bytes: %.3fs%s",
+                size,
+                len(body),
+                seconds,
+                "" if ok else f" (HTTP {resp.status_code})",
+            )
+            if not ok:
+                failures += 1
+                if failures > self.max_retries:
+                    resp.raise_for_status()
+                time.sleep(_retry_after(resp, failures))
+                continue
+            resp.raise_for_status()
+            failures = 0
+            result.add_response(
+                commands[start:start + size], resp.json(),
+            )
+            start += size
+
+    def submit(
+        self,
+        commands: list[dict[str, Any]],
+        result: SyncResult | None = None,
+    ) -> SyncResult:
+        """Send all commands and return their per-command outcomes.
+
+        Commands that fail with a transient error are resent on their
+        own, without the rest of their batch, up to ``max_retries``
+        times; ``SyncResult.outcome`` follows them by original uuid.
+        Permanent failures are left in the result. A result passed in
+        is filled as each batch is answered, so it keeps the outcomes
+        of the batches sent before an error is raised.
+        """
+        if result is None:
+            result = SyncResult()
+        self._submit_batches(commands, result)
+        for _ in range(self.max_retries):
+            retry = [r for r in result.failed if r.retryable]
+            if not retry:
+                break
+            logging.info(
+                "Retrying %d failed Sync command(s)", len(retry),
+            )
+            resent = []
+            for failed in retry:
+                # A fresh uuid so the server does not replay the failure
+                command = dict(failed.command, uuid=str(uuid.uuid4()))
+                del result.results[failed.command["uuid"]]
+                result.resent[failed.command["uuid"]] = command["uuid"]
+                resent.append(command)
+            self._submit_batches(resent, result)
+        for failed in result.failed:
+            logging.warning(
+                "Sync command %s failed: %s",
+                failed.command["type"],
+                failed.error,
+            )
+        return result
+
+    def error_rate(self) -> float:
+        """Share of recorded batches that failed."""
+        if not self.timings:
+            return 0.0
+        failed = sum(1 for t in self.timings if not t.ok)
+        return failed / len(self.timings)
@@ -0,0 +1,172 @@
+"""Nested timing spans written as OpenTelemetry JSON.
+
+Tracing is off unless ``start_tracing`` is called; ``span`` is then a
+cheap no-op. The output file follows the OTLP/JSON trace layout, so
+it can be loaded into trace viewers without running a collector.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+SCOPE_NAME = "todoistScheduler"
+
+# OTLP span status codes
+_STATUS_ERROR = 2
+
+
+class Span:
+    """One timed operation and its attributes."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        attributes: Dict[str, Any],
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)}
+                for k, v in self.attributes.items()
+            ],
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        if self.error is not None:
+            data["status"] = {
+                "code": _STATUS_ERROR,
+                "message": self.error,
+            }
+        return data
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Collects finished spans for one trace."""
+
+    def __init__(self, service_name: str = SCOPE_NAME) -> None:
+        self.service_name = service_name
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+        self._current: ContextVar[Optional[Span]] = ContextVar(
+            "current_span", default=None,
+        )
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        parent = self._current.get()
+        current = Span(
+            name,
+            self.trace_id,
+            parent.span_id if parent else None,
+            attributes,
+        )
+        token = self._current.set(current)
+        try:
+            yield current
+        except BaseException as exc:
+            current.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            current.end_ns = time.time_ns()
+            self._current.reset(token)
+            with self._lock:
+                self.spans.append(current)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [s.to_otlp() for s in self.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{
+                        "key": "service.name",
+                        "value": {"stringValue": self.service_name},
+                    }],
+                },
+                "scopeSpans": [{
+                    "scope": {"name": SCOPE_NAME},
+                    "spans": spans,
+                }],
+            }],
+        }
+
+    def write(self, path: str) -> None:
+        """Write all finished spans to path as OTLP/JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_otlp(), f)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    """Start collecting spans process-wide."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop collecting spans and return the tracer that held them."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def current_span() -> Any:
+    """The innermost open span, or a no-op stand-in."""
+    if _tracer is None:
+        return _NOOP_SPAN
+    return _tracer._current.get() or _NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Time a block as a child of the current span, if tracing."""
+    if _tracer is None:
+        yield _NOOP_SPAN
+        return
+    with _tracer.span(name, **attributes) as current:
+        yield current
@@ -0,0 +1,300 @@
+"""Record and replay the HTTP traffic of a scheduler run.
+
+``RecordingSession`` is a ``requests.Session`` that passes requests
+through and keeps every request/response pair, with the API token
+scrubbed, in a ``Cassette``. ``ReplaySession`` serves a cassette back
+without a network, optionally sleeping for the recorded latencies.
+Both plug in as the session of ``TodoistAPI``, whose session the
+Sync clients share, so a whole run can be recorded or replayed.
+"""
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CASSETTE_VERSION = 1
+
+SCRUBBED = "<TOKEN>"
+
+# Response headers worth keeping; the rest are noise for replay.
+_KEPT_HEADERS = ("Content-Type", "Retry-After")
+
+
+class ReplayMismatch(RuntimeError):
+    """A replayed run sent a request the cassette has no answer for.
+
+    Not a network error, so it is never retried or queued as one.
+    """
+
+
+@dataclass
+class Interaction:
+    """One recorded request and the response it got."""
+    method: str
+    url: str
+    body: Optional[str]
+    status: int
+    headers: Dict[str, str]
+    response: str
+    seconds: float
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return _key(self.method, self.url, self.body)
+
+
+def _commands(body: Optional[str]) -> List[Dict[str, Any]]:
+    """Sync commands carried by a form-encoded request body."""
+    if not body:
+        return []
+    try:
+        values = parse_qs(body).get("commands")
+        return json.loads(values[0]) if values else []
+    except ValueError:
+        return []
+
+
+def _sync_kind(body: Optional[str]) -> str:
+    """What a Sync request asks for: its command or resource types.
+
+    Keeps a command batch from being answered with a recorded read,
+    and one kind of batch with another.
+    """
+    try:
+        values = parse_qs(body or "")
+        if "commands" in values:
+            types = {c.get("type", "") for c in _commands(body)}
+            return "commands:" + ",".join(sorted(types))
+        if "resource_types" in values:
+            types = json.loads(values["resource_types"][0])
+            return "resource_types:" + ",".join(sorted(types))
+    except (TypeError, ValueError):
+        pass
+    return ""
+
+
+def _key(
+    method: str,
+    url: str,
+    body: Optional[str] = None,
+) -> Tuple[str, str, str]:
+    """Match requests on method, full URL and, for Sync, what they do.
+
+    Query parameters may come in any order. Dates in them match since
+    a replay runs on the recorded day.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    kind = ""
+    if method.upper() == "POST" and parts.path.endswith("/sync"):
+        kind = _sync_kind(body)
+    return (
+        method.upper(),
+        f"{parts.path}?{query}" if query else parts.path,
+        kind,
+    )
+
+
+def _text(body: Any) -> Optional[str]:
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        return body.decode("utf-8", errors="replace")
+    return str(body)
+
+
+@dataclass
+class Cassette:
+    """Recorded traffic of one run, stored as JSON Lines."""
+    meta: Dict[str, Any] = field(default_factory=dict)
+    interactions: List[Interaction] = field(default_factory=list)
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            meta = {
+                "kind": "meta",
+                "version": CASSETTE_VERSION,
+                **self.meta,
+            }
+            f.write(json.dumps(meta) + "\n")
+            for i in self.interactions:
+                record = {"kind": "interaction", **i.__dict__}
+                f.write(json.dumps(record) + "\n")
+
+    @classmethod
+    def read(cls, path: str) -> "Cassette":
+        cassette = cls()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                kind = record.pop("kind", None)
+                if kind == "meta":
+                    version = record.pop("version", None)
+                    if version != CASSETTE_VERSION:
+                        raise ValueError(
+                            f"Unsupported cassette version: {version}"
+                        )
+                    cassette.meta = record
+                elif kind == "interaction":
+                    cassette.interactions.append(Interaction(**record))
+        return cassette
+
+
+class RecordingSession(requests.Session):
+    """Session that records its traffic into a cassette.
+
+    Streamed responses are read whole so they can be stored; callers
+    iterating over them still see the same bytes.
+    """
+
+    def __init__(self, token: str) -> None:
+        super().__init__()
+        self.token = token
+        self.cassette = Cassette()
+
+    def _scrub(self, text: Optional[str]) -> Optional[str]:
+        if text is None or not self.token:
+            return text
+        return text.replace(self.token, SCRUBBED)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        **kwargs: Any,
+    ) -> requests.Response:
+        started = time.monotonic()
+        resp = super().send(request, **kwargs)
+        content = resp.content
+        seconds = time.monotonic() - started
+        self.cassette.interactions.append(Interaction(
+            method=request.method or "GET",
+            url=self._scrub(request.url) or "",
+            body=self._scrub(_text(request.body)),
+            status=resp.status_code,
+            headers={
+                k: resp.headers[k]
+                for k in _KEPT_HEADERS if k in resp.headers
+            },
+            response=self._scrub(_text(content)) or "",
+            seconds=seconds,
+        ))
+        return resp
+
+
+def _remap_sync_response(
+    recorded: Interaction,
+    body: Optional[str],
+) -> str:
+    """Rewrite a recorded Sync reply for the commands sent now.
+
+    Command uuids and temp ids are random, so the recorded
+    ``sync_status`` is applied to the new commands by position.
+    Commands beyond the recorded batch are acknowledged as ok.
+    """
+    sent = _commands(body)
+    if not sent:
+        return recorded.response
+    try:
+        reply = json.loads(recorded.response)
+    except ValueError:
+        return recorded.response
+    old = _commands(recorded.body)
+    statuses = reply.get("sync_status") or {}
+    mapping = reply.get("temp_id_mapping") or {}
+    new_statuses = {}
+    new_mapping = {}
+    for i, command in enumerate(sent):
+        before = old[i] if i < len(old) else {}
+        new_statuses[command["uuid"]] = statuses.get(
+            before.get("uuid"), "ok",
+        )
+        if "temp_id" in command:
+            new_mapping[command["temp_id"]] = mapping.get(
+                before.get("temp_id"), f"replayed-{command['temp_id']}",
+            )
+    reply["sync_status"] = new_statuses
+    reply["temp_id_mapping"] = new_mapping
+    return json.dumps(reply)
+
+
+def build_response(
+    request: requests.PreparedRequest,
+    status: int,
+    headers: Dict[str, str],
+    content: bytes,
+) -> requests.Response:
+    """A fully read response carrying content, as if from the network."""
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers = CaseInsensitiveDict(headers)
+    resp._content = content
+    resp.encoding = "utf-8"
+    # Serve iter_content() from _content, as for a read response
+    resp._content_consumed = True
+    resp.url = request.url or ""
+    resp.request = request
+    return resp
+
+
+class ReplaySession(requests.Session):
+    """Session that answers from a cassette instead of the network.
+
+    Requests are matched on method and URL, and Sync posts on the
+    kind of their body, in recorded order; anything else raises
+    ReplayMismatch.
+    ``latency_scale`` multiplies the recorded response times: 0 replays
+    as fast as possible, 1 at the original pace.
+    """
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency_scale: float = 0.0,
+    ) -> None:
+        super().__init__()
+        self.latency_scale = latency_scale
+        self._queues: Dict[Tuple[str, str, str], Deque[Interaction]] = (
+            defaultdict(deque)
+        )
+        for i in cassette.interactions:
+            self._queues[i.key].append(i)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        **_kwargs: Any,
+    ) -> requests.Response:
+        body = _text(request.body)
+        key = _key(request.method or "GET", request.url or "", body)
+        queue = self._queues.get(key)
+        if not queue:
+            raise ReplayMismatch(
+                f"No recorded response for {key[0]} {key[1]}"
+                + (f" ({key[2]})" if key[2] else "")
+            )
+        recorded = queue.popleft()
+        if self.latency_scale > 0:
+            time.sleep(recorded.seconds * self.latency_scale)
+
+        resp = build_response(
+            request,
+            recorded.status,
+            recorded.headers,
+            _remap_sync_response(recorded, body).encode("utf-8"),
+        )
+        logging.debug(
+            "Replayed %s %s: HTTP %d", key[0], key[1], recorded.status,
+        )
+        return resp
+
+    def remaining(self) -> int:
+        """Recorded responses not yet served."""
+        return sum(len(q) for q in self._queues.values())
@@ -0,0 +1,265 @@
+"""Undo logs that let a whole sweep be rolled back.
+
+Each live run appends one JSON line per moved task to its own log:
+the due string that puts the task back, the reminders it had and the
+ids of the reminders recreated after the move. A run that moves
+nothing still leaves an empty log, so the latest log is always the
+latest run's and an undo never reaches back past edits made since.
+``undo_run`` turns a log into Sync commands and submits them in
+batches, so rolling back hundreds of tasks takes a handful of
+requests.
+"""
+import contextlib
+import json
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from todoist_api_python.models import Task
+
+from todoistScheduler.private import open_private
+from todoistScheduler.reminders import (
+    reminder_add_command,
+    reminder_delete_command,
+)
+from todoistScheduler.sync import CommandSubmitter, SyncResult
+
+UNDO_SUFFIX = ".jsonl"
+# Logs that were rolled back are renamed with this suffix
+UNDONE_SUFFIX = ".undone"
+
+
+class UndoLog:
+    """Append-only record of the moves made by one run."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    @classmethod
+    def create(cls, directory: str) -> "UndoLog":
+        """Start a new, empty log in directory, named by the time.
+
+        Empty logs of earlier runs are removed; the new one takes
+        their place as the latest.
+        """
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(UNDO_SUFFIX) and os.path.getsize(path) == 0:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+        name = datetime.now().strftime("%Y%m%dT%H%M%S%f") + UNDO_SUFFIX
+        log = cls(os.path.join(directory, name))
+        open_private(log.path, "a").close()
+        return log
+
+    def record(
+        self,
+        task: Task,
+        due_string: Optional[str],
+        reminders: List[Dict[str, Any]],
+        new_reminder_ids: List[str],
+    ) -> None:
+        """Append one moved task.
+
+        Each entry is flushed on its own so a run that dies halfway
+        can still be undone up to the point it reached.
+        """
+        entry = {
+            "task_id": task.id,
+            "content": task.content,
+            "due_string": due_string,
+            "reminders": reminders,
+            "new_reminder_ids": new_reminder_ids,
+        }
+        with open_private(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def rewrite(self, entries: List[Dict[str, Any]]) -> None:
+        """Replace the log with entries, atomically."""
+        tmp = self.path + ".tmp"
+        with open_private(tmp) as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp, self.path)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Read the log, skipping a torn last line."""
+        entries = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logging.warning(
+                        "Skipping unreadable line in %s", self.path,
+                    )
+        return entries
+
+
+def latest_undo_log(directory: str) -> Optional[str]:
+    """Path of the newest log not yet undone, or None."""
+    try:
+        names = sorted(
+            n for n in os.listdir(directory) if n.endswith(UNDO_SUFFIX)
+        )
+    except FileNotFoundError:
+        return None
+    if not names:
+        return None
+    return os.path.join(directory, names[-1])
+
+
+Commands = List[Dict[str, Any]]
+
+
+def _merge(entries: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Merge a log into one entry per task.
+
+    Each keeps the due date its task was first found at and the
+    reminders made by its last move.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        first = merged.setdefault(entry["task_id"], dict(entry))
+        first["new_reminder_ids"] = entry["new_reminder_ids"]
+    return merged
+
+
+def _entry_commands(
+    entry: Dict[str, Any],
+) -> Tuple[Commands, Commands, Commands]:
+    """Reminder deletions, due update and reminder recreations of entry.
+
+    An entry whose due date an earlier undo already restored has no
+    update.
+    """
+    deletes = [
+        reminder_delete_command(rid) for rid in entry["new_reminder_ids"]
+    ]
+    updates = []
+    if not entry.get("due_restored"):
+        due = (
+            {"string": entry["due_string"]}
+            if entry["due_string"] else None
+        )
+        updates.append({
+            "type": "item_update",
+            "uuid": str(uuid.uuid4()),
+            "args": {"id": entry["task_id"], "due": due},
+        })
+    adds = [reminder_add_command(r) for r in entry["reminders"]]
+    return deletes, updates, adds
+
+
+def _ordered(
+    per_task: Iterable[Tuple[Commands, Commands, Commands]],
+) -> Commands:
+    """All reminder deletions, then due updates, then recreations."""
+    deletes: Commands = []
+    updates: Commands = []
+    adds: Commands = []
+    for task_deletes, task_updates, task_adds in per_task:
+        deletes.extend(task_deletes)
+        updates.extend(task_updates)
+        adds.extend(task_adds)
+    return deletes + updates + adds
+
+
+def undo_commands(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build the Sync commands that reverse a run's moves.
+
+    A task moved more than once goes back to where the first entry
+    found it, and only the reminders made by its last move are
+    removed. Reminder deletions come first and recreations last, so
+    the originals are added after the due dates are restored.
+    """
+    return _ordered(
+        _entry_commands(entry) for entry in _merge(entries).values()
+    )
+
+
+def _unfinished(
+    entry: Dict[str, Any],
+    commands: Tuple[Commands, Commands, Commands],
+    result: SyncResult,
+) -> Optional[Dict[str, Any]]:
+    """What is left to undo of entry after result, or None."""
+
+    def failed(command: Dict[str, Any]) -> bool:
+        outcome = result.outcome(command["uuid"])
+        return outcome is None or not outcome.ok
+
+    deletes, updates, adds = commands
+    left = dict(
+        entry,
+        new_reminder_ids=[
+            rid for rid, command in zip(
+                entry["new_reminder_ids"], deletes, strict=True,
+            )
+            if failed(command)
+        ],
+        reminders=[
+            r for r, command in zip(entry["reminders"], adds, strict=True)
+            if failed(command)
+        ],
+        due_restored=not any(failed(command) for command in updates),
+    )
+    if (
+        left["new_reminder_ids"] or left["reminders"]
+        or not left["due_restored"]
+    ):
+        return left
+    return None
+
+
+def undo_run(
+    token: str,
+    path: str,
+    session: requests.Session | None = None,
+    submitter: CommandSubmitter | None = None,
+) -> SyncResult:
+    """Roll back the run recorded in path.
+
+    The log is renamed once every command succeeded, so the same run
+    is not undone twice. After failures it is rewritten with only what
+    is left to undo, and kept for another try.
+    """
+    log = UndoLog(path)
+    entries = log.entries()
+    if not entries:
+        logging.info("Nothing to undo: the run in %s moved no task", path)
+        return SyncResult()
+    merged = _merge(entries)
+    per_task = {
+        task_id: _entry_commands(entry) for task_id, entry in merged.items()
+    }
+    commands = _ordered(per_task.values())
+    logging.info(
+        "Undoing %d move(s) with %d Sync command(s)",
+        len(entries),
+        len(commands),
+    )
+    submitter = submitter or CommandSubmitter(token, session)
+    result = submitter.submit(commands)
+    if result.ok:
+        os.replace(path, path + UNDONE_SUFFIX)
+    else:
+        left = [
+            entry for entry in (
+                _unfinished(merged[task_id], task_commands, result)
+                for task_id, task_commands in per_task.items()
+            )
+            if entry is not None
+        ]
+        log.rewrite(left)
+        logging.warning(
+            "%d undo command(s) failed; keeping %d move(s) in %s",
+            len(result.failed),
+            len(left),
+            path,
+        )
+    return result
@@ -0,0 +1,119 @@
+"""Check the account after a sweep with one incremental sync."""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, List
+
+import requests
+
+from todoistScheduler.plan import Move
+from todoistScheduler.sync import SYNC_API_URL
+
+
+@dataclass
+class Mismatch:
+    """A planned move whose result differs from the plan."""
+    task_id: str
+    content: str
+    expected: str
+    actual: str
+
+
+def _sync(
+    token: str,
+    sync_token: str,
+    resource_types: List[str],
+    session: requests.Session | None = None,
+) -> dict[str, Any]:
+    resp = (session or requests).post(
+        SYNC_API_URL,
+        headers={
+            "Authorization": f"Bearer {token}",
+        },
+        data={
+            "sync_token": sync_token,
+            "resource_types": json.dumps(resource_types),
+        },
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def get_sync_token(
+    token: str,
+    session: requests.Session | None = None,
+) -> str:
+    """Return a sync token marking the account's current state.
+
+    Only the small user resource is requested.
+    """
+    return _sync(token, "*", ["user"], session)["sync_token"]
+
+
+def verify_moves(
+    token: str,
+    sync_token: str,
+    moves: List[Move],
+    session: requests.Session | None = None,
+) -> List[Mismatch]:
+    """Diff the changes since sync_token against applied moves.
+
+    A single request returns every task and reminder changed since
+    the token, however many tasks moved. A task is reported when its
+    due date is not the planned day, or when more of its reminders
+    were deleted than recreated.
+    """
+    delta = _sync(
+        token, sync_token, ["items", "reminders"], session,
+    )
+    items = {
+        str(item["id"]): item for item in delta.get("items", [])
+    }
+    reminder_balance: dict[str, int] = {}
+    for r in delta.get("reminders", []):
+        item_id = str(r.get("item_id"))
+        change = -1 if r.get("is_deleted") else 1
+        reminder_balance[item_id] = (
+            reminder_balance.get(item_id, 0) + change
+        )
+
+    mismatches = []
+    for move in moves:
+        task_id = str(move.task.id)
+        expected = move.day.isoformat()
+        item = items.get(task_id)
+        if item is None:
+            actual = "unchanged"
+        elif item.get("is_deleted"):
+            actual = "deleted"
+        elif not item.get("due"):
+            actual = "no due date"
+        else:
+            actual = str(item["due"]["date"])[:10]
+        if actual != expected:
+            mismatches.append(
+                Mismatch(task_id, move.task.content, expected, actual),
+            )
+        balance = reminder_balance.get(task_id, 0)
+        if balance < 0:
+            mismatches.append(Mismatch(
+                task_id,
+                move.task.content,
+                "reminders kept",
+                f"{-balance} reminder(s) lost",
+            ))
+
+    logging.info(
+        "Verified %d move(s): %d mismatch(es)",
+        len(moves),
+        len(mismatches),
+    )
+    for m in mismatches:
+        logging.warning(
+            "Task '%s' (%s): expected %s, found %s",
+            m.content,
+            m.task_id,
+            m.expected,
+            m.actual,
+        )
+    return mismatches
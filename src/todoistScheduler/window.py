@@ -0,0 +1,59 @@
+"""Read the planning window: overdue tasks and the load of each day.
+
+Shared by live runs and simulations, which read the window from a
+snapshot through the same API calls.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from todoist_api_python.api import TodoistAPI
+from todoist_api_python.models import Task
+
+from todoistScheduler.reschedule import _parse_task_date
+
+
+def fetch_window(
+    api: TodoistAPI,
+    today: date,
+    window_end: date,
+    ignore_tag: str,
+) -> Tuple[List[Task], Dict[date, List[Task]]]:
+    """Fetch eligible tasks due up to window_end in one query.
+
+    Returns the overdue tasks and the existing tasks per day from
+    today through window_end.
+    """
+    before = window_end + timedelta(days=1)
+    pages = api.filter_tasks(
+        query=(
+            f"! p1 & ! @{ignore_tag}"
+            f" & due before: {before.isoformat()}"
+        )
+    )
+    return split_window(
+        (task for page in pages for task in page), today, window_end,
+    )
+
+
+def split_window(
+    tasks: Iterable[Task],
+    today: date,
+    window_end: date,
+) -> Tuple[List[Task], Dict[date, List[Task]]]:
+    """Sort window tasks into overdue ones and loads per day."""
+    overdue_tasks: List[Task] = []
+    day_loads: Dict[date, List[Task]] = {
+        today + timedelta(days=i): []
+        for i in range((window_end - today).days + 1)
+    }
+    for task in tasks:
+        task_day = _parse_task_date(task)
+        if task_day is None:
+            continue
+        # Tasks due earlier today count as today's load, not
+        # overdue, whatever Todoist's idea of overdue is
+        if task_day < today:
+            overdue_tasks.append(task)
+        elif task_day in day_loads:
+            day_loads[task_day].append(task)
+    return overdue_tasks, day_loads
@@ -46,3 +46,37 @@ def create_task(
         duration=None,
         is_collapsed=False,
     )
+
+
+def create_rest_task(
+    id,
+    content,
+    priority=1,
+    due_date_str=None,
+    updated_at='2024-01-01T12:00:00Z',
+):
+    """A task parsed the way the REST client parses it."""
+    due = None
+    if due_date_str:
+        due = {"date": due_date_str, "string": due_date_str}
+    return Task.from_dict({
+        "id": id,
+        "content": content,
+        "description": '',
+        "project_id": '1',
+        "section_id": None,
+        "parent_id": None,
+        "labels": [],
+        "priority": priority,
+        "due": due,
+        "deadline": None,
+        "duration": None,
+        "is_collapsed": False,
+        "order": 0,
+        "assignee_id": None,
+        "assigner_id": None,
+        "completed_at": None,
+        "creator_id": '1',
+        "created_at": '2024-01-01T12:00:00Z',
+        "updated_at": updated_at,
+    })
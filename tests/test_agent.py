@@ -0,0 +1,130 @@
+import os
+import socket
+import stat
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from conftest import create_task
+
+from todoistScheduler.agent import (
+    Agent,
+    _Handler,
+    _listen,
+    _Server,
+    request,
+)
+
+
+class TestAgent(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MagicMock()
+        self.api._token = "tok"
+        self.agent = Agent(self.api)
+
+    def test_ping(self):
+        self.assertEqual(self.agent.handle({"op": "ping"}), {"ok": True})
+
+    def test_unknown_op(self):
+        reply = self.agent.handle({"op": "explode"})
+        self.assertFalse(reply["ok"])
+
+    @patch("todoistScheduler.agent.reschedule_task")
+    def test_reschedule_uses_reminder_cache(self, mock_reschedule):
+        task = create_task("1", "My Task", due_date_str="2026-03-01")
+        self.api.get_task.return_value = task
+        reply = self.agent.handle({
+            "op": "reschedule", "task_id": "1", "date": "2026-03-15",
+        })
+        self.assertEqual(reply, {"ok": True, "content": "My Task"})
+        self.assertIs(
+            mock_reschedule.call_args.kwargs["reminder_cache"],
+            self.agent.reminders,
+        )
+
+    @patch("todoistScheduler.agent.reschedule_task")
+    def test_tasks_come_from_the_index(self, mock_reschedule):
+        index = MagicMock()
+        index.is_stale.return_value = False
+        index.get.return_value = create_task(
+            "1", "Indexed", due_date_str="2026-03-01",
+        )
+        agent = Agent(self.api, index, 60)
+        reply = agent.handle({
+            "op": "reschedule", "task_id": "1", "date": "2026-03-15",
+        })
+
+        self.assertEqual(reply, {"ok": True, "content": "Indexed"})
+        self.api.get_task.assert_not_called()
+        index.refresh.assert_not_called()
+        self.assertIs(mock_reschedule.call_args.args[1], index.get.return_value)
+        index.expire.assert_called_once()
+
+    @patch("todoistScheduler.agent.reschedule_task")
+    def test_stale_index_is_refreshed_first(self, _mock_reschedule):
+        index = MagicMock()
+        index.is_stale.return_value = True
+        index.get.return_value = None
+        self.api.get_task.return_value = create_task("1", "Remote")
+        reply = Agent(self.api, index, 60).handle({
+            "op": "reschedule", "task_id": "1", "date": "2026-03-15",
+        })
+
+        self.assertEqual(reply["content"], "Remote")
+        index.refresh.assert_called_once_with("tok", self.api._session)
+        self.api.get_task.assert_called_once_with(task_id="1")
+
+    def test_fetch_error_is_reported(self):
+        self.api.get_task.side_effect = RuntimeError("404")
+        reply = self.agent.handle({
+            "op": "reschedule", "task_id": "1", "date": "2026-03-15",
+        })
+        self.assertFalse(reply["ok"])
+        self.assertIn("404", reply["error"])
+
+
+class TestSocketRoundTrip(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "agent.sock")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_no_agent_returns_none(self):
+        self.assertIsNone(request(self.path, {"op": "ping"}))
+
+    def test_unusable_socket_returns_none(self):
+        for error in (PermissionError, socket.timeout):
+            with patch("socket.socket.connect", side_effect=error):
+                self.assertIsNone(request(self.path, {"op": "ping"}))
+
+    def test_socket_is_private_from_the_start(self):
+        server = _listen(self.path)
+        try:
+            mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        finally:
+            server.server_close()
+        self.assertEqual(mode & 0o077, 0)
+
+    def test_request_reaches_agent(self):
+        server = _Server(self.path, _Handler)
+        server.agent = MagicMock()
+        server.agent.handle.return_value = {"ok": True}
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            reply = request(self.path, {"op": "ping"}, timeout=5)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+        self.assertEqual(reply, {"ok": True})
+        server.agent.handle.assert_called_once_with({"op": "ping"})
+
+
+if __name__ == '__main__':
+    unittest.main()
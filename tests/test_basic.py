@@ -1,9 +1,13 @@
+import threading
 import unittest
 from unittest.mock import MagicMock, call
 from datetime import date, timedelta
 
-from todoistScheduler.scheduler import Scheduler
-from conftest import create_task
+from todoistScheduler.budget import Budget
+from todoistScheduler.overflow import Horizon
+from todoistScheduler.scheduler import Scheduler, parse_capacity_buckets
+from todoistScheduler.snapshot import _task_from_record
+from conftest import create_rest_task, create_task
 
 
 class TestSchedulerMethods(unittest.TestCase):
@@ -180,5 +184,246 @@ class TestScheduling(unittest.TestCase):
             due_string=expected_due_string
         )
 
+
+class TestCapacityBuckets(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MagicMock()
+        self.today = date(2024, 1, 1)
+        self.tomorrow = self.today + timedelta(days=1)
+
+    def _task(self, id, project_id='inbox', labels=()):
+        task = create_task(id, f'Task {id}', due_date_str='2023-12-31')
+        task.project_id = project_id
+        task.labels = list(labels)
+        return task
+
+    def test_parse(self):
+        self.assertEqual(
+            parse_capacity_buckets('label:home=2, project:123=3'),
+            {'label:home': 2, 'project:123': 3},
+        )
+        self.assertEqual(parse_capacity_buckets(''), {})
+        for bad in ('home=2', 'label:home', 'team:x=1', 'label:home=0'):
+            with self.assertRaises(ValueError):
+                parse_capacity_buckets(bad)
+
+    def test_buckets_fill_independently_in_one_pass(self):
+        scheduler = Scheduler(
+            self.api, self.today, 1, 'no_reschedule',
+            reschedule=MagicMock(),
+            day_loads={self.today: [], self.tomorrow: []},
+            buckets={'project:work': 2, 'label:home': 1},
+        )
+        tasks = [
+            self._task('w1', 'work'),
+            self._task('w2', 'work'),
+            self._task('w3', 'work'),
+            self._task('h1', labels=['home']),
+            self._task('h2', 'work', labels=['home']),
+            self._task('o1'),
+        ]
+        moves = scheduler.plan(tasks)
+
+        by_day = {}
+        for m in moves:
+            by_day.setdefault(m.day, set()).add(m.task.id)
+        self.assertEqual(by_day[self.today], {'w1', 'w2', 'h1', 'o1'})
+        self.assertEqual(by_day[self.tomorrow], {'w3', 'h2'})
+        self.api.filter_tasks.assert_not_called()
+
+    def test_existing_tasks_count_against_their_bucket(self):
+        existing = self._task('e1', labels=['home'])
+        existing.due.date = self.today.isoformat()
+        scheduler = Scheduler(
+            self.api, self.today, 5, 'no_reschedule',
+            day_loads={self.today: [existing], self.tomorrow: []},
+            buckets={'label:home': 1},
+        )
+        moves = scheduler.plan([self._task('h1', labels=['home'])])
+        # The older overdue task ranks first and displaces the existing one
+        self.assertEqual(
+            [(m.task.id, m.day) for m in moves],
+            [('h1', self.today), ('e1', self.tomorrow)],
+        )
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MagicMock()
+        self.threads = []
+
+        def filter_tasks(**_kwargs):
+            self.threads.append(threading.current_thread().name)
+            return iter([[]])
+
+        self.api.filter_tasks.side_effect = filter_tasks
+        self.tasks = [
+            create_task(str(i), f'Task {i}', due_date_str='2023-12-31')
+            for i in range(6)
+        ]
+
+    def _plan(self, prefetch_depth):
+        budget = Budget()
+        scheduler = Scheduler(
+            self.api, date(2024, 1, 1), 2, 'no_reschedule',
+            budget=budget, prefetch_depth=prefetch_depth,
+        )
+        moves = scheduler.plan(list(self.tasks))
+        return [(m.task.id, m.day) for m in moves], budget.calls
+
+    def test_matches_serial_plan_without_extra_fetches(self):
+        serial = self._plan(0)
+        self.threads.clear()
+        prefetched = self._plan(2)
+
+        self.assertEqual(prefetched, serial)
+        self.assertEqual(len(self.threads), 3)
+        self.assertEqual(
+            sum(name.startswith('day-load') for name in self.threads), 2,
+        )
+
+    def test_prefetch_stays_within_the_horizon(self):
+        scheduler = Scheduler(
+            self.api, date(2024, 1, 1), 2, 'no_reschedule',
+            prefetch_depth=4, horizon=Horizon(days=2),
+        )
+        scheduler.plan(list(self.tasks))
+        self.assertEqual(len(self.threads), 2)
+
+    def test_prefetch_stays_within_the_budget(self):
+        budget = Budget(max_calls=2, truncate=True)
+        scheduler = Scheduler(
+            self.api, date(2024, 1, 1), 1, 'no_reschedule',
+            budget=budget, prefetch_depth=4,
+        )
+        scheduler.plan(list(self.tasks))
+        self.assertEqual(len(self.threads), 2)
+        self.assertEqual(budget.calls, 2)
+
+    def test_unused_prefetches_are_charged(self):
+        budget = Budget()
+        scheduler = Scheduler(
+            self.api, date(2024, 1, 1), 2, 'no_reschedule',
+            budget=budget, prefetch_depth=2,
+        )
+        scheduler._prefetch_after(date(2024, 1, 1), 6, 0, 0)
+        scheduler._stop_prefetch()
+        # Prefetches not started yet are cancelled; the rest are paid for
+        self.assertGreaterEqual(len(self.threads), 1)
+        self.assertEqual(budget.calls, len(self.threads))
+
+    def test_workers_use_their_own_clients(self):
+        worker_apis = []
+
+        def make_api():
+            worker_api = MagicMock()
+            worker_api.filter_tasks.side_effect = self.api.filter_tasks
+            worker_apis.append(worker_api)
+            return worker_api
+
+        scheduler = Scheduler(
+            self.api, date(2024, 1, 1), 2, 'no_reschedule',
+            prefetch_depth=2, worker_api=make_api,
+        )
+        scheduler.plan(list(self.tasks))
+
+        self.assertEqual(
+            sorted(name.startswith('day-load') for name in self.threads),
+            [False, True, True],
+        )
+        self.assertLessEqual(len(worker_apis), 2)
+        self.assertEqual(
+            sum(a.filter_tasks.call_count for a in worker_apis), 2,
+        )
+
+
+class TestConflicts(unittest.TestCase):
+
+    def setUp(self):
+        self.today = date(2024, 1, 2)
+        self.days = [self.today + timedelta(days=i) for i in range(3)]
+        self.a = create_task('a', 'A', priority=3, due_date_str='2024-01-01')
+        self.b = create_task('b', 'B', priority=2, due_date_str='2024-01-01')
+        self.conflicts = MagicMock()
+
+    def _scheduler(self):
+        return Scheduler(
+            MagicMock(), self.today, 1, 'no_reschedule',
+            reschedule=MagicMock(),
+            day_loads={day: [] for day in self.days},
+            conflicts=self.conflicts,
+        )
+
+    def _edited(self, task, **fields):
+        edited = create_task(task.id, task.content, due_date_str='2024-01-01')
+        edited.updated_at = '2024-01-02T08:00:00Z'
+        for name, value in fields.items():
+            setattr(edited, name, value)
+        return edited
+
+    def test_unchanged_versions_keep_the_plan(self):
+        self.conflicts.return_value = {'b': self.b}
+        scheduler = self._scheduler()
+        moves = scheduler.schedule_and_push_down([self.a, self.b])
+
+        self.assertEqual(
+            [(m.task.id, m.day) for m in moves],
+            [('a', self.days[0]), ('b', self.days[1])],
+        )
+
+    def test_completed_task_is_not_written(self):
+        self.conflicts.return_value = {'a': None}
+        scheduler = self._scheduler()
+        moves = scheduler.schedule_and_push_down([self.a, self.b])
+
+        self.assertEqual([(m.task.id, m.day) for m in moves],
+                         [('b', self.days[1])])
+        scheduler.reschedule.assert_called_once_with(
+            scheduler.api, self.b, self.days[1],
+            due_string='2024-01-03', day_delta=2,
+        )
+
+    def test_edited_task_is_replanned_around_new_load(self):
+        edited = self._edited(self.a, priority=1)
+        added = create_task('n', 'New', priority=2, due_date_str='2024-01-02')
+        self.conflicts.return_value = {'a': edited, 'n': added}
+        scheduler = self._scheduler()
+        moves = scheduler.schedule_and_push_down([self.a, self.b])
+
+        self.assertEqual(
+            {(m.task.id, m.day) for m in moves},
+            {('b', self.days[1]), ('a', self.days[2])},
+        )
+        moved = {m.task.id: m.task for m in moves}
+        self.assertIs(moved['a'], edited)
+
+    def test_sync_tasks_compare_with_rest_tasks(self):
+        a = create_rest_task('a', 'A', priority=3, due_date_str='2024-01-01')
+        b = create_rest_task('b', 'B', priority=2, due_date_str='2024-01-01')
+
+        def synced(task, **fields):
+            record = {
+                "id": task.id, "content": task.content, "project_id": '1',
+                "priority": task.priority,
+                "due": {"date": "2024-01-01", "string": "2024-01-01"},
+                "updated_at": "2024-01-01T12:00:00.000000Z",
+            }
+            record.update(fields)
+            return _task_from_record(record)
+
+        edited = synced(a, priority=1, updated_at="2024-01-02T08:00:00Z")
+        self.conflicts.return_value = {'a': edited, 'b': synced(b)}
+        scheduler = self._scheduler()
+        moves = scheduler.schedule_and_push_down([a, b])
+
+        self.assertEqual(
+            {(m.task.id, m.day) for m in moves},
+            {('a', self.days[0]), ('b', self.days[1])},
+        )
+        self.assertIs({m.task.id: m.task for m in moves}['b'], b)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
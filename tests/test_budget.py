@@ -0,0 +1,149 @@
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from conftest import create_task
+
+from todoistScheduler.budget import CALLS_PER_MOVE, Budget, BudgetExceeded
+from todoistScheduler.main import deadline_from
+from todoistScheduler.plan import Move
+from todoistScheduler.scheduler import Scheduler
+
+
+def _move(id, priority, due, day):
+    task = create_task(id, id, priority=priority, due_date_str=due)
+    return Move(task, date(2024, 1, day))
+
+
+def _moves():
+    return [
+        _move('low', 1, '2023-12-01', 1),
+        _move('high', 4, '2023-12-30', 1),
+        _move('old', 4, '2023-11-01', 2),
+    ]
+
+
+class TestBudget(unittest.TestCase):
+
+    def test_unlimited_keeps_everything(self):
+        moves = _moves()
+        kept, dropped = Budget().fit(moves)
+        self.assertEqual(kept, moves)
+        self.assertEqual(dropped, [])
+
+    def test_refuses_over_budget(self):
+        budget = Budget(max_calls=2 * CALLS_PER_MOVE)
+        with self.assertRaises(BudgetExceeded):
+            budget.fit(_moves())
+
+    def test_truncates_to_highest_priority(self):
+        budget = Budget(max_calls=2 * CALLS_PER_MOVE + 1, truncate=True)
+        budget.charge(1)
+        kept, dropped = budget.fit(_moves())
+        self.assertEqual([m.task.id for m in kept], ['old', 'high'])
+        self.assertEqual([m.task.id for m in dropped], ['low'])
+
+    @patch("todoistScheduler.budget.time.monotonic", return_value=10.0)
+    def test_runtime_limit_uses_observed_latency(self, _mock_clock):
+        budget = Budget(max_seconds=100, truncate=True, started=0.0)
+        budget.charge(2, 10.0)  # 5s per call, 20s per move
+        moves = [
+            _move(str(i), 1, '2023-12-01', 1) for i in range(6)
+        ]
+        kept, dropped = budget.fit(moves)
+        # 90s left fit four moves of 20s
+        self.assertEqual(len(kept), 4)
+        self.assertEqual(len(dropped), 2)
+
+
+class TestSchedulerBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MagicMock()
+        self.api._token = "tok"
+        self.api.update_task.return_value = True
+        # Each day query reads one page, with no tasks on it
+        self.api.filter_tasks.side_effect = lambda **_: iter([[]])
+        self.tasks = [
+            create_task(str(i), f'Task {i}', priority=1 + i % 4,
+                        due_date_str='2023-12-01')
+            for i in range(6)
+        ]
+
+    def test_planning_stops_when_calls_run_out(self):
+        budget = Budget(max_calls=2)
+        scheduler = Scheduler(self.api, date(2024, 1, 1), 1,
+                              'no_reschedule', budget=budget)
+        with self.assertRaises(BudgetExceeded):
+            scheduler.schedule_and_push_down(self.tasks)
+        self.api.update_task.assert_not_called()
+
+    def test_truncated_run_moves_high_priority_first(self):
+        budget = Budget(max_calls=3 + 2 * CALLS_PER_MOVE, truncate=True)
+        scheduler = Scheduler(self.api, date(2024, 1, 1), 2,
+                              'no_reschedule', budget=budget,
+                              reschedule=MagicMock())
+        scheduler.schedule_and_push_down(self.tasks)
+        moved = [c.args[1].priority
+                 for c in scheduler.reschedule.call_args_list]
+        self.assertEqual(moved, [4, 3])
+
+
+class TestDeadline(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = 0.0
+        patcher = patch(
+            "todoistScheduler.scheduler.time.monotonic",
+            side_effect=lambda: self.clock,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _reschedule(self, _api, _task, _day):
+        self.clock += 3.0
+
+    def _scheduler(self, deadline):
+        self.reschedule = MagicMock(side_effect=self._reschedule)
+        return Scheduler(MagicMock(), date(2024, 1, 1), 5, 'no_reschedule',
+                         reschedule=self.reschedule, deadline=deadline)
+
+    def test_applies_most_valuable_first_and_defers_the_rest(self):
+        scheduler = self._scheduler(deadline=8.0)
+        applied = scheduler.apply(_moves())
+
+        self.assertEqual([m.task.id for m in applied], ['old', 'high'])
+        self.assertEqual([t.id for t in scheduler.deferred], ['low'])
+        self.assertEqual(self.reschedule.call_count, 2)
+
+    def test_no_deadline_keeps_plan_order(self):
+        scheduler = self._scheduler(deadline=None)
+        applied = scheduler.apply(_moves())
+        self.assertEqual([m.task.id for m in applied], ['low', 'high', 'old'])
+
+    def test_passed_deadline_plans_nothing(self):
+        scheduler = self._scheduler(deadline=1.0)
+        moves = scheduler.schedule_and_push_down(
+            [m.task for m in _moves()],
+        )
+        self.assertEqual(moves, [])
+        self.assertEqual(len(scheduler.deferred), 3)
+        scheduler.api.filter_tasks.assert_not_called()
+
+    def test_deadline_from_wall_clock(self):
+        now = datetime(2024, 1, 1, 6, 0, tzinfo=timezone.utc)
+        with patch("todoistScheduler.main.time.monotonic", return_value=100.0):
+            self.assertEqual(deadline_from("06:30", now), 100.0 + 1800)
+            self.assertEqual(
+                deadline_from("2024-01-01T07:00:00+00:00", now),
+                100.0 + 3600,
+            )
+
+    def test_past_clock_time_means_tomorrow(self):
+        now = datetime(2024, 1, 1, 21, 30, tzinfo=timezone.utc)
+        with patch("todoistScheduler.main.time.monotonic", return_value=100.0):
+            self.assertEqual(deadline_from("06:00", now), 100.0 + 8.5 * 3600)
+
+
+if __name__ == '__main__':
+    unittest.main()
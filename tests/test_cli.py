@@ -67,12 +67,16 @@ class TestBuildParser(unittest.TestCase):
         self.assertTrue(args.verbose)
 
 
+@patch(
+    "todoistScheduler.cli.agent_request",
+    return_value=None,
+)
 class TestMain(unittest.TestCase):
 
     @patch("todoistScheduler.cli.TodoistAPI")
     @patch("todoistScheduler.cli.config")
     def test_reschedules_task(
-        self, mock_config, mock_api_cls
+        self, mock_config, mock_api_cls, _mock_agent
     ):
         mock_config.TODOIST_API_KEY = "test-key"
         mock_config.USER_TZ = "UTC"
@@ -96,12 +100,103 @@ class TestMain(unittest.TestCase):
         )
 
     @patch("todoistScheduler.cli.config")
-    def test_exits_without_api_key(self, mock_config):
+    def test_exits_without_api_key(
+        self, mock_config, _mock_agent
+    ):
         mock_config.TODOIST_API_KEY = ""
         with self.assertRaises(SystemExit) as ctx:
             main(["1", "2026-03-15"])
         self.assertEqual(ctx.exception.code, 1)
 
+    @patch("todoistScheduler.cli.TodoistAPI")
+    @patch("todoistScheduler.cli.config")
+    def test_forwards_to_agent(
+        self, mock_config, mock_api_cls, mock_agent
+    ):
+        mock_config.AGENT_SOCKET = "/tmp/agent.sock"
+        mock_agent.return_value = {
+            "ok": True, "content": "My Task",
+        }
+
+        main(["1", "2026-03-15"])
+
+        mock_agent.assert_called_once_with(
+            "/tmp/agent.sock",
+            {
+                "op": "reschedule",
+                "task_id": "1",
+                "date": "2026-03-15",
+            },
+        )
+        mock_api_cls.assert_not_called()
+
+    @patch("todoistScheduler.cli.config")
+    def test_agent_error_exits(
+        self, _mock_config, mock_agent
+    ):
+        mock_agent.return_value = {
+            "ok": False, "error": "boom",
+        }
+        with self.assertRaises(SystemExit) as ctx:
+            main(["1", "2026-03-15"])
+        self.assertEqual(ctx.exception.code, 1)
+
+    @patch("todoistScheduler.cli.TodoistAPI")
+    @patch("todoistScheduler.cli.config")
+    def test_no_agent_flag(
+        self, mock_config, mock_api_cls, mock_agent
+    ):
+        mock_config.TODOIST_API_KEY = "test-key"
+        mock_api = MagicMock()
+        mock_api_cls.return_value = mock_api
+        mock_api.get_task.return_value = create_task(
+            "1", "My Task", due_date_str="2026-03-01",
+        )
+
+        main(["--no-agent", "1", "2026-03-15"])
+
+        mock_agent.assert_not_called()
+        mock_api.update_task.assert_called_once()
+
+    @patch("todoistScheduler.cli.TaskIndex")
+    @patch("todoistScheduler.cli.TodoistAPI")
+    @patch("todoistScheduler.cli.config")
+    def test_content_query_uses_index(
+        self, mock_config, mock_api_cls, mock_index_cls, mock_agent
+    ):
+        mock_config.TODOIST_API_KEY = "test-key"
+        mock_config.HTTP_CACHE_DIR = ""
+        mock_api = MagicMock()
+        mock_api_cls.return_value = mock_api
+        task = create_task("7", "Pay rent", due_date_str="2026-03-01")
+        index = mock_index_cls.return_value
+        index.is_stale.return_value = False
+        index.resolve.return_value = task
+
+        main(["pay rent", "2026-03-15"])
+
+        index.refresh.assert_not_called()
+        index.resolve.assert_called_once_with("pay rent")
+        self.assertEqual(mock_agent.call_args.args[1]["task_id"], "7")
+        mock_api.get_task.assert_not_called()
+        mock_api.update_task.assert_called_once_with(
+            task_id="7",
+            due_string="2026-03-15",
+        )
+
+    @patch("todoistScheduler.cli.TaskIndex")
+    @patch("todoistScheduler.cli.config")
+    def test_ambiguous_query_exits(
+        self, _mock_config, mock_index_cls, mock_agent
+    ):
+        index = mock_index_cls.return_value
+        index.is_stale.return_value = False
+        index.resolve.side_effect = LookupError("'pay' matches 2 tasks")
+        with self.assertRaises(SystemExit) as ctx:
+            main(["--search", "pay", "2026-03-15"])
+        self.assertEqual(ctx.exception.code, 1)
+        mock_agent.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,69 @@
+import io
+import logging
+import unittest
+from unittest.mock import MagicMock
+
+from todoistScheduler.debuglog import RingBufferHandler, install, lazy
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = RingBufferHandler(capacity=3)
+
+    def _debug(self, msg, *args):
+        # Straight to the handler, so no other handler formats it
+        self.ring.handle(logging.LogRecord(
+            "test", logging.DEBUG, __file__, 0, msg, args, None,
+        ))
+
+    def test_keeps_only_the_last_records(self):
+        for i in range(5):
+            self._debug("record %d", i)
+        out = io.StringIO()
+        self.ring.dump(out)
+        text = out.getvalue()
+        self.assertNotIn("record 1", text)
+        self.assertIn("record 2", text)
+        self.assertIn("record 4", text)
+
+    def test_lazy_payload_built_only_when_dumped(self):
+        build = MagicMock(return_value="payload")
+        self._debug("expensive: %s", lazy(build))
+        build.assert_not_called()
+
+        out = io.StringIO()
+        self.ring.dump(out)
+        build.assert_called_once_with()
+        self.assertIn("expensive: payload", out.getvalue())
+
+    def test_lazy_payload_dropped_unseen(self):
+        build = MagicMock()
+        self._debug("expensive: %s", lazy(build))
+        for i in range(3):
+            self._debug("newer %d", i)
+        self.ring.dump(io.StringIO())
+        build.assert_not_called()
+
+
+class TestInstall(unittest.TestCase):
+
+    def test_reinstall_replaces_handlers(self):
+        root = logging.getLogger()
+        before = list(root.handlers)
+        level = root.level
+        try:
+            install(10)
+            ring = install(10)
+            added = [h for h in root.handlers if h not in before]
+            self.assertEqual(len(added), 2)
+            self.assertIn(ring, added)
+        finally:
+            for h in root.handlers[:]:
+                if h not in before:
+                    root.removeHandler(h)
+            root.setLevel(level)
+
+
+if __name__ == '__main__':
+    unittest.main()
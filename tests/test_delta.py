@@ -0,0 +1,115 @@
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from conftest import create_task
+
+from todoistScheduler.delta import (
+    apply_delta,
+    changed_tasks,
+    eligible,
+    refresh_window,
+)
+
+
+def _item(id, day, **fields):
+    item = {
+        "id": id,
+        "content": f"Task {id}",
+        "project_id": "p",
+        "labels": [],
+        "priority": 1,
+        "due": {"date": day, "string": day, "is_recurring": False},
+        "updated_at": "2024-01-10T08:00:00Z",
+    }
+    item.update(fields)
+    return item
+
+
+class TestEligible(unittest.TestCase):
+
+    def test_matches_window_query(self):
+        end = date(2024, 1, 12)
+        self.assertTrue(eligible(
+            create_task('1', 'A', due_date_str='2024-01-12'), 'x', end,
+        ))
+        self.assertFalse(eligible(
+            create_task('1', 'A', due_date_str='2024-01-13'), 'x', end,
+        ))
+        self.assertFalse(eligible(
+            create_task('1', 'A', priority=4, due_date_str='2024-01-01'),
+            'x', end,
+        ))
+        self.assertFalse(eligible(create_task('1', 'A'), 'x', end))
+
+
+class TestApplyDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.end = date(2024, 1, 12)
+        self.tasks = {
+            '1': create_task('1', 'Done', due_date_str='2024-01-05'),
+            '2': create_task('2', 'Gone', due_date_str='2024-01-11'),
+            '3': create_task('3', 'Moved', due_date_str='2024-01-11'),
+            '4': create_task('4', 'Same', due_date_str='2024-01-12'),
+        }
+
+    def test_patches_changed_tasks_only(self):
+        touched = apply_delta(self.tasks, [
+            _item('1', '2024-01-05', checked=True),
+            _item('2', '2024-01-11', is_deleted=True),
+            _item('3', '2024-02-01'),
+            _item('5', '2024-01-09'),
+            _item('6', '2024-01-09', labels=['x']),
+            _item('7', '2024-03-01'),
+        ], 'x', self.end)
+
+        self.assertEqual(touched, 4)
+        self.assertEqual(sorted(self.tasks), ['4', '5'])
+        self.assertEqual(str(self.tasks['5'].due.date), '2024-01-09')
+
+    @patch("todoistScheduler.delta._sync")
+    def test_full_sync_rebuilds(self, mock_sync):
+        mock_sync.return_value = {
+            "sync_token": "new",
+            "full_sync": True,
+            "items": [_item('9', '2024-01-10')],
+        }
+        token = refresh_window("tok", "old", self.tasks, 'x', self.end)
+
+        self.assertEqual(token, "new")
+        self.assertEqual(list(self.tasks), ['9'])
+        self.assertEqual(mock_sync.call_args.args[1:3], ("old", ["items"]))
+
+
+class TestChangedTasks(unittest.TestCase):
+
+    @patch("todoistScheduler.delta._sync")
+    def test_maps_ineligible_tasks_to_none(self, mock_sync):
+        mock_sync.return_value = {
+            "sync_token": "new",
+            "items": [
+                _item('1', '2030-01-01'),
+                _item('2', '2024-01-01', checked=True),
+                _item('3', '2024-01-01', labels=['x']),
+            ],
+        }
+        changed = changed_tasks("tok", "old", 'x')
+
+        self.assertEqual(sorted(changed), ['1', '2', '3'])
+        self.assertEqual(str(changed['1'].due.date), '2030-01-01')
+        self.assertIsNone(changed['2'])
+        self.assertIsNone(changed['3'])
+
+    @patch("todoistScheduler.delta._sync")
+    def test_full_sync_reports_nothing(self, mock_sync):
+        mock_sync.return_value = {
+            "sync_token": "new",
+            "full_sync": True,
+            "items": [_item('1', '2024-01-01')],
+        }
+        self.assertEqual(changed_tasks("tok", "old", 'x'), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
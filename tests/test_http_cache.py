@@ -0,0 +1,92 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+
+from todoistScheduler.http_cache import CachingSession
+
+URL = "https://api.todoist.com/api/v1/tasks/filter?query=due+on+2024-01-10"
+
+
+def _response(payload, status=200, headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps(payload).encode() if payload is not None else b""
+    resp.headers.update(headers or {})
+    return resp
+
+
+@patch("requests.Session.send")
+class TestCachingSession(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.session = CachingSession(self.dir.name, ttl=60)
+
+    def test_ttl_hit_without_validators(self, mock_send):
+        mock_send.return_value = _response({"results": [1]})
+        first = self.session.get(URL)
+        second = self.session.get(URL)
+
+        mock_send.assert_called_once()
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.session.hits, 1)
+
+    def test_expired_entry_is_refetched(self, mock_send):
+        mock_send.return_value = _response({"results": [1]})
+        self.session.ttl = 0
+        self.session.get(URL)
+        self.session.get(URL)
+        self.assertEqual(mock_send.call_count, 2)
+
+    def test_etag_revalidation(self, mock_send):
+        mock_send.side_effect = [
+            _response({"results": [1]}, headers={"ETag": '"v1"'}),
+            _response(None, status=304),
+        ]
+        self.session.get(URL)
+        second = self.session.get(URL)
+
+        sent = mock_send.call_args.args[0]
+        self.assertEqual(sent.headers["If-None-Match"], '"v1"')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), {"results": [1]})
+        self.assertEqual(self.session.revalidated, 1)
+
+    def test_query_is_part_of_the_key(self, mock_send):
+        mock_send.return_value = _response({"results": []})
+        self.session.get(URL)
+        self.session.get(URL.replace("2024-01-10", "2024-01-11"))
+        self.assertEqual(mock_send.call_count, 2)
+
+    def test_writes_invalidate(self, mock_send):
+        mock_send.return_value = _response({"results": []})
+        other = os.path.join(self.dir.name, "keep.txt")
+        open(other, "w").close()
+        self.session.get(URL)
+        self.session.post(
+            "https://api.todoist.com/api/v1/tasks/1",
+            json={"due_string": "tomorrow"},
+        )
+        self.session.get(URL)
+
+        self.assertEqual(mock_send.call_count, 3)
+        self.assertTrue(os.path.exists(other))
+
+    def test_sync_reads_keep_the_cache(self, mock_send):
+        mock_send.return_value = _response({"results": []})
+        self.session.get(URL)
+        self.session.post(
+            "https://api.todoist.com/api/v1/sync",
+            data={"sync_token": "*", "resource_types": '["reminders"]'},
+        )
+        self.session.get(URL)
+        self.assertEqual(mock_send.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from todoistScheduler.lease import FileLeaseBackend, RunLease
+
+
+class TestFileLeaseBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "run.lease")
+        self.backend = FileLeaseBackend(self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_only_one_owner(self):
+        self.assertTrue(self.backend.try_acquire("a", 60))
+        self.assertFalse(self.backend.try_acquire("b", 60))
+        self.backend.release("a")
+        self.assertTrue(self.backend.try_acquire("b", 60))
+
+    def _age(self, seconds):
+        then = time.time() - seconds
+        os.utime(self.path, (then, then))
+
+    def test_takes_over_stale_lease(self):
+        self.assertTrue(self.backend.try_acquire("a", 60))
+        self._age(61)
+        self.assertTrue(self.backend.try_acquire("b", 60))
+        self.assertFalse(self.backend.renew("a", 60))
+        self.assertTrue(self.backend.renew("b", 60))
+        self.assertEqual(os.listdir(self.dir.name), ["run.lease"])
+
+    def test_renewal_keeps_the_lease(self):
+        self.assertTrue(self.backend.try_acquire("a", 60))
+        self._age(50)
+        self.assertTrue(self.backend.renew("a", 60))
+        self._age(30)
+        self.assertFalse(self.backend.try_acquire("b", 60))
+
+    def test_unreadable_lease_is_held_until_old(self):
+        with open(self.path, "w") as f:
+            f.write('{"own')
+        self.assertFalse(self.backend.try_acquire("b", 60))
+        self._age(61)
+        self.assertTrue(self.backend.try_acquire("b", 60))
+
+    def test_lease_renewed_while_judged_stale_is_put_back(self):
+        self.assertTrue(self.backend.try_acquire("a", 60))
+        self._age(61)
+
+        def renewed_meanwhile(_lease, _ttl):
+            # The holder's heartbeat touches the lease right after
+            os.utime(self.path)
+            return True
+
+        with patch.object(
+            self.backend, "_expired", side_effect=renewed_meanwhile,
+        ):
+            self.assertFalse(self.backend.try_acquire("b", 60))
+        with open(self.path) as f:
+            self.assertEqual(json.load(f)["owner"], "a")
+        self.assertEqual(os.listdir(self.dir.name), ["run.lease"])
+
+    def test_release_ignores_other_owner(self):
+        self.backend.try_acquire("a", 60)
+        self.backend.release("b")
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_rerun_request_is_consumed_once(self):
+        self.assertFalse(self.backend.take_rerun_request())
+        self.backend.request_rerun()
+        self.assertTrue(self.backend.take_rerun_request())
+        self.assertFalse(self.backend.take_rerun_request())
+
+
+class TestRunLease(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.backend = FileLeaseBackend(
+            os.path.join(self.dir.name, "run.lease"),
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_second_run_exits(self):
+        with RunLease(self.backend) as first:
+            self.assertTrue(first.acquired)
+            with RunLease(self.backend, policy="exit") as second:
+                self.assertFalse(second.acquired)
+        with RunLease(self.backend) as third:
+            self.assertTrue(third.acquired)
+
+    def test_coalesce_requests_rerun(self):
+        with RunLease(self.backend) as first:
+            with RunLease(self.backend, policy="coalesce") as second:
+                self.assertFalse(second.acquired)
+            self.assertTrue(first.rerun_requested())
+            self.assertFalse(first.rerun_requested())
+
+    def test_wait_times_out(self):
+        with RunLease(self.backend):
+            lease = RunLease(
+                self.backend, policy="wait",
+                wait_timeout=0.05, poll_interval=0.01,
+            )
+            with lease:
+                self.assertFalse(lease.acquired)
+
+    def test_heartbeat_renews(self):
+        with RunLease(self.backend, ttl=0.06) as lease:
+            time.sleep(0.15)
+            self.assertFalse(self.backend.try_acquire("other", 1))
+            self.assertTrue(lease.acquired)
+
+    def test_rejects_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            RunLease(self.backend, policy="queue")
+
+
+if __name__ == '__main__':
+    unittest.main()
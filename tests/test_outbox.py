@@ -0,0 +1,263 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+import requests
+from conftest import create_task
+
+from todoistScheduler.outbox import Outbox, is_transient
+from todoistScheduler.reschedule import reschedule_task
+from todoistScheduler.sync import CommandSubmitter
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+def _reminder(rid, day):
+    return {
+        "id": rid, "item_id": "1", "type": "absolute",
+        "due": {"date": f"{day}T09:00:00"},
+    }
+
+
+class TestIsTransient(unittest.TestCase):
+
+    def test_classifies_errors(self):
+        self.assertTrue(is_transient(requests.ConnectionError()))
+        self.assertTrue(is_transient(requests.Timeout()))
+        self.assertTrue(is_transient(_http_error(429)))
+        self.assertTrue(is_transient(_http_error(503)))
+        self.assertFalse(is_transient(_http_error(400)))
+        self.assertFalse(is_transient(ValueError()))
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "outbox.json")
+        self.task = create_task('1', 'Task', due_date_str='2024-01-10')
+
+    def test_persists_between_instances(self):
+        Outbox(self.path).add(
+            self.task, date(2024, 1, 12), due_string="2024-01-12",
+        )
+        self.assertEqual(len(Outbox(self.path)), 1)
+
+    def test_merges_to_final_state(self):
+        outbox = Outbox(self.path)
+        outbox.add(
+            self.task, date(2024, 1, 12),
+            due_string="2024-01-12",
+            delete_ids=["r1"],
+            reminders=[_reminder("r1", "2024-01-10")],
+            from_day=date(2024, 1, 10),
+        )
+        outbox.add(
+            self.task, date(2024, 1, 15),
+            due_string="2024-01-15",
+            delete_ids=["r1"],
+            reminders=[_reminder("r1", "2024-01-10")],
+            from_day=date(2024, 1, 10),
+        )
+        commands = outbox._commands()["1"]
+        self.assertEqual(
+            [c["type"] for c in commands],
+            ["item_update", "reminder_delete", "reminder_add"],
+        )
+        self.assertEqual(commands[0]["args"]["due"], {"string": "2024-01-15"})
+        self.assertEqual(
+            commands[2]["args"]["due"]["date"], "2024-01-15T09:00:00",
+        )
+
+    def test_reminders_follow_a_later_move(self):
+        outbox = Outbox(self.path)
+        outbox.add(
+            self.task, date(2024, 1, 12),
+            reminders=[_reminder("r1", "2024-01-10")],
+            from_day=date(2024, 1, 10),
+        )
+        outbox.moved(self.task, date(2024, 1, 14))
+        commands = outbox._commands()["1"]
+        self.assertEqual([c["type"] for c in commands], ["reminder_add"])
+        self.assertEqual(
+            commands[0]["args"]["due"]["date"], "2024-01-14T09:00:00",
+        )
+
+    def test_moved_drops_stale_update(self):
+        outbox = Outbox(self.path)
+        outbox.add(self.task, date(2024, 1, 12), due_string="2024-01-12")
+        outbox.moved(self.task, date(2024, 1, 14))
+        self.assertEqual(len(outbox), 0)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_flush_sends_one_batch_and_keeps_failures(self):
+        outbox = Outbox(self.path)
+        other = create_task('2', 'Other', due_date_str='2024-01-10')
+        outbox.add(self.task, date(2024, 1, 12), due_string="2024-01-12")
+        outbox.add(other, date(2024, 1, 13), due_string="2024-01-13")
+
+        def submit(commands, result):
+            result.add_response(commands, {"sync_status": {
+                c["uuid"]: "ok" for c in commands if c["args"]["id"] == "1"
+            }})
+            return result
+
+        submitter = MagicMock()
+        submitter.submit.side_effect = submit
+        outbox.flush("tok", submitter=submitter)
+
+        submitter.submit.assert_called_once()
+        self.assertEqual(len(submitter.submit.call_args.args[0]), 2)
+        self.assertEqual(list(Outbox(self.path).entries), ["2"])
+
+    def test_flush_follows_retried_commands(self):
+        outbox = Outbox(self.path)
+        outbox.add(self.task, date(2024, 1, 12), due_string="2024-01-12")
+        sent = []
+
+        def post(_url, data, **_kwargs):
+            commands = json.loads(data["commands"])
+            sent.extend(commands)
+            status = "ok" if len(sent) > 1 else {
+                "error": "Service unavailable", "http_code": 503,
+            }
+            return MagicMock(status_code=200, json=lambda: {
+                "sync_status": {c["uuid"]: status for c in commands},
+            })
+
+        session = MagicMock()
+        session.post.side_effect = post
+        result = outbox.flush("tok", session=session)
+
+        self.assertTrue(result.ok)
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(len(Outbox(self.path)), 0)
+
+    def test_flush_drops_batches_sent_before_an_error(self):
+        outbox = Outbox(self.path)
+        outbox.add(
+            self.task, date(2024, 1, 12),
+            due_string="2024-01-12",
+            reminders=[_reminder("r1", "2024-01-10")],
+            from_day=date(2024, 1, 10),
+        )
+        sent = []
+
+        def post(_url, data, **_kwargs):
+            commands = json.loads(data["commands"])
+            sent.extend(commands)
+            if commands[0]["type"] == "reminder_add":
+                raise requests.ConnectionError("reset")
+            return MagicMock(status_code=200, json=lambda: {
+                "sync_status": {c["uuid"]: "ok" for c in commands},
+            })
+
+        session = MagicMock()
+        session.post.side_effect = post
+        submitter = CommandSubmitter("tok", session, initial_batch=1)
+        with self.assertRaises(requests.ConnectionError):
+            outbox.flush("tok", submitter=submitter)
+
+        self.assertEqual(len(sent), 2)
+        entry = Outbox(self.path).entries["1"]
+        self.assertIsNone(entry["due_string"])
+        self.assertEqual(len(entry["reminders"]), 1)
+
+    def test_flush_keeps_only_failed_operations(self):
+        outbox = Outbox(self.path)
+        outbox.add(
+            self.task, date(2024, 1, 12),
+            due_string="2024-01-12",
+            delete_ids=["r1", "r2"],
+            reminders=[
+                _reminder("r1", "2024-01-10"), _reminder("r2", "2024-01-10"),
+            ],
+            from_day=date(2024, 1, 10),
+        )
+
+        def submit(commands, result):
+            result.add_response(commands, {"sync_status": {
+                c["uuid"]: "ok" if c["args"].get("id") != "r2" else {
+                    "error": "Invalid argument", "http_code": 400,
+                }
+                for c in commands
+            }})
+            return result
+
+        submitter = MagicMock()
+        submitter.submit.side_effect = submit
+        outbox.flush("tok", submitter=submitter)
+
+        entry = Outbox(self.path).entries["1"]
+        self.assertIsNone(entry["due_string"])
+        self.assertEqual(entry["delete_ids"], ["r2"])
+        self.assertEqual(entry["reminders"], [])
+
+
+class TestRescheduleQueues(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.outbox = Outbox(os.path.join(self.dir.name, "outbox.json"))
+        self.task = create_task('1', 'Task', due_date_str='2024-01-10')
+
+    @patch("todoistScheduler.reschedule.restore_reminders")
+    @patch("todoistScheduler.reschedule.fetch_reminders")
+    def test_queues_update_when_throttled(self, mock_fetch, mock_restore):
+        mock_fetch.return_value = [_reminder("r1", "2024-01-10")]
+        api = MagicMock()
+        api.update_task.side_effect = _http_error(429)
+        undo_log = MagicMock()
+
+        reschedule_task(
+            api, self.task, date(2024, 1, 12),
+            undo_log=undo_log, outbox=self.outbox,
+        )
+
+        entry = self.outbox.entries["1"]
+        self.assertEqual(entry["due_string"], "2024-01-12")
+        self.assertEqual(entry["delete_ids"], ["r1"])
+        mock_restore.assert_not_called()
+        undo_log.record.assert_not_called()
+
+    @patch("todoistScheduler.reschedule.fetch_reminders")
+    def test_raises_client_errors(self, mock_fetch):
+        mock_fetch.return_value = []
+        api = MagicMock()
+        api.update_task.side_effect = _http_error(400)
+        with self.assertRaises(requests.HTTPError):
+            reschedule_task(
+                api, self.task, date(2024, 1, 12), outbox=self.outbox,
+            )
+        self.assertEqual(len(self.outbox), 0)
+
+    @patch("todoistScheduler.reschedule.restore_reminders")
+    @patch("todoistScheduler.reschedule.delete_reminders")
+    @patch("todoistScheduler.reschedule.fetch_reminders")
+    def test_queues_failed_restore(
+        self, mock_fetch, _mock_delete, mock_restore,
+    ):
+        mock_fetch.return_value = [_reminder("r1", "2024-01-10")]
+        mock_restore.side_effect = requests.ConnectionError()
+
+        reschedule_task(
+            MagicMock(), self.task, date(2024, 1, 12), outbox=self.outbox,
+        )
+
+        entry = self.outbox.entries["1"]
+        self.assertIsNone(entry["due_string"])
+        self.assertEqual(entry["delete_ids"], [])
+        self.assertEqual(len(entry["reminders"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import unittest
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+from conftest import create_task
+
+from todoistScheduler.overflow import Horizon, label_tasks, move_tasks
+from todoistScheduler.scheduler import Scheduler
+from todoistScheduler.sync import SyncResult
+
+
+class TestHorizon(unittest.TestCase):
+
+    def setUp(self):
+        self.api = MagicMock()
+        self.api.filter_tasks.side_effect = lambda **_: iter([])
+        self.today = date(2024, 1, 10)
+        self.tasks = [
+            create_task(str(i), f'Task {i}', due_date_str='2024-01-01')
+            for i in range(10)
+        ]
+
+    def _scheduler(self, horizon, labeler=None, mover=None):
+        return Scheduler(
+            self.api, self.today, 2, 'no_reschedule',
+            reschedule=MagicMock(),
+            horizon=horizon,
+            labeler=labeler,
+            mover=mover,
+        )
+
+    def test_days_limit_bounds_queries(self):
+        scheduler = self._scheduler(Horizon(days=2))
+        moves = scheduler.plan(list(self.tasks))
+
+        self.assertEqual(len(moves), 4)
+        self.assertEqual(self.api.filter_tasks.call_count, 2)
+        self.assertEqual(len(scheduler.overflow), 6)
+
+    def test_move_limit_cuts_inside_a_day(self):
+        scheduler = self._scheduler(Horizon(max_moves=3))
+        moves = scheduler.plan(list(self.tasks))
+
+        self.assertEqual(len(moves), 3)
+        self.assertEqual(len(scheduler.overflow), 7)
+        self.assertEqual(self.api.filter_tasks.call_count, 2)
+
+    def test_existing_tasks_do_not_overflow(self):
+        existing = create_task('e', 'Existing', due_date_str='2024-01-10')
+        scheduler = Scheduler(
+            self.api, self.today, 1, 'no_reschedule',
+            day_loads={self.today: [existing]},
+            horizon=Horizon(days=1),
+        )
+        scheduler.plan([create_task('1', 'Old', due_date_str='2024-01-01')])
+        self.assertEqual(scheduler.overflow, [])
+
+    def test_someday_moves_overflow_in_one_batch(self):
+        someday = self.today + timedelta(days=90)
+        mover = MagicMock()
+        scheduler = self._scheduler(
+            Horizon(days=1, strategy="someday", someday=someday),
+            mover=mover,
+        )
+        moves = scheduler.schedule_and_push_down(list(self.tasks))
+
+        self.assertEqual({m.day for m in moves}, {self.today})
+        self.assertEqual(scheduler.reschedule.call_count, 2)
+        mover.assert_called_once_with(self.api, scheduler.overflow, someday)
+        self.assertEqual(len(scheduler.overflow), 8)
+
+    def test_label_strategy_labels_in_one_call(self):
+        labeler = MagicMock()
+        scheduler = self._scheduler(
+            Horizon(days=1, strategy="label", label="triage"),
+            labeler=labeler,
+        )
+        scheduler.schedule_and_push_down(list(self.tasks))
+
+        labeler.assert_called_once_with(
+            self.api, scheduler.overflow, "triage",
+        )
+        self.assertEqual(len(scheduler.overflow), 8)
+
+    def test_someday_needs_a_date(self):
+        with self.assertRaises(ValueError):
+            Horizon(strategy="someday")
+        with self.assertRaises(ValueError):
+            Horizon(strategy="archive")
+
+
+class TestLabelTasks(unittest.TestCase):
+
+    def test_batches_and_skips_labelled(self):
+        tasks = [create_task(str(i), 'T') for i in range(3)]
+        tasks[1].labels = ['overflow']
+        tasks[2].labels = ['home']
+        submitter = MagicMock()
+        submitter.submit.return_value = SyncResult()
+
+        label_tasks(MagicMock(), tasks, 'overflow', submitter)
+
+        [commands] = submitter.submit.call_args.args
+        self.assertEqual(
+            [c["args"] for c in commands],
+            [
+                {"id": "0", "labels": ["overflow"]},
+                {"id": "2", "labels": ["home", "overflow"]},
+            ],
+        )
+
+    def test_nothing_to_label(self):
+        submitter = MagicMock()
+        label_tasks(MagicMock(), [], 'overflow', submitter)
+        submitter.submit.assert_not_called()
+
+
+class TestMoveTasks(unittest.TestCase):
+
+    @patch("todoistScheduler.overflow.iter_reminders")
+    def test_moves_tasks_and_reminders_in_one_submission(self, mock_iter):
+        someday = date(2024, 4, 1)
+        tasks = [
+            create_task('1', 'A', due_date_str='2024-01-01'),
+            create_task('2', 'B', due_date_str='2024-01-02'),
+            create_task('3', 'C', due_date_str='2024-04-01'),
+        ]
+        mock_iter.return_value = [
+            {
+                "id": "r1", "item_id": "1", "type": "absolute",
+                "due": {"date": "2024-01-01T09:00:00"},
+            },
+            {"id": "r9", "item_id": "9", "type": "relative"},
+        ]
+
+        def submit(commands):
+            result = SyncResult()
+            result.add_response(commands, {
+                "sync_status": {c["uuid"]: "ok" for c in commands},
+                "temp_id_mapping": {
+                    c["temp_id"]: "r2" for c in commands if "temp_id" in c
+                },
+            })
+            return result
+
+        submitter = MagicMock()
+        submitter.submit.side_effect = submit
+        undo_log = MagicMock()
+        move_tasks(MagicMock(), tasks, someday, undo_log, submitter)
+
+        [commands] = submitter.submit.call_args.args
+        self.assertEqual(
+            [(c["type"], c["args"].get("id")) for c in commands],
+            [
+                ("item_update", "1"),
+                ("item_update", "2"),
+                ("reminder_delete", "r1"),
+                ("reminder_add", None),
+            ],
+        )
+        self.assertEqual(
+            commands[3]["args"]["due"]["date"], "2024-04-01T09:00:00",
+        )
+        self.assertEqual(undo_log.record.call_count, 2)
+        undo_log.record.assert_any_call(
+            tasks[0], "2024-01-01", [mock_iter.return_value[0]], ["r2"],
+        )
+
+    @patch("todoistScheduler.overflow.iter_reminders")
+    def test_nothing_to_move(self, mock_iter):
+        submitter = MagicMock()
+        task = create_task('1', 'A', due_date_str='2024-04-01')
+        move_tasks(MagicMock(), [task], date(2024, 4, 1), None, submitter)
+        submitter.submit.assert_not_called()
+        mock_iter.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
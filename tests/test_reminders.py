@@ -1,7 +1,9 @@
+import json
 import unittest
 from unittest.mock import patch, MagicMock
 
 from todoistScheduler.reminders import (
+    ReminderCache,
     delete_reminders,
     fetch_reminders,
     restore_reminders,
@@ -9,12 +11,22 @@ from todoistScheduler.reminders import (
 )
 
 
+def _sync_response(payload, size=7):
+    """Mock a streamed Sync API response for payload."""
+    body = json.dumps(payload).encode()
+    return MagicMock(
+        iter_content=lambda **_kwargs: (
+            body[i:i + size] for i in range(0, len(body), size)
+        ),
+    )
+
+
 class TestFetchReminders(unittest.TestCase):
 
     @patch("todoistScheduler.reminders.requests.post")
     def test_filters_by_task_id(self, mock_post):
-        mock_post.return_value = MagicMock(
-            json=lambda: {
+        mock_post.return_value = _sync_response(
+            {
                 "reminders": [
                     {
                         "id": "r1",
@@ -37,8 +49,8 @@ class TestFetchReminders(unittest.TestCase):
 
     @patch("todoistScheduler.reminders.requests.post")
     def test_excludes_deleted(self, mock_post):
-        mock_post.return_value = MagicMock(
-            json=lambda: {
+        mock_post.return_value = _sync_response(
+            {
                 "reminders": [
                     {
                         "id": "r1",
@@ -55,13 +67,50 @@ class TestFetchReminders(unittest.TestCase):
 
     @patch("todoistScheduler.reminders.requests.post")
     def test_empty_reminders(self, mock_post):
-        mock_post.return_value = MagicMock(
-            json=lambda: {"reminders": []},
+        mock_post.return_value = _sync_response(
+            {"reminders": []},
         )
         result = fetch_reminders("tok", "100")
         self.assertEqual(result, [])
 
 
+class TestReminderCache(unittest.TestCase):
+
+    @patch("todoistScheduler.reminders.requests.post")
+    def test_applies_incremental_changes(self, mock_post):
+        mock_post.side_effect = [
+            _sync_response({
+                "full_sync": True,
+                "sync_token": "t1",
+                "reminders": [
+                    {"id": "r1", "item_id": "100"},
+                    {"id": "r2", "item_id": "100"},
+                ],
+            }),
+            _sync_response({
+                "full_sync": False,
+                "sync_token": "t2",
+                "reminders": [
+                    {"id": "r1", "item_id": "100", "is_deleted": 1},
+                    {"id": "r3", "item_id": "200"},
+                ],
+            }),
+        ]
+        cache = ReminderCache("tok")
+        cache.refresh()
+        self.assertEqual(len(cache.for_task("100")), 2)
+
+        cache.refresh()
+        self.assertEqual(
+            mock_post.call_args.kwargs["data"]["sync_token"], "t1",
+        )
+        self.assertEqual(
+            [r["id"] for r in cache.for_task("100")], ["r2"],
+        )
+        self.assertEqual(len(cache.for_task("200")), 1)
+        self.assertEqual(cache.sync_token, "t2")
+
+
 class TestShiftAbsoluteDue(unittest.TestCase):
 
     def test_shifts_date(self):
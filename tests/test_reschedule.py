@@ -2,8 +2,10 @@ import unittest
 from unittest.mock import MagicMock, patch
 from datetime import date
 
+from todoistScheduler.plan import Move
 from todoistScheduler.reschedule import (
     compute_due_string,
+    compute_due_strings,
     reschedule_task,
 )
 from conftest import create_task
@@ -86,6 +88,65 @@ class TestComputeDueString(unittest.TestCase):
         self.assertEqual(result, '2024-01-15')
 
 
+class TestComputeDueStrings(unittest.TestCase):
+
+    def test_matches_single_task_function(self):
+        tasks = [
+            create_task('1', 'None'),
+            create_task('2', 'Date', due_date_str='2024-01-10'),
+            create_task(
+                '3', 'Time', due_date_str='2024-01-10',
+                due_datetime_str='2024-01-10T17:00:00Z',
+            ),
+            create_task(
+                '4', 'Space', due_date_str='2024-01-10',
+                due_datetime_str='2024-01-10 08:30:00',
+            ),
+            create_task(
+                '5', 'Daily', due_date_str='2024-01-10',
+                is_recurring=True, due_string='every day',
+            ),
+            create_task(
+                '6', 'Daily again', due_date_str='2024-01-12',
+                is_recurring=True,
+                due_string='every day starting on 2024-01-01',
+            ),
+            create_task(
+                '8', 'Once, same string', due_date_str='2024-01-12',
+                due_string='every day starting on 2024-01-01',
+            ),
+            create_task(
+                '7', 'Weekly', due_date_str='2024-01-10',
+                is_recurring=True, due_string='every week at 5pm',
+                due_datetime_str='2024-01-10T17:00:00Z',
+            ),
+        ]
+        days = [date(2024, 1, 10), date(2024, 1, 12), date(2024, 1, 15)]
+        moves = [Move(t, d) for d in days for t in tasks]
+
+        results = compute_due_strings(moves)
+
+        self.assertEqual(
+            [due for due, _ in results],
+            [compute_due_string(m.task, m.day) for m in moves],
+        )
+
+    def test_day_deltas(self):
+        moves = [
+            Move(create_task('1', 'A', due_date_str='2024-01-10'),
+                 date(2024, 1, 15)),
+            Move(create_task(
+                '2', 'B', due_date_str='2024-01-10',
+                due_datetime_str='2024-01-10T17:00:00Z',
+            ), date(2024, 1, 10)),
+            Move(create_task('3', 'C'), date(2024, 1, 15)),
+        ]
+        self.assertEqual(
+            compute_due_strings(moves),
+            [('2024-01-15', 5), (None, 0), ('2024-01-15', None)],
+        )
+
+
 class TestRescheduleTask(unittest.TestCase):
 
     def setUp(self):
@@ -105,6 +166,27 @@ class TestRescheduleTask(unittest.TestCase):
         reschedule_task(self.api, task, date(2024, 1, 15))
         self.api.update_task.assert_not_called()
 
+    @patch("todoistScheduler.reschedule.restore_reminders")
+    @patch("todoistScheduler.reschedule.delete_reminders")
+    @patch("todoistScheduler.reschedule.fetch_reminders")
+    @patch("todoistScheduler.reschedule._parse_task_date")
+    @patch("todoistScheduler.reschedule.compute_due_string")
+    def test_uses_planned_due_string(
+        self, mock_compute, mock_parse, mock_fetch, _mock_delete, mock_restore,
+    ):
+        mock_fetch.return_value = [{"id": "r1", "item_id": "1"}]
+        task = create_task('1', 'Task', due_date_str='2024-01-10')
+        reschedule_task(
+            self.api, task, date(2024, 1, 15),
+            due_string='2024-01-15', day_delta=5,
+        )
+        mock_compute.assert_not_called()
+        mock_parse.assert_not_called()
+        self.api.update_task.assert_called_once_with(
+            task_id='1', due_string='2024-01-15',
+        )
+        self.assertEqual(mock_restore.call_args.args[2], 5)
+
     def test_raises_on_failure(self):
         self.api.update_task.return_value = False
         task = create_task('1', 'Task', due_date_str='2024-01-10')
@@ -136,14 +218,18 @@ class TestRescheduleTask(unittest.TestCase):
         reschedule_task(
             self.api, task, date(2024, 1, 15),
         )
-        mock_fetch.assert_called_once_with("tok", "1")
+        session = self.api._session
+        mock_fetch.assert_called_once_with(
+            "tok", "1", session=session,
+        )
         mock_delete.assert_called_once_with(
-            "tok", ["r1"],
+            "tok", ["r1"], session=session,
         )
         mock_restore.assert_called_once_with(
             "tok",
             [{"id": "r1", "item_id": "1"}],
             5,
+            session=session,
         )
 
 
@@ -159,7 +245,7 @@ class TestRescheduleTask(unittest.TestCase):
     def test_infers_delta_from_reminder_when_no_due(
         self,
         mock_restore,
-        mock_delete,
+        _mock_delete,
         mock_fetch,
     ):
         mock_fetch.return_value = [
@@ -180,6 +266,7 @@ class TestRescheduleTask(unittest.TestCase):
             "tok",
             mock_fetch.return_value,
             5,
+            session=self.api._session,
         )
 
 
@@ -0,0 +1,82 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from todoistScheduler.search import TaskIndex
+
+
+def _item(id, content, **fields):
+    item = {
+        "id": id,
+        "content": content,
+        "project_id": "p",
+        "labels": [],
+        "priority": 1,
+        "due": {"date": "2024-01-10", "string": "2024-01-10"},
+        "updated_at": "2024-01-10T08:00:00Z",
+    }
+    item.update(fields)
+    return item
+
+
+class TestTaskIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "index.json")
+        patcher = patch("todoistScheduler.search.sync_items")
+        self.sync_items = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.sync_items.return_value = ("t1", [
+            _item("1", "Pay rent"),
+            _item("2", "Pay rent for the garage"),
+            _item("3", "Call the plumber"),
+            _item("4", "Renew passport"),
+        ], True)
+        self.index = TaskIndex(self.path)
+        self.index.refresh("tok")
+
+    def test_refresh_is_incremental_and_persisted(self):
+        self.assertEqual(self.sync_items.call_args.args[1], "*")
+        self.sync_items.return_value = ("t2", [
+            _item("3", "Call the plumber", checked=True),
+            _item("5", "Water plants"),
+        ], False)
+        self.index.refresh("tok")
+
+        self.assertEqual(self.sync_items.call_args.args[1], "t1")
+        index = TaskIndex(self.path)
+        self.assertEqual(index.sync_token, "t2")
+        self.assertEqual(sorted(index.records), ["1", "2", "4", "5"])
+        self.assertFalse(index.is_stale(60))
+
+    def test_index_file_is_private(self):
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        self.assertEqual(mode, 0o600)
+
+    def test_resolves_unique_and_exact_matches(self):
+        self.assertEqual(self.index.resolve("plumber").id, "3")
+        self.assertEqual(self.index.resolve("pay rent").id, "1")
+        self.assertEqual(self.index.resolve("garage rent").id, "2")
+        task = self.index.resolve("passport")
+        self.assertEqual(str(task.due.date), "2024-01-10")
+
+    def test_fuzzy_match_tolerates_typos(self):
+        self.assertEqual(self.index.resolve("plumbr").id, "3")
+
+    def test_ambiguous_query_lists_candidates(self):
+        with self.assertRaises(LookupError) as ctx:
+            self.index.resolve("pay")
+        self.assertIn("matches 2 tasks", str(ctx.exception))
+        self.assertIn("Pay rent for the garage", str(ctx.exception))
+
+    def test_no_match(self):
+        with self.assertRaises(LookupError):
+            self.index.resolve("zzz qqq")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from conftest import create_task
+
+from todoistScheduler.simulate import (
+    SimConfig,
+    config_grid,
+    format_results,
+    simulate,
+    simulate_one,
+)
+from todoistScheduler.snapshot import Snapshot
+
+
+class TestSimulate(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        snapshot = Snapshot(today=date(2024, 1, 10))
+        for i in range(5):
+            task = create_task(str(i), f'Old {i}', due_date_str='2024-01-01')
+            snapshot.tasks[task.id] = task
+        today = create_task('t', 'Today', due_date_str='2024-01-10')
+        skipped = create_task('s', 'Skipped', due_date_str='2024-01-02')
+        skipped.labels = ['later']
+        snapshot.tasks.update({'t': today, 's': skipped})
+        snapshot.write(self.path)
+
+    def test_grid(self):
+        grid = config_grid([2, 3], ['a', 'b'], ['', 'label:x=1'])
+        self.assertEqual(len(grid), 8)
+        self.assertIn(SimConfig(3, 'b', 'label:x=1'), grid)
+
+    def test_simulate_one(self):
+        result = simulate_one(self.path, SimConfig(2, 'later'))
+
+        self.assertIsNone(result.error)
+        self.assertEqual(result.moves, 6)
+        self.assertEqual(result.max_push_days, 2)
+        self.assertEqual(result.day_loads, [2, 2, 2])
+        # Window fetch, two one-page day queries, and four calls per
+        # move
+        self.assertEqual(result.api_calls, 1 + 2 + 6 * 4)
+
+    def test_ignore_tag_changes_the_outcome(self):
+        results = simulate(
+            self.path,
+            config_grid([2], ['later', 'other']),
+            workers=2,
+        )
+        self.assertEqual([r.moves for r in results], [6, 7])
+        self.assertIn('later', format_results(results))
+
+    def test_bad_buckets_reported(self):
+        result = simulate_one(self.path, SimConfig(2, 'later', 'bad'))
+        self.assertIn('Bad capacity bucket', result.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
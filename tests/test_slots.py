@@ -0,0 +1,177 @@
+import random
+import unittest
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+from conftest import create_task
+from todoist_api_python.models import Duration
+
+from todoistScheduler.plan import Move
+from todoistScheduler.reschedule import compute_due_string, compute_due_strings
+from todoistScheduler.scheduler import Scheduler
+from todoistScheduler.slots import (
+    DaySlots,
+    SlotPacker,
+    parse_work_hours,
+)
+
+
+def _timed(id, day, time, minutes=None, priority=1):
+    task = create_task(
+        id, f'Task {id}', priority=priority,
+        due_date_str=day, due_datetime_str=f'{day}T{time}:00',
+    )
+    if minutes is not None:
+        task.duration = Duration(amount=minutes, unit='minute')
+    return task
+
+
+class TestParseWorkHours(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_work_hours('09:00-17:30'), (540, 1050))
+        for bad in ('9-5', '17:00-09:00', '09:00'):
+            with self.assertRaises(ValueError):
+                parse_work_hours(bad)
+
+
+class TestDaySlots(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        slots = DaySlots(540, 1020)
+        taken = [False] * 480
+        for _ in range(60):
+            start = rng.randrange(500, 1040)
+            minutes = rng.randrange(1, 40)
+            slots.reserve(start, minutes)
+            lo, hi = max(start - 540, 0), min(start - 540 + minutes, 480)
+            for m in range(lo, hi):
+                taken[m] = True
+            for want in (1, 5, 15, 30, 60):
+                expected = next(
+                    (
+                        540 + i for i in range(480 - want + 1)
+                        if not any(taken[i:i + want])
+                    ),
+                    None,
+                )
+                self.assertEqual(slots.find(want), expected)
+            probe = rng.randrange(540, 1000)
+            self.assertEqual(
+                slots.is_free(probe, 20),
+                not any(taken[probe - 540:probe - 520]),
+            )
+
+    def test_outside_hours_is_never_free(self):
+        slots = DaySlots(540, 600)
+        self.assertFalse(slots.is_free(500, 10))
+        self.assertFalse(slots.is_free(590, 20))
+        self.assertIsNone(slots.find(61))
+
+
+class TestSlotPacker(unittest.TestCase):
+
+    def test_keeps_free_time_else_takes_earliest_gap(self):
+        packer = SlotPacker((540, 720), 30)
+        day = packer.day([_timed('a', '2024-01-02', '09:00', 60)])
+        self.assertEqual(
+            packer.place(day, _timed('b', '2024-01-01', '11:00')), '11:00',
+        )
+        self.assertEqual(
+            packer.place(day, _timed('c', '2024-01-01', '09:30')), '10:00',
+        )
+        self.assertIsNone(
+            packer.place(day, _timed('d', '2024-01-01', '09:00', 90)),
+        )
+
+    def test_untimed_and_long_tasks_are_not_packed(self):
+        packer = SlotPacker((540, 600), 30)
+        self.assertFalse(packer.packs(
+            create_task('1', 'All day', due_date_str='2024-01-01'),
+        ))
+        self.assertFalse(packer.packs(_timed('2', '2024-01-01', '09:00', 90)))
+
+
+class TestDueStringAt(unittest.TestCase):
+
+    def test_new_time_on_same_day_moves_the_task(self):
+        task = _timed('1', '2024-01-02', '09:00')
+        day = date(2024, 1, 2)
+        self.assertIsNone(compute_due_string(task, day, '09:00'))
+        self.assertEqual(
+            compute_due_string(task, day, '10:30'), '2024-01-02 10:30',
+        )
+        self.assertEqual(
+            compute_due_strings([Move(task, day, '10:30')]),
+            [('2024-01-02 10:30', 0)],
+        )
+
+
+class TestSchedulerPacking(unittest.TestCase):
+
+    def test_timed_tasks_spill_when_day_has_no_slot(self):
+        today = date(2024, 1, 2)
+        tomorrow = today + timedelta(days=1)
+        scheduler = Scheduler(
+            MagicMock(), today, 5, 'no_reschedule',
+            reschedule=MagicMock(),
+            day_loads={
+                today: [_timed('e', '2024-01-02', '09:00', 90)],
+                tomorrow: [],
+            },
+            slots=SlotPacker((540, 660), 30),
+        )
+        overdue = [
+            _timed('1', '2024-01-01', '09:00', priority=3),
+            _timed('2', '2024-01-01', '09:00', priority=2),
+            create_task('3', 'Untimed', due_date_str='2024-01-01'),
+        ]
+        moves = scheduler.plan(overdue)
+
+        self.assertEqual(
+            {(m.task.id, m.day, m.time) for m in moves},
+            {
+                ('1', today, '10:30'),
+                ('2', tomorrow, '09:00'),
+                ('3', today, None),
+            },
+        )
+
+        scheduler.apply(moves)
+        scheduler.reschedule.assert_any_call(
+            scheduler.api, overdue[0], today, at='10:30',
+            due_string='2024-01-02 10:30', day_delta=1,
+        )
+        scheduler.reschedule.assert_any_call(
+            scheduler.api, overdue[2], today,
+            due_string='2024-01-02', day_delta=1,
+        )
+
+    def test_unmovable_tasks_keep_their_slots(self):
+        today = date(2024, 1, 2)
+        api = MagicMock()
+        api.filter_tasks.side_effect = lambda query: iter([[
+            _timed('p', '2024-01-02', '10:30', 30, priority=4),
+            _timed('e', '2024-01-02', '09:00', 90),
+        ]] if query.endswith('2024-01-02') else [[]])
+        scheduler = Scheduler(
+            api, today, 5, 'no_reschedule',
+            reschedule=MagicMock(),
+            day_loads={
+                today: [_timed('e', '2024-01-02', '09:00', 90)],
+                today + timedelta(days=1): [],
+            },
+            slots=SlotPacker((540, 660), 30),
+        )
+        moves = scheduler.plan([_timed('1', '2024-01-01', '09:00')])
+
+        api.filter_tasks.assert_any_call(query='due on 2024-01-02')
+        self.assertEqual(
+            [(m.task.id, m.day, m.time) for m in moves],
+            [('1', today + timedelta(days=1), '09:00')],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
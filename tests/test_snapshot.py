@@ -0,0 +1,144 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from conftest import create_task
+
+from todoistScheduler.scheduler import Scheduler
+from todoistScheduler.snapshot import (
+    Snapshot,
+    SnapshotAPI,
+    export_snapshot,
+    reschedule_in_snapshot,
+)
+
+
+class TestSnapshotFile(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        snapshot = Snapshot(today=date(2024, 1, 10))
+        task = create_task(
+            '1', 'Task', priority=3,
+            due_date_str='2024-01-05',
+            due_datetime_str='2024-01-05T17:00:00Z',
+        )
+        task.labels = ['work']
+        snapshot.tasks['1'] = task
+        snapshot.reminders.append(
+            {"id": "r1", "item_id": "1", "type": "relative",
+             "minute_offset": 30},
+        )
+        snapshot.write(self.path)
+
+        loaded = Snapshot.read(self.path)
+        self.assertEqual(loaded.today, date(2024, 1, 10))
+        self.assertEqual(loaded.tasks['1'].labels, ['work'])
+        self.assertEqual(loaded.tasks['1'].priority, 3)
+        self.assertEqual(
+            loaded.tasks['1'].due.date,
+            datetime(2024, 1, 5, 17, tzinfo=timezone.utc),
+        )
+        self.assertEqual(loaded.reminders, snapshot.reminders)
+
+    def test_rejects_file_without_meta(self):
+        with open(self.path, "w") as f:
+            f.write('{"kind": "task", "id": "1"}\n')
+        with self.assertRaises(ValueError):
+            Snapshot.read(self.path)
+
+    @patch("todoistScheduler.snapshot.iter_reminders")
+    def test_export_from_api(self, mock_reminders):
+        api = MagicMock()
+        api._token = "tok"
+        api.get_tasks.return_value = iter([[create_task('1', 'Task')]])
+        mock_reminders.return_value = iter([{"id": "r1"}])
+        snapshot = export_snapshot(api, date(2024, 1, 10))
+        self.assertEqual(list(snapshot.tasks), ['1'])
+        self.assertEqual(snapshot.reminders, [{"id": "r1"}])
+        mock_reminders.assert_called_once_with("tok")
+
+
+class TestSnapshotAPI(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = Snapshot(today=date(2024, 1, 10))
+        for task in [
+            create_task('old', 'Old', priority=2, due_date_str='2024-01-01'),
+            create_task('urgent', 'Urgent', priority=4, due_date_str='2024-01-02'),
+            create_task('today', 'Today', due_date_str='2024-01-10'),
+            create_task('none', 'No due'),
+        ]:
+            self.snapshot.tasks[task.id] = task
+        self.snapshot.tasks['today'].labels = ['no_reschedule']
+        self.api = SnapshotAPI(self.snapshot)
+
+    def _ids(self, query):
+        return [t.id for page in self.api.filter_tasks(query=query) for t in page]
+
+    def test_overdue_excludes_p1(self):
+        self.assertEqual(self._ids("overdue & ! p1"), ['old'])
+
+    def test_due_on_and_label(self):
+        self.assertEqual(self._ids("due on 2024-01-10"), ['today'])
+        self.assertEqual(
+            self._ids("! p1 & ! @no_reschedule & due on 2024-01-10"), [],
+        )
+
+    def test_unsupported_clause(self):
+        with self.assertRaises(ValueError):
+            self._ids("#Work")
+
+    def test_scheduler_runs_offline(self):
+        self.snapshot.reminders.append({
+            "id": "r1", "item_id": "old", "type": "absolute",
+            "due": {"date": "2024-01-01T09:00:00"},
+        })
+        scheduler = Scheduler(
+            self.api, self.snapshot.today, 1, 'no_reschedule',
+            reschedule=reschedule_in_snapshot,
+        )
+        overdue = [t for page in self.api.filter_tasks(query="overdue & ! p1")
+                   for t in page]
+        with self.assertLogs(level='INFO') as logs:
+            scheduler.schedule_and_push_down(overdue)
+        self.assertIn(
+            "Planned: 'Old' from 2024-01-01 to 2024-01-10 (2024-01-10)",
+            "\n".join(logs.output),
+        )
+        self.assertEqual(
+            self.snapshot.tasks['old'].due.date, date(2024, 1, 10),
+        )
+        self.assertEqual(
+            self.snapshot.reminders[0]["due"]["date"],
+            "2024-01-10T09:00:00",
+        )
+
+    def test_reschedule_keeps_recurrence_and_time(self):
+        task = create_task(
+            'rec', 'Recurring', due_date_str='2024-01-05',
+            is_recurring=True, due_string='every week at 5pm',
+            due_datetime_str='2024-01-05T17:00:00Z',
+        )
+        self.snapshot.tasks['rec'] = task
+        reschedule_in_snapshot(self.api, task, date(2024, 1, 12))
+        due = self.snapshot.tasks['rec'].due
+        self.assertEqual(
+            due.date, datetime(2024, 1, 12, 17, tzinfo=timezone.utc),
+        )
+        self.assertEqual(
+            due.string, 'every week at 5pm starting on 2024-01-12 17:00',
+        )
+        self.assertTrue(due.is_recurring)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from conftest import create_rest_task, create_task
+
+from todoistScheduler.main import build_parser, run_sweep
+from todoistScheduler.plan import Move
+from todoistScheduler.state import RunState, fingerprint
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.today = date(2024, 1, 10)
+        self.settings = {"tasks_per_day": 5, "ignore_tag": "x"}
+        self.tasks = [
+            create_task('1', 'A', priority=2, due_date_str='2024-01-01'),
+            create_task('2', 'B', priority=3, due_date_str='2024-01-10'),
+        ]
+
+    def test_order_independent(self):
+        self.assertEqual(
+            fingerprint(self.today, self.settings, self.tasks),
+            fingerprint(self.today, self.settings, self.tasks[::-1]),
+        )
+
+    def test_sensitive_to_inputs(self):
+        base = fingerprint(self.today, self.settings, self.tasks)
+        self.assertNotEqual(
+            base,
+            fingerprint(date(2024, 1, 11), self.settings, self.tasks),
+        )
+        self.assertNotEqual(
+            base,
+            fingerprint(self.today, {"tasks_per_day": 4}, self.tasks),
+        )
+        self.tasks[0].priority = 4
+        self.assertNotEqual(
+            base, fingerprint(self.today, self.settings, self.tasks),
+        )
+
+
+class TestRunState(unittest.TestCase):
+
+    def test_round_trip_and_bad_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.json")
+            self.assertEqual(RunState.load(path), RunState())
+            state = RunState(fingerprint="abc", window_end="2024-01-12")
+            state.record_plan([
+                Move(create_task('1', 'A'), date(2024, 1, 12)),
+            ])
+            state.save(path)
+            self.assertEqual(RunState.load(path), state)
+            with open(path, "w") as f:
+                f.write("{not json")
+            self.assertEqual(RunState.load(path), RunState())
+
+
+class TestRunSweepShortCircuit(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.args = build_parser().parse_args([])
+        patcher = patch("todoistScheduler.main.config")
+        self.config = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.config.STATE_PATH = os.path.join(self.tmp.name, "state.json")
+        self.config.TASKS_PER_DAY = 5
+        self.config.IGNORE_TASK_TAG = "no_reschedule"
+        self.config.CAPACITY_BUCKETS = ""
+        self.config.WORK_HOURS = ""
+        self.config.INCREMENTAL_PLANNING = False
+        self.today = date(2024, 1, 10)
+        self.api = MagicMock()
+        self.reschedule = MagicMock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_identical_run_is_skipped(self):
+        today_task = create_task('1', 'Today', due_date_str='2024-01-10')
+        self.api.filter_tasks.side_effect = (
+            lambda **_kwargs: iter([[today_task]])
+        )
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+        self.assertEqual(self.api.filter_tasks.call_count, 1)
+
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+        self.assertEqual(self.api.filter_tasks.call_count, 2)
+        self.reschedule.assert_not_called()
+
+    def test_moves_are_fingerprinted_after_apply(self):
+        overdue = create_task('1', 'Late', due_date_str='2024-01-01')
+        moved = create_task('1', 'Late', due_date_str='2024-01-10')
+        responses = iter([[[overdue]], [[moved]], [[moved]]])
+        self.api.filter_tasks.side_effect = (
+            lambda **_kwargs: iter(next(responses))
+        )
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+        self.reschedule.assert_called_once()
+
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+        self.assertEqual(self.api.filter_tasks.call_count, 3)
+        self.reschedule.assert_called_once()
+        self.assertIn(
+            "due before: 2024-01-11",
+            self.api.filter_tasks.call_args.kwargs["query"],
+        )
+
+
+class TestRunSweepIncremental(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.args = build_parser().parse_args([])
+        patcher = patch("todoistScheduler.main.config")
+        self.config = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.config.STATE_PATH = os.path.join(self.tmp.name, "state.json")
+        self.config.TASKS_PER_DAY = 5
+        self.config.IGNORE_TASK_TAG = "no_reschedule"
+        self.config.CAPACITY_BUCKETS = ""
+        self.config.WORK_HOURS = ""
+        self.config.INCREMENTAL_PLANNING = True
+        self.today = date(2024, 1, 10)
+        self.api = MagicMock()
+        self.reschedule = MagicMock()
+        patcher = patch(
+            "todoistScheduler.main.get_sync_token", return_value="t1",
+        )
+        self.get_sync_token = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("todoistScheduler.delta._sync")
+        self.sync = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_later_runs_read_only_changes(self):
+        overdue = create_task('1', 'Late', due_date_str='2024-01-01')
+        self.api.filter_tasks.side_effect = (
+            lambda **_kwargs: iter([[overdue]])
+        )
+        moved = {
+            "id": "1", "content": "Late", "project_id": "p",
+            "labels": [], "priority": 1,
+            "due": {"date": "2024-01-10", "string": "2024-01-10"},
+            "updated_at": "2024-01-10T08:00:00Z",
+        }
+        self.sync.side_effect = [
+            {"sync_token": "t2", "items": [moved]},
+            {"sync_token": "t3", "items": []},
+        ]
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+        self.reschedule.assert_called_once()
+        self.assertEqual(self.api.filter_tasks.call_count, 1)
+        state = RunState.load(self.config.STATE_PATH)
+        self.assertEqual(state.sync_token, "t2")
+        self.assertEqual([t["id"] for t in state.tasks], ["1"])
+
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+        self.assertEqual(self.api.filter_tasks.call_count, 1)
+        self.get_sync_token.assert_called_once()
+        self.reschedule.assert_called_once()
+        self.assertEqual(self.sync.call_args.args[1], "t2")
+        self.assertEqual(
+            RunState.load(self.config.STATE_PATH).sync_token, "t3",
+        )
+
+
+    def test_verify_keeps_the_window_token(self):
+        self.get_sync_token.side_effect = ["t1", "t9"]
+        self.api.filter_tasks.side_effect = lambda **_kwargs: iter([[]])
+        self.args.verify = True
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+
+        self.assertEqual(self.get_sync_token.call_count, 2)
+        self.assertEqual(
+            RunState.load(self.config.STATE_PATH).sync_token, "t1",
+        )
+
+    def test_cached_tasks_sort_with_tasks_read_later(self):
+        self.config.TASKS_PER_DAY = 1
+        rest = create_rest_task('9', 'Task 9', due_date_str='2024-01-11')
+        self.api.filter_tasks.side_effect = lambda query: iter(
+            [[rest]] if query.endswith('due on 2024-01-11') else [[]]
+        )
+        late = [
+            {
+                "id": task_id, "content": "Late", "project_id": "p",
+                "labels": [], "priority": 1,
+                "due": {"date": "2024-01-01", "string": "2024-01-01"},
+                "updated_at": "2024-01-10T08:00:00Z",
+            }
+            for task_id in ("1", "2")
+        ]
+        self.sync.side_effect = [
+            {"sync_token": "t2", "items": late},
+            {"sync_token": "t3", "items": []},
+        ]
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+        run_sweep(self.api, self.today, self.args, self.reschedule)
+
+        self.assertEqual(
+            sorted(
+                (c.args[1].id, c.args[2])
+                for c in self.reschedule.call_args_list
+            ),
+            [
+                ("1", date(2024, 1, 10)),
+                ("2", date(2024, 1, 11)),
+                ("9", date(2024, 1, 12)),
+            ],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from todoistScheduler.sync import (
+    MAX_COMMANDS_PER_REQUEST,
+    CommandSubmitter,
+    iter_sync_resources,
+)
+
+
+def _chunks(payload, size):
+    body = json.dumps(payload).encode()
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestIterSyncResources(unittest.TestCase):
+
+    def test_yields_resources_across_chunks(self):
+        payload = {
+            "full_sync": True,
+            "reminders": [
+                {"id": "r1", "item_id": "100"},
+                {"id": "r2", "item_id": "200"},
+            ],
+            "sync_token": "abc",
+        }
+        for size in (1, 3, 64, 4096):
+            result = list(iter_sync_resources(
+                _chunks(payload, size), "reminders",
+            ))
+            self.assertEqual(result, payload["reminders"])
+
+    def test_collects_other_keys_in_meta(self):
+        payload = {
+            "sync_token": "abc",
+            "reminders": [{"id": "r1"}],
+            "full_sync": True,
+        }
+        meta = {}
+        list(iter_sync_resources(
+            _chunks(payload, 2), "reminders", meta,
+        ))
+        self.assertEqual(
+            meta, {"sync_token": "abc", "full_sync": True},
+        )
+
+    def test_empty_and_missing_resource(self):
+        self.assertEqual(list(iter_sync_resources(
+            _chunks({"reminders": []}, 2), "reminders",
+        )), [])
+        self.assertEqual(list(iter_sync_resources(
+            _chunks({"sync_token": "x"}, 2), "reminders",
+        )), [])
+        self.assertEqual(list(iter_sync_resources(
+            [b"{}"], "reminders",
+        )), [])
+
+    def test_multibyte_text_split_between_chunks(self):
+        payload = {"reminders": [{"id": "r1", "name": "café ☕"}]}
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        chunks = [body[i:i + 1] for i in range(len(body))]
+        result = list(iter_sync_resources(chunks, "reminders"))
+        self.assertEqual(result, payload["reminders"])
+
+    def test_number_at_chunk_edge(self):
+        chunks = [b'{"reminders": [], "day_orders_timestamp": 12', b'34}']
+        meta = {}
+        list(iter_sync_resources(chunks, "reminders", meta))
+        self.assertEqual(meta["day_orders_timestamp"], 1234)
+
+    def test_malformed_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_sync_resources([b'{"reminders": [1 2]}'], "reminders"))
+
+
+
+def _echo(failing=()):
+    """Mock requests.post acknowledging every command it is sent.
+
+    Commands whose args id is in failing get a transient error once.
+    """
+    pending = set(failing)
+
+    def post(_url, data, **_kwargs):
+        statuses = {}
+        for command in json.loads(data["commands"]):
+            cid = command["args"]["id"]
+            if cid in pending:
+                pending.discard(cid)
+                statuses[command["uuid"]] = {
+                    "error": "Service unavailable", "http_code": 503,
+                }
+            else:
+                statuses[command["uuid"]] = "ok"
+        return MagicMock(
+            status_code=200, json=lambda: {"sync_status": statuses},
+        )
+    return post
+
+
+def _ok_response():
+    return _echo()
+
+
+def _commands(n):
+    return [
+        {"type": "reminder_delete", "uuid": str(i), "args": {"id": str(i)}}
+        for i in range(n)
+    ]
+
+
+def _sizes(mock_post):
+    return [
+        len(json.loads(c.kwargs["data"]["commands"]))
+        for c in mock_post.call_args_list
+    ]
+
+
+class TestCommandSubmitter(unittest.TestCase):
+
+    @patch("todoistScheduler.sync.requests.post")
+    def test_splits_into_batches(self, mock_post):
+        mock_post.side_effect = _ok_response()
+        submitter = CommandSubmitter("tok", initial_batch=10)
+        result = submitter.submit(_commands(25))
+        self.assertEqual(sum(_sizes(mock_post)), 25)
+        self.assertEqual(len(result.results), 25)
+        self.assertTrue(result.ok)
+        self.assertEqual(len(submitter.timings), mock_post.call_count)
+
+    @patch("todoistScheduler.sync.requests.post")
+    def test_grows_but_respects_server_limit(self, mock_post):
+        mock_post.side_effect = _ok_response()
+        submitter = CommandSubmitter("tok", initial_batch=50)
+        submitter.submit(_commands(1000))
+        self.assertEqual(submitter.batch_size, MAX_COMMANDS_PER_REQUEST)
+        self.assertLessEqual(max(_sizes(mock_post)), MAX_COMMANDS_PER_REQUEST)
+
+    @patch("todoistScheduler.sync.time.monotonic")
+    @patch("todoistScheduler.sync.requests.post")
+    def test_shrinks_when_slow(self, mock_post, mock_clock):
+        mock_post.side_effect = _ok_response()
+        mock_clock.side_effect = [0.0, 8.0]
+        submitter = CommandSubmitter("tok", initial_batch=40, target_seconds=2.0)
+        submitter.submit(_commands(40))
+        self.assertEqual(submitter.batch_size, 10)
+
+    @patch("todoistScheduler.sync.time.sleep")
+    @patch("todoistScheduler.sync.requests.post")
+    def test_halves_and_retries_on_throttling(self, mock_post, mock_sleep):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+        echo = _echo()
+        responses = iter([throttled])
+        mock_post.side_effect = (
+            lambda *a, **kw: next(responses, None) or echo(*a, **kw)
+        )
+        submitter = CommandSubmitter("tok", initial_batch=20)
+        submitter.submit(_commands(20))
+        self.assertEqual(_sizes(mock_post), [20, 10, 10])
+        mock_sleep.assert_called_once_with(2.0)
+        self.assertAlmostEqual(submitter.error_rate(), 1 / 3)
+
+    @patch("todoistScheduler.sync.time.sleep")
+    @patch("todoistScheduler.sync.requests.post")
+    def test_gives_up_after_retries(self, mock_post, mock_sleep):
+        failing = MagicMock(status_code=503, headers={})
+        failing.raise_for_status.side_effect = RuntimeError("503")
+        mock_post.return_value = failing
+        submitter = CommandSubmitter("tok", max_retries=2)
+        with self.assertRaises(RuntimeError):
+            submitter.submit(_commands(5))
+        self.assertEqual(mock_post.call_count, 3)
+        self.assertEqual(
+            [c.args[0] for c in mock_sleep.call_args_list], [1.0, 2.0],
+        )
+
+    @patch("todoistScheduler.sync.requests.post")
+    def test_retries_only_failed_commands(self, mock_post):
+        mock_post.side_effect = _echo(failing={"3"})
+        submitter = CommandSubmitter("tok", initial_batch=10)
+        result = submitter.submit(_commands(5))
+        self.assertTrue(result.ok)
+        self.assertEqual(_sizes(mock_post), [5, 1])
+        resent = json.loads(
+            mock_post.call_args.kwargs["data"]["commands"],
+        )
+        self.assertEqual(resent[0]["args"]["id"], "3")
+        self.assertNotEqual(resent[0]["uuid"], "3")
+        self.assertEqual(result.outcome("3").command["uuid"], resent[0]["uuid"])
+
+    @patch("todoistScheduler.sync.requests.post")
+    def test_permanent_failures_are_reported(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=200, json=lambda: {
+            "sync_status": {
+                "0": "ok",
+                "1": {"error": "Invalid argument", "http_code": 400},
+            },
+            "temp_id_mapping": {"tmp": "r9"},
+        })
+        result = CommandSubmitter("tok").submit(_commands(2))
+        self.assertFalse(result.ok)
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(
+            [r.command["uuid"] for r in result.failed], ["1"],
+        )
+        self.assertEqual(result.temp_id_mapping, {"tmp": "r9"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+
+from todoistScheduler.tracing import (
+    current_span,
+    span,
+    start_tracing,
+    stop_tracing,
+)
+
+
+class TestTracing(unittest.TestCase):
+
+    def tearDown(self):
+        stop_tracing()
+
+    def test_noop_without_tracer(self):
+        with span("run", x=1) as s:
+            s.set_attribute("y", 2)
+        current_span().set_attribute("z", 3)
+        self.assertIsNone(stop_tracing())
+
+    def test_nested_spans_and_attributes(self):
+        tracer = start_tracing()
+        with span("run"):
+            with span("reschedule", task_id="1") as s:
+                current_span().set_attribute("http.status_code", 200)
+            with span("reschedule", task_id="2"):
+                pass
+        run, first, second = sorted(
+            tracer.spans, key=lambda s: s.start_ns,
+        )
+        self.assertEqual(run.name, "run")
+        self.assertIsNone(run.parent_id)
+        self.assertEqual(first.parent_id, run.span_id)
+        self.assertEqual(second.parent_id, run.span_id)
+        self.assertEqual(s.attributes["http.status_code"], 200)
+        self.assertLessEqual(run.start_ns, first.start_ns)
+        self.assertGreaterEqual(run.end_ns, second.end_ns)
+
+    def test_error_status_recorded(self):
+        tracer = start_tracing()
+        with self.assertRaises(ValueError), span("task.update"):
+            raise ValueError("boom")
+        otlp = tracer.spans[0].to_otlp()
+        self.assertEqual(otlp["status"]["code"], 2)
+        self.assertIn("boom", otlp["status"]["message"])
+
+    def test_writes_otlp_json(self):
+        tracer = start_tracing()
+        with span("run", day="2024-01-01", tasks=3, ok=True):
+            pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            tracer.write(path)
+            with open(path) as f:
+                data = json.load(f)
+        spans = data["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(len(spans[0]["traceId"]), 32)
+        self.assertEqual(len(spans[0]["spanId"]), 16)
+        self.assertIn(
+            {"key": "tasks", "value": {"intValue": "3"}},
+            spans[0]["attributes"],
+        )
+        self.assertIn(
+            {"key": "ok", "value": {"boolValue": True}},
+            spans[0]["attributes"],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
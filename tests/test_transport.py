@@ -0,0 +1,180 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import requests
+from todoist_api_python.api import TodoistAPI
+
+from todoistScheduler.reminders import iter_reminders
+from todoistScheduler.sync import CommandSubmitter
+from todoistScheduler.transport import (
+    SCRUBBED,
+    Cassette,
+    Interaction,
+    RecordingSession,
+    ReplayMismatch,
+    ReplaySession,
+)
+
+TASK = {
+    "id": "1", "content": "Task", "description": "", "project_id": "p",
+    "section_id": None, "parent_id": None, "labels": [], "priority": 1,
+    "due": None, "deadline": None, "duration": None,
+    "is_collapsed": False, "child_order": 0, "responsible_uid": None,
+    "assigned_by_uid": None, "completed_at": None, "added_by_uid": "u",
+    "added_at": "2024-01-01T00:00:00Z",
+    "updated_at": "2024-01-01T00:00:00Z",
+    "checked": False, "is_deleted": False,
+}
+
+
+def _form(**fields):
+    return requests.models.RequestEncodingMixin._encode_params(fields)
+
+
+def _response(payload, status=200):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps(payload).encode()
+    resp.headers["Content-Type"] = "application/json"
+    return resp
+
+
+class TestRecordingSession(unittest.TestCase):
+
+    @patch("requests.Session.send")
+    def test_records_with_token_scrubbed(self, mock_send):
+        mock_send.return_value = _response(
+            {"sync_token": "s", "user": {"token": "secret"}},
+        )
+        session = RecordingSession("secret")
+        session.post(
+            "https://example.com/sync",
+            headers={"Authorization": "Bearer secret"},
+            data={"sync_token": "*", "token": "secret"},
+        )
+
+        [recorded] = session.cassette.interactions
+        self.assertEqual(recorded.method, "POST")
+        self.assertNotIn("secret", json.dumps(recorded.__dict__))
+        self.assertIn(SCRUBBED, recorded.response)
+        self.assertEqual(
+            recorded.headers, {"Content-Type": "application/json"},
+        )
+
+    def test_cassette_round_trip(self):
+        cassette = Cassette(
+            meta={"today": "2024-01-01"},
+            interactions=[
+                Interaction("GET", "https://x/a", None, 200, {}, "{}", 0.1),
+            ],
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.jsonl")
+            cassette.write(path)
+            self.assertEqual(Cassette.read(path), cassette)
+
+
+class TestReplaySession(unittest.TestCase):
+
+    def _session(self, *interactions, **kwargs):
+        return ReplaySession(Cassette(interactions=list(interactions)), **kwargs)
+
+    def test_serves_rest_client(self):
+        session = self._session(Interaction(
+            "GET", "https://api.todoist.com/api/v1/tasks/1", None,
+            200, {}, json.dumps(TASK), 0.0,
+        ))
+        api = TodoistAPI(SCRUBBED, session=session)
+        self.assertEqual(api.get_task(task_id="1").content, "Task")
+        self.assertEqual(session.remaining(), 0)
+
+    def test_serves_streamed_sync_response(self):
+        session = self._session(Interaction(
+            "POST", "https://api.todoist.com/api/v1/sync",
+            _form(sync_token="*", resource_types='["reminders"]'), 200, {},
+            json.dumps({"reminders": [{"id": "r1"}, {"id": "r2"}]}), 0.0,
+        ))
+        ids = [r["id"] for r in iter_reminders("tok", session)]
+        self.assertEqual(ids, ["r1", "r2"])
+
+    def test_remaps_command_statuses(self):
+        recorded_commands = [
+            {"type": "reminder_add", "uuid": "u1", "temp_id": "t1",
+             "args": {}},
+            {"type": "reminder_add", "uuid": "u2", "temp_id": "t2",
+             "args": {}},
+        ]
+        reply = {
+            "sync_status": {"u1": "ok", "u2": {"error": "bad", "http_code": 400}},
+            "temp_id_mapping": {"t1": "r1"},
+        }
+        body = _form(commands=json.dumps(recorded_commands))
+        session = self._session(Interaction(
+            "POST", "https://api.todoist.com/api/v1/sync", body, 200, {},
+            json.dumps(reply), 0.0,
+        ))
+        commands = [
+            {"type": "reminder_add", "uuid": f"n{i}", "temp_id": f"nt{i}",
+             "args": {}}
+            for i in range(3)
+        ]
+        submitter = CommandSubmitter("tok", session, max_retries=0)
+        result = submitter.submit(commands)
+
+        self.assertTrue(result.results["n0"].ok)
+        self.assertFalse(result.results["n1"].ok)
+        self.assertTrue(result.results["n2"].ok)
+        self.assertEqual(result.temp_id_mapping["nt0"], "r1")
+
+    @patch("todoistScheduler.transport.time.sleep")
+    def test_scales_recorded_latency(self, mock_sleep):
+        session = self._session(
+            Interaction(
+                "GET", "https://x/a?day=2024-01-01", None, 200, {}, "{}", 0.4,
+            ),
+            latency_scale=0.5,
+        )
+        session.get("https://x/a?day=2024-01-01")
+        mock_sleep.assert_called_once_with(0.2)
+
+    def test_matches_query_strings(self):
+        session = self._session(
+            Interaction(
+                "GET", "https://x/tasks?query=today&limit=5", None, 200, {},
+                '"today"', 0.0,
+            ),
+            Interaction(
+                "GET", "https://x/tasks?query=overdue", None, 200, {},
+                '"overdue"', 0.0,
+            ),
+        )
+        self.assertEqual(
+            session.get("https://x/tasks?query=overdue").json(), "overdue",
+        )
+        self.assertEqual(
+            session.get("https://x/tasks?limit=5&query=today").json(), "today",
+        )
+        with self.assertRaises(ReplayMismatch):
+            session.get("https://x/tasks?query=tomorrow")
+
+    def test_unrecorded_request_fails(self):
+        with self.assertRaises(ReplayMismatch):
+            self._session().get("https://x/missing")
+
+    def test_commands_are_not_answered_with_a_read(self):
+        url = "https://api.todoist.com/api/v1/sync"
+        session = self._session(Interaction(
+            "POST", url, _form(sync_token="*", resource_types='["items"]'),
+            200, {}, json.dumps({"items": []}), 0.0,
+        ))
+        commands = [{"type": "item_update", "uuid": "u1", "args": {}}]
+        with self.assertRaises(ReplayMismatch):
+            session.post(url, data={"commands": json.dumps(commands)})
+        self.assertEqual(session.remaining(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,237 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from conftest import create_task
+
+from todoistScheduler.reschedule import reschedule_task
+from todoistScheduler.sync import SyncResult
+from todoistScheduler.undo import (
+    UndoLog,
+    latest_undo_log,
+    undo_commands,
+    undo_run,
+)
+
+
+def _entry(task_id, due_string, reminders=(), new_ids=()):
+    return {
+        "task_id": task_id,
+        "content": f"Task {task_id}",
+        "due_string": due_string,
+        "reminders": list(reminders),
+        "new_reminder_ids": list(new_ids),
+    }
+
+
+def _reminder(rid, minute_offset):
+    return {
+        "id": rid, "item_id": "3", "type": "relative",
+        "minute_offset": minute_offset,
+    }
+
+
+class TestUndoLog(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_record_and_read(self):
+        log = UndoLog.create(self.dir.name)
+        task = create_task('1', 'One', due_date_str='2024-01-01')
+        log.record(task, '2024-01-01', [{"id": "r1"}], ["r9"])
+        self.assertEqual(latest_undo_log(self.dir.name), log.path)
+        self.assertEqual(
+            log.entries(),
+            [{
+                "task_id": "1",
+                "content": "One",
+                "due_string": "2024-01-01",
+                "reminders": [{"id": "r1"}],
+                "new_reminder_ids": ["r9"],
+            }],
+        )
+
+    def test_skips_torn_line(self):
+        log = UndoLog(os.path.join(self.dir.name, "run.jsonl"))
+        with open(log.path, "w") as f:
+            f.write(json.dumps(_entry("1", "2024-01-01")) + "\n{\"task")
+        self.assertEqual(len(log.entries()), 1)
+
+    def test_no_logs(self):
+        self.assertIsNone(latest_undo_log(self.dir.name))
+        self.assertIsNone(
+            latest_undo_log(os.path.join(self.dir.name, "missing")),
+        )
+
+    def test_run_that_moved_nothing_is_latest(self):
+        older = UndoLog(os.path.join(self.dir.name, "20240101T000000.jsonl"))
+        older.record(
+            create_task('1', 'One', due_date_str='2024-01-01'),
+            '2024-01-01', [], [],
+        )
+        first = UndoLog.create(self.dir.name)
+        log = UndoLog.create(self.dir.name)
+
+        self.assertEqual(latest_undo_log(self.dir.name), log.path)
+        self.assertEqual(log.entries(), [])
+        self.assertFalse(os.path.exists(first.path))
+        self.assertTrue(os.path.exists(older.path))
+
+
+class TestUndoCommands(unittest.TestCase):
+
+    def test_orders_deletes_updates_adds(self):
+        reminder = {
+            "id": "r1", "item_id": "1", "type": "relative",
+            "minute_offset": 30,
+        }
+        commands = undo_commands([
+            _entry("1", "2024-01-01", [reminder], ["r9"]),
+            _entry("2", "every day starting on 2024-01-02"),
+        ])
+        self.assertEqual(
+            [c["type"] for c in commands],
+            ["reminder_delete", "item_update", "item_update",
+             "reminder_add"],
+        )
+        self.assertEqual(commands[0]["args"], {"id": "r9"})
+        self.assertEqual(
+            commands[2]["args"],
+            {"id": "2", "due": {"string": "every day starting on 2024-01-02"}},
+        )
+        self.assertEqual(commands[3]["args"]["minute_offset"], 30)
+
+    def test_task_moved_twice_returns_to_first_due(self):
+        commands = undo_commands([
+            _entry("1", "2024-01-01", new_ids=["r5"]),
+            _entry("1", "2024-01-03", new_ids=["r6"]),
+        ])
+        self.assertEqual(
+            [(c["type"], c["args"]) for c in commands],
+            [
+                ("reminder_delete", {"id": "r6"}),
+                ("item_update",
+                 {"id": "1", "due": {"string": "2024-01-01"}}),
+            ],
+        )
+
+    def test_task_without_due_date_is_cleared(self):
+        commands = undo_commands([_entry("1", None)])
+        self.assertIsNone(commands[0]["args"]["due"])
+
+
+class TestUndoRun(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.path = os.path.join(self.dir.name, "run.jsonl")
+        log = UndoLog(self.path)
+        for i in range(3):
+            log.record(
+                create_task(str(i), 'T', due_date_str='2024-01-01'),
+                '2024-01-01', [], [],
+            )
+
+    def test_submits_once_and_marks_log_undone(self):
+        submitter = MagicMock()
+        submitter.submit.return_value = SyncResult()
+        undo_run("tok", self.path, submitter=submitter)
+
+        submitter.submit.assert_called_once()
+        self.assertEqual(len(submitter.submit.call_args.args[0]), 3)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertIsNone(latest_undo_log(self.dir.name))
+
+    def test_empty_log_submits_nothing(self):
+        log = UndoLog.create(self.dir.name)
+        submitter = MagicMock()
+        undo_run("tok", log.path, submitter=submitter)
+
+        submitter.submit.assert_not_called()
+        self.assertTrue(os.path.exists(log.path))
+
+    def test_keeps_log_after_failures(self):
+        submitter = MagicMock()
+        result = SyncResult()
+        command = {"type": "item_update", "uuid": "u"}
+        result.add_response([command], {"sync_status": {}})
+        submitter.submit.return_value = result
+        undo_run("tok", self.path, submitter=submitter)
+
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_retry_resubmits_only_failed_commands(self):
+        UndoLog(self.path).record(
+            create_task('3', 'R', due_date_str='2024-01-05'),
+            '2024-01-01',
+            [_reminder("r1", 1), _reminder("r2", 2)],
+            ["n1"],
+        )
+
+        def submit(commands):
+            result = SyncResult()
+            result.add_response(commands, {"sync_status": {
+                c["uuid"]: "ok" if c["args"].get("id") not in ("1", "n1")
+                and c["args"].get("minute_offset") != 2
+                else {"error": "Service unavailable", "http_code": 503}
+                for c in commands
+            }})
+            return result
+
+        submitter = MagicMock()
+        submitter.submit.side_effect = submit
+        undo_run("tok", self.path, submitter=submitter)
+
+        self.assertEqual(
+            {e["task_id"] for e in UndoLog(self.path).entries()},
+            {"1", "3"},
+        )
+        retry = undo_commands(UndoLog(self.path).entries())
+        self.assertEqual(
+            [(c["type"], c["args"].get("id")) for c in retry],
+            [
+                ("reminder_delete", "n1"),
+                ("item_update", "1"),
+                ("reminder_add", None),
+            ],
+        )
+        self.assertEqual(retry[2]["args"]["minute_offset"], 2)
+
+
+class TestRescheduleRecordsUndo(unittest.TestCase):
+
+    @patch("todoistScheduler.reschedule.restore_reminders")
+    @patch("todoistScheduler.reschedule.delete_reminders")
+    @patch("todoistScheduler.reschedule.fetch_reminders")
+    def test_records_original_due_and_new_reminders(
+        self, mock_fetch, _mock_delete, mock_restore,
+    ):
+        reminders = [{"id": "r1", "item_id": "1", "type": "relative",
+                      "minute_offset": 10}]
+        mock_fetch.return_value = reminders
+        mock_restore.return_value = SyncResult(
+            temp_id_mapping={"tmp": "r2"},
+        )
+        api = MagicMock()
+        undo_log = MagicMock()
+        task = create_task(
+            '1', 'Task',
+            due_date_str='2024-01-10',
+            due_datetime_str='2024-01-10T17:00:00Z',
+        )
+
+        reschedule_task(api, task, date(2024, 1, 15), undo_log=undo_log)
+
+        undo_log.record.assert_called_once_with(
+            task, '2024-01-10 17:00', reminders, ["r2"],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
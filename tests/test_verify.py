@@ -0,0 +1,65 @@
+import json
+import unittest
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from conftest import create_task
+
+from todoistScheduler.plan import Move
+from todoistScheduler.verify import get_sync_token, verify_moves
+
+
+def _task(id, content):
+    return create_task(id, content, due_date_str='2024-01-01')
+
+
+def _response(payload):
+    return MagicMock(json=lambda: payload)
+
+
+class TestVerify(unittest.TestCase):
+
+    def setUp(self):
+        self.moves = [
+            Move(_task('1', 'One'), date(2024, 1, 5)),
+            Move(_task('2', 'Two'), date(2024, 1, 6)),
+            Move(_task('3', 'Three'), date(2024, 1, 6)),
+        ]
+
+    @patch("todoistScheduler.verify.requests.post")
+    def test_get_sync_token_requests_user_only(self, mock_post):
+        mock_post.return_value = _response({"sync_token": "abc"})
+        self.assertEqual(get_sync_token("tok"), "abc")
+        data = mock_post.call_args.kwargs["data"]
+        self.assertEqual(data["sync_token"], "*")
+        self.assertEqual(json.loads(data["resource_types"]), ["user"])
+
+    @patch("todoistScheduler.verify.requests.post")
+    def test_reports_mismatches_in_one_request(self, mock_post):
+        mock_post.return_value = _response({
+            "items": [
+                {"id": "1", "due": {"date": "2024-01-05T17:00:00"}},
+                {"id": "2", "due": {"date": "2024-01-07"}},
+            ],
+            "reminders": [
+                {"id": "r1", "item_id": "1", "is_deleted": 1},
+                {"id": "r2", "item_id": "1"},
+                {"id": "r3", "item_id": "2", "is_deleted": 1},
+            ],
+        })
+        mismatches = verify_moves("tok", "before", self.moves)
+
+        mock_post.assert_called_once()
+        self.assertEqual(
+            mock_post.call_args.kwargs["data"]["sync_token"], "before",
+        )
+        found = [(m.task_id, m.actual) for m in mismatches]
+        self.assertEqual(found, [
+            ('2', '2024-01-07'),
+            ('2', '1 reminder(s) lost'),
+            ('3', 'unchanged'),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()